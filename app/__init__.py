@@ -9,7 +9,16 @@ from app.config import load_app_config
 from app.config import print_config_info
 from app.extensions import init_line_bot_api
 from app.logger import setup_logger
-from app.services.groq_service import get_groq_client
+from app.services.audio_cache import init_audio_cache
+from app.services.groq_service import get_groq_client, init_session_backend, init_usage_tracker
+from app.services.headwords import init_headwords
+from app.services.prefetch import init_prefetcher
+from app.services.review_deck import init_review_store
+from app.services.seen_words import init_seen_word_index
+from app.services.short_links import init_short_links
+from app.services.word_cache import init_word_cache
+from app.utils.english_words import init_word_pool
+from app.utils.news import init_news_feeds
 from app.utils.scheduler import init_scheduler
 
 logger = logging.getLogger(__name__)
@@ -46,8 +55,37 @@ def create_app():
     init_app(app)
     logger.info("API routes initialized")
 
+    # 初始化會話儲存後端
+    initialize_session_backend(app.config)
+
+    # 初始化 token 用量統計
+    initialize_usage_tracker(app.config)
+
     # 初始化Groq服務
-    initialize_groq_client(app.config.get("GROQ_API_KEY"))
+    initialize_groq_client(
+        app.config.get("GROQ_API_KEY"),
+        default_concurrency=int(app.config.get("GROQ_MODEL_CONCURRENCY", 4)),
+        max_connections=int(app.config.get("GROQ_MAX_CONNECTIONS", 32)),
+        base_url=app.config.get("GROQ_BASE_URL"),
+        max_retries=int(app.config.get("GROQ_MAX_RETRIES", 2))
+    )
+
+    # 初始化英文單字池
+    initialize_seen_word_index(app.config)
+    initialize_headwords(app.config)
+    initialize_word_cache(app.config)
+    initialize_review_store(app.config)
+    initialize_word_pool(app.config)
+
+    # 初始化選單流程的預取
+    initialize_prefetcher(app.config)
+
+    # 初始化語音代理與快取
+    initialize_audio_cache(app.config)
+
+    # 初始化新聞列表快取與縮網址快取
+    initialize_news_feeds(app.config)
+    initialize_short_links(app.config)
 
     # 導入消息處理器
     from app.handlers.line_message_handlers import process_text_message
@@ -109,15 +147,121 @@ def initialize_line_bot(config):
     logger.info("LINE Bot initialized successfully")
 
 
-def initialize_groq_client(api_key):
-    """初始化Groq客戶端"""
+def initialize_groq_client(api_key, default_concurrency=4, max_connections=32, base_url=None, max_retries=2):
+    """初始化Groq客戶端（專用事件迴圈與連線池）"""
     if not api_key:
         logger.warning("No GROQ_API_KEY provided, Groq service will be unavailable")
         return
 
     try:
-        get_groq_client(api_key)
+        get_groq_client(api_key, default_concurrency=default_concurrency, max_connections=max_connections,
+                        base_url=base_url, max_retries=max_retries)
         logger.info("Groq client initialized successfully")
     except Exception as ex:
         logger.error(f"Failed to initialize Groq client: {ex}")
         exit(1)
+
+
+def initialize_session_backend(config):
+    """初始化會話儲存後端（對話紀錄與 AI 回應狀態）"""
+    backend = config.get("SESSION_BACKEND", "memory")
+    init_session_backend(
+        backend,
+        db_path=config.get("SESSION_DB_PATH"),
+        flush_interval=float(config.get("SESSION_FLUSH_INTERVAL", 0.2))
+    )
+    logger.info(f"Session backend initialized: {backend}")
+
+
+def initialize_usage_tracker(config):
+    """初始化 token 用量統計與每個聊天室的每日額度"""
+    daily_budget = int(config.get("CHAT_DAILY_TOKEN_BUDGET", 0))
+    init_usage_tracker(
+        db_path=config.get("USAGE_DB_PATH"),
+        flush_interval=float(config.get("USAGE_FLUSH_INTERVAL", 30)),
+        daily_budget=daily_budget
+    )
+    logger.info(f"Token usage tracker initialized (daily budget per chat: {daily_budget or 'unlimited'})")
+
+
+def initialize_seen_word_index(config):
+    """初始化使用者已看過單字的索引"""
+    init_seen_word_index(config.get("SEEN_WORDS_DB_PATH"))
+    logger.info("Seen word index initialized")
+
+
+def initialize_headwords(config):
+    """編譯附帶的單字清單，啟用本地選字"""
+    try:
+        init_headwords(config.get("HEADWORDS_DIR"))
+        logger.info("Bundled word lists loaded")
+    except OSError as ex:
+        logger.error(f"Failed to compile bundled word lists, words will be chosen by the model: {ex}")
+
+
+def initialize_word_cache(config):
+    """初始化單字詳細資料快取"""
+    lru_size = int(config.get("WORD_CACHE_LRU_SIZE", 1024))
+    init_word_cache(config.get("WORD_CACHE_DB_PATH"), lru_size)
+    logger.info(f"Word detail cache initialized (LRU size: {lru_size})")
+
+
+def initialize_review_store(config):
+    """初始化單字複習卡片組"""
+    init_review_store(config.get("REVIEW_DB_PATH"))
+    logger.info("Word review store initialized")
+
+
+def initialize_prefetcher(config):
+    """初始化選單流程的預取（顯示選單時先在背景準備最後一步的內容）"""
+    ttl = float(config.get("PREFETCH_TTL", 60))
+    init_prefetcher(ttl, int(config.get("PREFETCH_WORKERS", 2)))
+    logger.info(f"Prefetcher initialized (TTL: {ttl:g}s)" if ttl > 0 else "Prefetcher disabled")
+
+
+def initialize_audio_cache(config):
+    """初始化語音代理與快取（需要對外網址，否則單字發音直接連到 Google TTS）"""
+    public_base_url = config.get("PUBLIC_BASE_URL")
+    if not public_base_url:
+        logger.info("PUBLIC_BASE_URL not set, audio links point to Google TTS directly")
+        return
+
+    max_mb = int(config.get("AUDIO_CACHE_MAX_MB", 200))
+    init_audio_cache(
+        config.get("AUDIO_CACHE_DIR"),
+        max_mb * 1024 * 1024,
+        public_base_url,
+        upstream_url=config.get("TTS_UPSTREAM_URL"),
+        link_ttl=float(config.get("AUDIO_LINK_TTL_DAYS", 30)) * 86400
+    )
+    logger.info(f"Audio cache initialized (max size: {max_mb} MB)")
+
+
+def initialize_news_feeds(config):
+    """初始化新聞列表快取（過期後先使用舊列表，並在背景更新）"""
+    fresh_ttl = float(config.get("NEWS_FRESH_TTL", 300))
+    stale_ttl = float(config.get("NEWS_STALE_TTL", 3600))
+    init_news_feeds(fresh_ttl, stale_ttl)
+    logger.info(f"News feed cache initialized (fresh: {fresh_ttl:g}s, stale: {stale_ttl:g}s)")
+
+
+def initialize_short_links(config):
+    """初始化縮網址快取（並行縮短、總期限與長期保存）"""
+    deadline = float(config.get("SHORTEN_DEADLINE", 3))
+    init_short_links(config.get("SHORT_LINK_DB_PATH"), int(config.get("SHORTEN_WORKERS", 4)), deadline)
+    logger.info(f"Short link cache initialized (deadline: {deadline:g}s)")
+
+
+def initialize_word_pool(config):
+    """初始化預先生成的英文單字池（需要 Groq 服務）"""
+    target_size = int(config.get("WORD_POOL_SIZE", 30))
+    if target_size <= 0 or not config.get("GROQ_API_KEY"):
+        logger.info("English word pool disabled")
+        return
+
+    init_word_pool(
+        config.get("WORD_POOL_DB_PATH"),
+        target_size=target_size,
+        low_water=int(config.get("WORD_POOL_LOW_WATER", 10))
+    )
+    logger.info(f"English word pool initialized (target size: {target_size})")
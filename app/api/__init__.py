@@ -1,14 +1,21 @@
+import io
 import logging
+import re
 
-from flask import jsonify
+from flask import jsonify, send_file
 from flask import request, Blueprint
 
 from .v1 import api_v1_blueprint
 from ..extensions import get_handler
+from ..services import audio_cache
 
 main_blueprint = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
 
+AUDIO_HASH_PATTERN = re.compile(r"[0-9a-f]{32}")
+# 語音檔以內容定址，內容不會變更
+AUDIO_MAX_AGE = 365 * 24 * 3600
+
 
 @main_blueprint.route('/')
 def home():
@@ -38,6 +45,29 @@ def webhook():
     return "OK"
 
 
+@main_blueprint.route('/audio/<audio_hash>', methods=['GET'])
+def audio(audio_hash):
+    """提供快取的語音檔，支援 ETag 與 Range 請求"""
+    cache = audio_cache.audio_cache
+    if cache is None or not AUDIO_HASH_PATTERN.fullmatch(audio_hash):
+        return "Not found", 404
+
+    # 取得路徑後檔案可能被其他 worker 淘汰，此時重新取得一次
+    for _ in range(2):
+        audio_file = cache.get_audio(audio_hash)
+        if audio_file is None:
+            break
+        if isinstance(audio_file, bytes):
+            audio_file = io.BytesIO(audio_file)
+        try:
+            return send_file(audio_file, mimetype="audio/mpeg", conditional=True, etag=audio_hash,
+                             max_age=AUDIO_MAX_AGE)
+        except FileNotFoundError:
+            logger.info(f"Cached audio {audio_hash} was evicted before it was sent, fetching again")
+
+    return "Audio not available", 404
+
+
 def init_app(app):
     app.register_blueprint(main_blueprint)
     logger.info("main_blueprint registered and app initialized")
@@ -1,4 +1,8 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
+
+from app.services import audio_cache, groq_service, headwords, prefetch, review_deck, short_links, structured_output, \
+    word_cache
+from app.utils import english_words, news
 
 api_v1_blueprint = Blueprint('api_v1', __name__)
 
@@ -6,3 +10,33 @@ api_v1_blueprint = Blueprint('api_v1', __name__)
 @api_v1_blueprint.route('/hello', methods=['GET'])
 def hello_world():
     return jsonify({"message": "Hello World V1!"}), 200
+
+
+@api_v1_blueprint.route('/stats', methods=['GET'])
+def stats():
+    # 訊息處理器需在 LINE Bot 初始化後才能載入
+    from app.handlers.line_message_handlers import chat_debouncer
+
+    return jsonify({
+        "single_flight": groq_service.get_single_flight_stats(),
+        "llm_queue": groq_service.get_llm_queue_stats(),
+        "chat_locks": groq_service.get_chat_lock_stats(),
+        "model_routing": groq_service.get_model_routing_stats(),
+        "response_cache": groq_service.get_response_cache_stats(),
+        "structured_output": structured_output.get_parse_stats(),
+        "chat_debounce": chat_debouncer.stats(),
+        "word_pool": english_words.word_pool.stats() if english_words.word_pool is not None else None,
+        "word_cache": word_cache.word_cache.stats(),
+        "headwords": headwords.get_headword_stats(),
+        "prefetch": prefetch.prefetcher.stats(),
+        "audio_cache": audio_cache.get_audio_cache_stats(),
+        "news_feeds": news.news_feeds.stats(),
+        "short_links": short_links.short_links.stats(),
+        "review": review_deck.review_store.stats()
+    }), 200
+
+
+@api_v1_blueprint.route('/usage', methods=['GET'])
+def usage():
+    days = max(request.args.get('days', default=1, type=int), 1)
+    return jsonify(groq_service.get_usage_summary(days)), 200
@@ -17,11 +17,43 @@ class Config:
     LINE_CHANNEL_ACCESS_TOKEN = os.getenv('LINE_CHANNEL_ACCESS_TOKEN')
     LINE_CHANNEL_SECRET = os.getenv('LINE_CHANNEL_SECRET')
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+    GROQ_MODEL_CONCURRENCY = int(os.getenv('GROQ_MODEL_CONCURRENCY', 4))
+    GROQ_MAX_CONNECTIONS = int(os.getenv('GROQ_MAX_CONNECTIONS', 32))
+    GROQ_BASE_URL = os.getenv('GROQ_BASE_URL')
+    GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', 2))
     SPRING_CONFIG_URL = os.getenv('SPRING_CONFIG_URL')
     SPRING_CONFIG_USERNAME = os.getenv('SPRING_CONFIG_USERNAME')
     SPRING_CONFIG_PASSWORD = os.getenv('SPRING_CONFIG_PASSWORD')
     EUREKA_SERVER_HOST = os.getenv('EUREKA_SERVER_HOST')
     EUREKA_SERVER_PORT = os.getenv('EUREKA_SERVER_PORT')
+    CHAT_DEBOUNCE_MS = int(os.getenv('CHAT_DEBOUNCE_MS', 1500))
+    DATA_DIR = os.getenv('DATA_DIR', 'data')
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')
+    SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', os.path.join(DATA_DIR, 'sessions.db'))
+    SESSION_FLUSH_INTERVAL = float(os.getenv('SESSION_FLUSH_INTERVAL', 0.2))
+    USAGE_DB_PATH = os.getenv('USAGE_DB_PATH', os.path.join(DATA_DIR, 'usage.db'))
+    USAGE_FLUSH_INTERVAL = float(os.getenv('USAGE_FLUSH_INTERVAL', 30))
+    CHAT_DAILY_TOKEN_BUDGET = int(os.getenv('CHAT_DAILY_TOKEN_BUDGET', 0))
+    WORD_POOL_DB_PATH = os.getenv('WORD_POOL_DB_PATH', os.path.join(DATA_DIR, 'word_pool.db'))
+    WORD_POOL_SIZE = int(os.getenv('WORD_POOL_SIZE', 30))
+    WORD_POOL_LOW_WATER = int(os.getenv('WORD_POOL_LOW_WATER', 10))
+    SEEN_WORDS_DB_PATH = os.getenv('SEEN_WORDS_DB_PATH', os.path.join(DATA_DIR, 'seen_words.db'))
+    WORD_CACHE_DB_PATH = os.getenv('WORD_CACHE_DB_PATH', os.path.join(DATA_DIR, 'word_cache.db'))
+    WORD_CACHE_LRU_SIZE = int(os.getenv('WORD_CACHE_LRU_SIZE', 1024))
+    REVIEW_DB_PATH = os.getenv('REVIEW_DB_PATH', os.path.join(DATA_DIR, 'review.db'))
+    HEADWORDS_DIR = os.getenv('HEADWORDS_DIR', os.path.join(DATA_DIR, 'headwords'))
+    PREFETCH_TTL = float(os.getenv('PREFETCH_TTL', 60))
+    PREFETCH_WORKERS = int(os.getenv('PREFETCH_WORKERS', 2))
+    PUBLIC_BASE_URL = os.getenv('PUBLIC_BASE_URL')
+    AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', os.path.join(DATA_DIR, 'audio'))
+    AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', 200))
+    AUDIO_LINK_TTL_DAYS = float(os.getenv('AUDIO_LINK_TTL_DAYS', 30))
+    TTS_UPSTREAM_URL = os.getenv('TTS_UPSTREAM_URL', 'https://translate.google.com/translate_tts')
+    NEWS_FRESH_TTL = float(os.getenv('NEWS_FRESH_TTL', 300))
+    NEWS_STALE_TTL = float(os.getenv('NEWS_STALE_TTL', 3600))
+    SHORT_LINK_DB_PATH = os.getenv('SHORT_LINK_DB_PATH', os.path.join(DATA_DIR, 'short_links.db'))
+    SHORTEN_WORKERS = int(os.getenv('SHORTEN_WORKERS', 4))
+    SHORTEN_DEADLINE = float(os.getenv('SHORTEN_DEADLINE', 3))
 
 
 def load_app_config(app, profile):
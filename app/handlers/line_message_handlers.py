@@ -8,23 +8,14 @@ from linebot.models import (
     PostbackEvent
 )
 
+from app.config import Config
 from app.extensions import line_bot_api, handler
 from app.services import groq_service
-from app.services.groq_service import get_ai_status_flex, toggle_ai_status
-from app.utils.english_subscribe import (
-    get_subscription_menu,
-    get_difficulty_menu,
-    get_count_menu,
-    get_time_menu,
-    get_subscription_confirm,
-    handle_subscription_time,
-    handle_subscription_save,
-    handle_subscription_view,
-    handle_subscription_cancel
-)
+from app.services.chat_debouncer import ChatDebouncer
+from app.services.groq_service import get_ai_status_flex, toggle_ai_status, toggle_debounce_status
 from app.utils.english_words import (
     get_english_difficulty_menu, get_english_count_menu,
-    get_english_words
+    get_english_words, prefetch_english_words
 )
 from app.utils.japanese_words import get_japanese_word
 from app.utils.lumos import get_lumos
@@ -37,7 +28,7 @@ from app.utils.medication import (
 )
 from app.utils.menu import get_menu
 from app.utils.movie import get_movies
-from app.utils.news import get_news_topic_menu, get_news_count_menu, get_news
+from app.utils.news import get_news_topic_menu, get_news_count_menu, get_news, prefetch_news
 from app.utils.other_reminder import (
     get_other_reminder_menu, get_other_reminder_list_flex, get_today_other_reminder_records,
     delete_other_reminder, start_add_other_reminder, is_adding_other_reminder,
@@ -45,6 +36,8 @@ from app.utils.other_reminder import (
     mark_other_reminder_done
 )
 from app.utils.push_quota import get_line_push_quota_flex
+from app.utils.word_subscribe import get_subscription_language, handle_subscription_postback
+from app.utils.word_review import get_review_card, get_review_answer, handle_review_grade
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +46,17 @@ MENU_COMMANDS = ["0", "啊哇呾喀呾啦", "menu", "選單"]
 LUMOS_COMMANDS = ["路摸思", "lumos"]
 
 
+def _reply_merged_messages(chat_id: str, merged_text: str, reply_token: str, message_count: int):
+    """連發訊息合併後只呼叫一次 LLM，並以最後一則訊息的 reply token 回覆"""
+    response = groq_service.chat_with_groq(chat_id, merged_text)
+    if response is not None:
+        reply_to_user(reply_token, response)
+
+
+# 連發訊息合併（需由聊天室自行開啟）
+chat_debouncer = ChatDebouncer(Config.CHAT_DEBOUNCE_MS, _reply_merged_messages)
+
+
 @handler.add(PostbackEvent)
 def handle_postback(event):
     chat_id = event.source.group_id if event.source.type == 'group' else event.source.user_id
@@ -64,45 +68,46 @@ def handle_postback(event):
         news_count = data.get('news_count', [''])[0]
         english_difficulty = data.get('english_difficulty', [''])[0]
         english_count = data.get('english_count', [''])[0]
+        subscription_language = get_subscription_language(action, data)
 
         logger.info(f"Received postback from {chat_id}: {action}")
 
         if action == 'toggle_ai':
             toggle_ai_status(chat_id)
             response = get_ai_status_flex(chat_id)
+        elif action == 'toggle_debounce':
+            if toggle_debounce_status(chat_id):
+                seconds = Config.CHAT_DEBOUNCE_MS / 1000
+                response = TextSendMessage(text=f"已開啟連發訊息合併：{seconds:g} 秒內連續送出的訊息會合併成一則回覆")
+            else:
+                response = TextSendMessage(text="已關閉連發訊息合併")
         elif action == 'news':
             response = get_news_topic_menu()
         elif news_topic:
+            # 使用者選擇數量時，新聞列表已在背景取得
+            prefetch_news(chat_id, news_topic)
             response = get_news_count_menu(news_topic)
         elif news_count:
             topic_id, count = news_count.split('/')
-            response = get_news(topic_id, int(count))
+            response = get_news(topic_id, int(count), chat_id)
         elif action == 'movie':
             response = get_movies()
         elif action == 'japanese':
             response = get_japanese_word(chat_id)
         elif action == 'english':
             response = get_english_difficulty_menu()
-        elif action == 'english_subscribe':
-            response = get_subscription_menu()
-        elif action == 'english_subscribe_setup':
-            response = get_difficulty_menu()
-        elif 'english_subscribe_difficulty' in data:
-            difficulty_id = data['english_subscribe_difficulty'][0]
-            response = get_count_menu(difficulty_id)
-        elif 'english_subscribe_count' in data:
-            difficulty_id, count = data['english_subscribe_count'][0].split('/')
-            response = get_time_menu(difficulty_id, int(count))
-        elif 'english_subscribe_time' in data:
-            difficulty_id, count, selected_times = handle_subscription_time(data)
-            response = get_subscription_confirm(difficulty_id, count, selected_times)
-        elif 'english_subscribe_save' in data:
-            response = handle_subscription_save(data, chat_id)
-        elif action == 'english_subscribe_view':
-            response = handle_subscription_view(chat_id)
-        elif action == 'english_subscribe_cancel':
-            response = handle_subscription_cancel(chat_id)
+        elif action == 'review':
+            response = get_review_card(chat_id)
+        elif action == 'review_show':
+            response = get_review_answer(chat_id, int(data['card'][0]))
+        elif action == 'review_grade':
+            response = handle_review_grade(chat_id, int(data['card'][0]), int(data['quality'][0]))
+        elif subscription_language:
+            # 英文與日文單字訂閱（english_subscribe_* / japanese_subscribe_*）
+            response = handle_subscription_postback(chat_id, subscription_language, action, data)
         elif english_difficulty:
+            # 使用者選擇數量時，單字已在背景準備
+            prefetch_english_words(chat_id, english_difficulty)
             response = get_english_count_menu(english_difficulty)
         elif english_count:
             difficulty_id, count = english_count.split('/')
@@ -268,6 +273,11 @@ def process_text_message(event):
                     reply_to_user(event.reply_token, TextSendMessage(text=message))
                 return
 
+        # 開啟連發訊息合併時，AI 對話訊息先暫存，視窗結束後合併成一次回覆
+        if should_debounce(chat_id, message_text):
+            chat_debouncer.submit(chat_id, message_text, event.reply_token, getattr(event.source, 'user_id', None))
+            return
+
         # 一般訊息處理
         response = process_user_input(chat_id, message_text)
         if response is not None:
@@ -278,6 +288,18 @@ def process_text_message(event):
         reply_to_user(event.reply_token, "系統忙碌中，請稍後重試。若問題持續發生，請聯繫客服，謝謝您的耐心!")
 
 
+def should_debounce(chat_id: str, message_text: str) -> bool:
+    """只有開啟合併功能、AI 回應開啟且不是指令的訊息才合併"""
+    if not chat_debouncer.available or not groq_service.get_debounce_status(chat_id):
+        return False
+
+    msg = message_text.strip().lower()
+    if msg in MENU_COMMANDS or msg in LUMOS_COMMANDS:
+        return False
+
+    return groq_service.get_ai_status(chat_id)
+
+
 def process_user_input(chat_id: str, message_text: str) -> Union[str, TextSendMessage, FlexSendMessage, List]:
     msg = message_text.strip().lower()
 
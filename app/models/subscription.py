@@ -1,7 +1,7 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from pprint import pprint
-from typing import List
+from typing import List, NamedTuple
 
 
 @dataclass
@@ -13,6 +13,14 @@ class Subscription:
     count: int
     time: str
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    language: str = "english"
+
+
+class SubscriptionContent(NamedTuple):
+    """同一時段相同 (語言, 難度, 數量) 的訂閱者共用的推播內容"""
+    message: object   # FlexSendMessage，生成失敗時為錯誤訊息字串
+    words: list       # 推播的單字資料，用於記錄每位訂閱者收到的單字
+    level: str        # 單字難度
 
 
 class SubscriptionManager:
@@ -23,21 +31,23 @@ class SubscriptionManager:
         """新增訂閱"""
         self.subscriptions.append(subscription)
 
-    def get_user_subscriptions(self, user_id: str) -> List[Subscription]:
-        """獲取使用者的訂閱"""
-        return [s for s in self.subscriptions if s.user_id == user_id]
+    def get_user_subscriptions(self, user_id: str, language: str = None) -> List[Subscription]:
+        """獲取使用者的訂閱，指定語言時只取該語言的訂閱"""
+        return [s for s in self.subscriptions
+                if s.user_id == user_id and (language is None or s.language == language)]
 
-    def remove_user_subscriptions(self, user_id: str):
-        """移除使用者的所有訂閱"""
-        self.subscriptions = [s for s in self.subscriptions if s.user_id != user_id]
+    def remove_user_subscriptions(self, user_id: str, language: str = None):
+        """移除使用者的所有訂閱，指定語言時只移除該語言的訂閱"""
+        self.subscriptions = [s for s in self.subscriptions
+                              if s.user_id != user_id or (language is not None and s.language != language)]
 
     def get_all_subscriptions(self) -> List[Subscription]:
         """獲取所有訂閱"""
         return self.subscriptions
 
-    def get_subscriptions_by_time(self, time: str) -> List[Subscription]:
-        """獲取指定時段的所有訂閱"""
-        return [s for s in self.subscriptions if s.time == time]
+    def get_subscriptions_by_time(self, time: str, language: str = None) -> List[Subscription]:
+        """獲取指定時段的所有訂閱，指定語言時只取該語言的訂閱"""
+        return [s for s in self.subscriptions if s.time == time and (language is None or s.language == language)]
 
 
 # 使用範例資料初始化
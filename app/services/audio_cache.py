@@ -0,0 +1,291 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Union
+
+import requests
+
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_TTS_URL = "https://translate.google.com/translate_tts"
+
+# 清理過期登記的間隔（秒）
+PRUNE_INTERVAL = 3600
+
+
+def audio_key(text: str, lang: str) -> str:
+    """音訊的內容定址鍵：語言與文字的雜湊"""
+    return hashlib.blake2b(f"{lang}\n{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def http_tts_upstream(base_url: str = GOOGLE_TTS_URL, timeout: float = 10) -> Callable[[str, str], bytes]:
+    """
+    以 Google Translate TTS 相容的 HTTP 介面合成語音
+    :param base_url: TTS 服務位址，可指向本地模擬伺服器（benchmarks/tts_standin.py）
+    """
+    def fetch(text: str, lang: str) -> bytes:
+        response = requests.get(
+            base_url,
+            params={"ie": "UTF-8", "tl": lang, "client": "tw-ob", "q": text},
+            timeout=timeout
+        )
+        response.raise_for_status()
+        return response.content
+
+    return fetch
+
+
+class AudioCache:
+    """
+    語音檔的本地快取
+
+    - 產生連結時登記 (語言, 文字)，連結只帶雜湊，伺服器不會替任意文字合成語音
+    - 第一次請求時才向上游合成一次，以雜湊為檔名保存於磁碟（同時的相同請求只合成一次）
+    - 總大小超過上限時刪除最久沒有被請求的檔案與其登記；登記與存取時間保存於 SQLite，多個 worker 共用
+    - 單一檔案大於上限時不保存，只回傳這次合成的內容
+    - 從未被請求的登記超過有效期後刪除（每個 worker 每 PRUNE_INTERVAL 秒在產生連結時清理一次）
+
+    登記隨檔案一起刪除或逾期刪除，資料表的大小取決於快取上限與有效期內產生的連結數；
+    刪除後舊連結回傳 404，重新產生連結時再登記。
+    """
+
+    def __init__(self, directory: str, max_bytes: int, upstream: Callable[[str, str], bytes],
+                 public_base_url: str = None, link_ttl: float = 30 * 86400):
+        """
+        :param directory: 語音檔存放目錄
+        :param max_bytes: 語音檔總大小上限
+        :param upstream: 合成語音的函式，接收 (文字, 語言)，回傳音訊內容
+        :param public_base_url: 對外的服務網址，語音連結為 <public_base_url>/audio/<雜湊>
+        :param link_ttl: 沒有被請求過的連結的有效期（秒），每次重新產生連結時延長
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.link_ttl = link_ttl
+        self.public_base_url = (public_base_url or "").rstrip("/")
+        self._upstream = upstream
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._next_prune = 0.0
+
+        self.hits = 0
+        self.fetched = 0
+        self.upstream_errors = 0
+        self.oversized = 0
+        self.evicted = 0
+        self.pruned = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.directory, "audio.db"), timeout=5, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audio_texts (
+                hash TEXT PRIMARY KEY,
+                lang TEXT NOT NULL,
+                text TEXT NOT NULL,
+                registered_at REAL NOT NULL
+            )
+        """)
+        # 舊版的資料表沒有登記時間，既有的登記從現在開始計算有效期
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(audio_texts)")}
+        if "registered_at" not in columns:
+            try:
+                conn.execute("ALTER TABLE audio_texts ADD COLUMN registered_at REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE audio_texts SET registered_at = ?", (time.time(),))
+            except sqlite3.OperationalError:
+                # 其他 worker 已同時加上欄位
+                pass
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_texts_registered ON audio_texts (registered_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS audio_files (
+                hash TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_access ON audio_files (last_access)")
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.mp3")
+
+    def url_for(self, text: str, lang: str) -> str:
+        """登記文字並回傳語音連結"""
+        key = audio_key(text, lang)
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connection()
+                # 已登記且離過期還久時只需讀取；登記可能已被其他 worker 刪除，因此以資料庫為準
+                row = conn.execute("SELECT registered_at FROM audio_texts WHERE hash = ?", (key,)).fetchone()
+                if row is None:
+                    conn.execute("INSERT OR IGNORE INTO audio_texts (hash, lang, text, registered_at) "
+                                 "VALUES (?, ?, ?, ?)", (key, lang, text, now))
+                elif row[0] < now - self.link_ttl / 2:
+                    conn.execute("UPDATE audio_texts SET registered_at = ? WHERE hash = ?", (now, key))
+                if now >= self._next_prune:
+                    self._next_prune = now + PRUNE_INTERVAL
+                    self._prune(conn, now)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to register audio text: {e}")
+        return f"{self.public_base_url}/audio/{key}"
+
+    def _prune(self, conn: sqlite3.Connection, now: float) -> None:
+        """刪除超過有效期、且從未被請求（沒有快取檔案）的登記"""
+        pruned = conn.execute(
+            "DELETE FROM audio_texts WHERE registered_at < ? AND hash NOT IN (SELECT hash FROM audio_files)",
+            (now - self.link_ttl,)
+        ).rowcount
+        if pruned:
+            self.pruned += pruned
+            logger.info(f"Pruned {pruned} expired audio registrations")
+
+    def get_audio(self, key: str) -> Union[str, bytes, None]:
+        """
+        取得語音檔，尚未快取時向上游合成
+        :return: 快取的檔案路徑；檔案大於上限不保存時為音訊內容；沒有登記或合成失敗時返回 None
+
+        回傳的路徑可能在讀取前被其他 worker 淘汰（FileNotFoundError），此時再呼叫一次會重新合成
+        """
+        path = self._path(key)
+        if os.path.exists(path):
+            with self._lock:
+                self.hits += 1
+                self._touch(key)
+            return path
+
+        audio, _ = self._flight.do(key, lambda: self._fetch(key))
+        return audio
+
+    def _touch(self, key: str) -> None:
+        try:
+            self._connection().execute("UPDATE audio_files SET last_access = ? WHERE hash = ?", (time.time(), key))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to update audio access time: {e}")
+
+    def _fetch(self, key: str) -> Union[str, bytes, None]:
+        path = self._path(key)
+        if os.path.exists(path):
+            return path
+
+        with self._lock:
+            row = self._connection().execute("SELECT lang, text FROM audio_texts WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        lang, text = row
+        try:
+            data = self._upstream(text, lang)
+        except Exception as e:
+            with self._lock:
+                self.upstream_errors += 1
+            logger.error(f"TTS upstream failed for {lang} text ({len(text)} chars): {e}")
+            return None
+        if not data:
+            with self._lock:
+                self.upstream_errors += 1
+            logger.error(f"TTS upstream returned empty audio for {lang} text")
+            return None
+        if len(data) > self.max_bytes:
+            # 保存後會淘汰其他所有檔案仍超過上限，只回傳這次的內容
+            with self._lock:
+                self.oversized += 1
+            logger.warning(f"TTS audio for {lang} text is {len(data)} bytes, over the cache limit; not caching")
+            return data
+
+        # 先寫入暫存檔再替換，其他 worker 不會讀到寫到一半的檔案
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self.fetched += 1
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO audio_files (hash, size, last_access) VALUES (?, ?, ?)",
+                (key, len(data), time.time())
+            )
+            self._evict(conn, keep=key)
+        return path
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> None:
+        """總大小超過上限時，刪除最久沒有被請求的檔案"""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM audio_files").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT hash, size FROM audio_files ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error(f"Failed to evict cached audio {key}: {e}")
+                continue
+            conn.execute("DELETE FROM audio_files WHERE hash = ?", (key,))
+            conn.execute("DELETE FROM audio_texts WHERE hash = ?", (key,))
+            total -= size
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            files, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio_files"
+            ).fetchone()
+            requests_total = self.hits + self.fetched
+            return {
+                "files": files,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "fetched": self.fetched,
+                "hit_rate": round(self.hits / requests_total, 4) if requests_total else 0.0,
+                "upstream_errors": self.upstream_errors,
+                "oversized": self.oversized,
+                "evicted": self.evicted,
+                "pruned": self.pruned
+            }
+
+
+# 全域的語音快取，未設定對外網址時直接連到 Google TTS
+audio_cache: Optional[AudioCache] = None
+
+
+def init_audio_cache(directory: str, max_bytes: int, public_base_url: str,
+                     upstream_url: str = GOOGLE_TTS_URL, link_ttl: float = 30 * 86400) -> AudioCache:
+    """
+    啟用語音代理與快取
+    :param directory: 語音檔存放目錄
+    :param max_bytes: 語音檔總大小上限
+    :param public_base_url: 對外的服務網址（LINE 只接受 https 連結）
+    :param upstream_url: TTS 服務位址
+    :param link_ttl: 沒有被請求過的連結的有效期（秒）
+    """
+    global audio_cache
+    audio_cache = AudioCache(directory, max_bytes, http_tts_upstream(upstream_url or GOOGLE_TTS_URL),
+                             public_base_url, link_ttl)
+    return audio_cache
+
+
+def get_audio_cache_stats() -> Optional[dict]:
+    return audio_cache.stats() if audio_cache is not None else None
@@ -0,0 +1,101 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Burst:
+    __slots__ = ('texts', 'reply_token', 'started', 'timer')
+
+    def __init__(self, started: float):
+        self.texts: List[str] = []
+        self.reply_token = None
+        self.started = started
+        self.timer = None
+
+
+class ChatDebouncer:
+    """
+    合併同一聊天室同一使用者短時間內連續送出的文字訊息
+
+    在視窗時間內陸續到達的訊息合併成一則使用者訊息，只呼叫一次 LLM，
+    並以最後一則訊息的 reply token 回覆。每則新訊息會重新計時，但從第一則訊息起最多等待 max_wait_ms。
+    群組中不同使用者的訊息分開合併，不會混成同一則訊息。
+
+    此功能需由聊天室自行開啟（opt-in），開關狀態由會話後端保存，多個 worker 之間共享。
+    暫存中的訊息只在收到訊息的 worker 內合併：同一串連發訊息被分到不同 worker 時，各 worker 各自回覆一次。
+    """
+
+    def __init__(self, window_ms: int, on_flush: Callable[[str, str, str, int], None], max_wait_ms: int = None):
+        """
+        :param window_ms: 合併視窗（毫秒）
+        :param on_flush: 視窗結束時呼叫，接收 (chat_id, 合併後的訊息, 最後的 reply token, 合併的訊息數)
+        :param max_wait_ms: 從第一則訊息起的最長等待時間，預設為視窗的三倍
+        """
+        self.window = window_ms / 1000
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else window_ms * 3) / 1000
+        self._on_flush = on_flush
+        self._bursts: Dict[Tuple[str, Optional[str]], _Burst] = {}
+        self._lock = threading.Lock()
+
+        self.bursts = 0
+        self.messages = 0
+
+    @property
+    def available(self) -> bool:
+        """合併視窗為 0 時整個功能停用"""
+        return self.window > 0
+
+    def submit(self, chat_id: str, text: str, reply_token: str, user_id: str = None) -> None:
+        """
+        加入一則訊息，視窗結束後才會合併處理
+        :param user_id: 送出訊息的使用者，群組中依使用者分開合併
+        """
+        key = (chat_id, user_id)
+        now = time.monotonic()
+        with self._lock:
+            burst = self._bursts.get(key)
+            if burst is None:
+                burst = _Burst(now)
+                self._bursts[key] = burst
+            elif burst.timer is not None:
+                burst.timer.cancel()
+
+            burst.texts.append(text)
+            burst.reply_token = reply_token
+            self.messages += 1
+
+            delay = min(self.window, max(burst.started + self.max_wait - now, 0))
+            burst.timer = threading.Timer(delay, self._flush, args=(key, burst))
+            burst.timer.daemon = True
+            burst.timer.start()
+
+    def _flush(self, key: Tuple[str, Optional[str]], burst: _Burst) -> None:
+        chat_id = key[0]
+        with self._lock:
+            # 計時器取消前可能已觸發，只處理目前仍有效的那一批
+            if self._bursts.get(key) is not burst:
+                return
+            del self._bursts[key]
+            self.bursts += 1
+            texts = list(burst.texts)
+            reply_token = burst.reply_token
+
+        if len(texts) > 1:
+            logger.info(f"Merged {len(texts)} messages from {chat_id} into one LLM call")
+        try:
+            self._on_flush(chat_id, "\n".join(texts), reply_token, len(texts))
+        except Exception as e:
+            logger.error(f"Failed to process merged messages for {chat_id}: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window_ms": int(self.window * 1000),
+                "pending_bursts": len(self._bursts),
+                "messages": self.messages,
+                "llm_calls": self.bursts,
+                "llm_calls_saved": self.messages - self.bursts - sum(len(b.texts) for b in self._bursts.values())
+            }
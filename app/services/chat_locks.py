@@ -0,0 +1,77 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Hashable, List
+
+
+class ChatLockManager:
+    """
+    以每個聊天室各自的鎖序列化同一聊天室的會話操作
+
+    - 同一個鍵同時只有一個持有者，因此同一聊天室的請求依序執行（包含等待模型回覆的時間）
+    - 不同聊天室使用不同的鎖，不會因為共用同一把鎖而互相等待一次模型回覆
+    - 鎖以參照計數管理，沒有持有者也沒有等待者時即移除，記憶體用量只與同時進行的聊天室數量有關
+
+    鎖只在單一行程內有效。使用 sqlite 會話後端的多個 worker 之間沒有互斥：
+    同一聊天室的訊息若被不同 worker 同時處理，對話紀錄以最後寫入者為準。
+    """
+
+    def __init__(self):
+        # 鍵 -> [鎖, 持有與等待中的數量]
+        self._locks: Dict[Hashable, List] = {}
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def hold(self, key: Hashable):
+        """持有該鍵對應的鎖，期間同一鍵的其他呼叫端會等待"""
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        lock = entry[0]
+
+        try:
+            wait = 0.0
+            contended = not lock.acquire(blocking=False)
+            if contended:
+                start = time.perf_counter()
+                lock.acquire()
+                wait = time.perf_counter() - start
+
+            with self._lock:
+                self.acquisitions += 1
+                if contended:
+                    self.contended += 1
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
+
+    def __len__(self) -> int:
+        """目前有持有者或等待者的鍵數"""
+        with self._lock:
+            return len(self._locks)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active_keys": len(self._locks),
+                "acquisitions": self.acquisitions,
+                "contended": self.contended,
+                "contention_ratio": round(self.contended / self.acquisitions, 4) if self.acquisitions else 0.0,
+                "avg_wait_ms": round(self.total_wait / self.contended * 1000, 2) if self.contended else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 2)
+            }
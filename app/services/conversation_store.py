@@ -0,0 +1,303 @@
+import re
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 角色以小整數表示，只在送出請求時才轉回 API 需要的字串
+ROLE_SYSTEM = 0
+ROLE_USER = 1
+ROLE_ASSISTANT = 2
+ROLE_NAMES = ('system', 'user', 'assistant')
+
+# 早期對話摘要在請求中的前綴
+SUMMARY_PREFIX = "先前對話摘要："
+
+# 每則訊息在 chat template 中的固定開銷（角色標記、分隔符號）
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# 訊息被截斷時接在結尾的標記
+TRUNCATION_MARK = "…"
+
+# 中日韓文字與全形符號大約一個字一個 token，其餘字元約四個字一個 token
+_WIDE_CHAR_RE = re.compile(r'[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    以本地規則估算訊息的 token 數，不需呼叫 tokenizer
+
+    :param text: 訊息內容
+    :return: 估算的 token 數（含訊息固定開銷）
+    """
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    narrow = len(text) - wide
+    return wide + (narrow + 3) // 4 + MESSAGE_TOKEN_OVERHEAD
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    截斷訊息，使估算的 token 數不超過上限
+
+    :param text: 訊息內容
+    :param max_tokens: token 上限（含訊息固定開銷）
+    :return: 未超過上限時為原訊息，否則為保留開頭並接上截斷標記的訊息
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    # 預留截斷標記的一個 token
+    limit = max_tokens - MESSAGE_TOKEN_OVERHEAD - 1
+    wide = narrow = 0
+    for i, char in enumerate(text):
+        if _WIDE_CHAR_RE.match(char):
+            wide += 1
+        else:
+            narrow += 1
+        if wide + (narrow + 3) // 4 > limit:
+            return text[:i] + TRUNCATION_MARK
+    return text
+
+
+class PromptInterner:
+    """
+    提示詞模板池：相同內容的長字串只保存一份，訊息中以整數參照
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._texts: List[str] = []
+        self._tokens = array('I')
+        self._lock = threading.Lock()
+
+    def intern(self, text: str) -> int:
+        """取得模板的參照編號，第一次出現時才加入模板池"""
+        ref = self._ids.get(text)
+        if ref is not None:
+            return ref
+
+        with self._lock:
+            ref = self._ids.get(text)
+            if ref is None:
+                ref = len(self._texts)
+                self._texts.append(text)
+                self._tokens.append(estimate_tokens(text))
+                self._ids[text] = ref
+            return ref
+
+    def text(self, ref: int) -> str:
+        return self._texts[ref]
+
+    def tokens(self, ref: int) -> int:
+        """模板的 token 數在加入模板池時只計算一次"""
+        return self._tokens[ref]
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+
+# 全域共用的模板池（系統提示詞、單字學習提示詞）
+prompt_interner = PromptInterner()
+
+
+class Conversation:
+    """
+    單一聊天室的對話紀錄
+
+    - 系統提示詞固定保存於 system，不佔用環形緩衝區，修剪時永遠保留
+    - 其餘訊息存放在容量固定的環形緩衝區，滿了之後新訊息覆蓋最舊的訊息
+    - 內容為 int 時代表模板池參照，為 str 時代表一般文字
+    - 每則訊息的 token 數在加入時計算一次，並維護總數，修剪時不需重新計算
+    - 被修剪掉的早期對話可濃縮成 summary，送出請求時接在系統提示詞之後
+    """
+    __slots__ = ('system', 'capacity', 'tokens', 'summary', 'summary_tokens',
+                 '_roles', '_contents', '_token_counts', '_head', '_size')
+
+    def __init__(self, system_prompt: str, capacity: int = 20):
+        self.system = prompt_interner.intern(system_prompt)
+        self.capacity = capacity
+        self.tokens = 0
+        self.summary = None
+        self.summary_tokens = 0
+        self._roles = bytearray()
+        self._contents = []
+        self._token_counts = array('I')
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def system_tokens(self) -> int:
+        """系統提示詞與早期對話摘要的 token 數"""
+        return prompt_interner.tokens(self.system) + self.summary_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        """系統提示詞加上所有訊息的估算 token 數"""
+        return self.system_tokens + self.tokens
+
+    def append(self, role: int, content: str, intern: bool = False) -> Optional[Tuple[int, str]]:
+        """
+        加入一則訊息
+
+        :param role: 訊息角色（ROLE_USER / ROLE_ASSISTANT）
+        :param content: 訊息內容
+        :param intern: 是否將內容視為重複使用的模板，只保存參照
+        :return: 若緩衝區已滿，回傳被覆蓋的 (role, content)，否則為 None
+        """
+        if intern:
+            stored = prompt_interner.intern(content)
+            token_count = prompt_interner.tokens(stored)
+        else:
+            stored = content
+            token_count = estimate_tokens(content)
+
+        evicted = None
+        if self._size == self.capacity:
+            evicted = self._pop_oldest()
+
+        tail = self._head + self._size
+        if tail == len(self._contents) and tail < self.capacity:
+            self._roles.append(role)
+            self._contents.append(stored)
+            self._token_counts.append(token_count)
+        else:
+            slot = tail % self.capacity
+            self._roles[slot] = role
+            self._contents[slot] = stored
+            self._token_counts[slot] = token_count
+
+        self._size += 1
+        self.tokens += token_count
+        return evicted
+
+    def set_summary(self, summary: Optional[str]) -> None:
+        """更新早期對話摘要"""
+        summary_tokens = estimate_tokens(SUMMARY_PREFIX + summary) if summary else 0
+        self.summary = summary or None
+        self.summary_tokens = summary_tokens
+
+    def trim_to_budget(self, token_budget: int) -> List[Tuple[int, str]]:
+        """
+        從最舊的訊息開始移除，直到總 token 數不超過預算
+
+        每則訊息最多被移除一次，因此攤提後每次加入訊息的修剪成本為 O(1)。
+        系統提示詞與最新一輪（最新一則使用者訊息與其後的回覆）永遠保留，只移除較早的對話；
+        移除後若開頭是助手回覆，一併移除以維持問答成對。
+        只剩最新一輪仍超過預算時，截斷這一輪的訊息內容。
+
+        :param token_budget: 含系統提示詞的 token 預算
+        :return: 被移除的 (role, content)，依時間順序
+        """
+        evicted = []
+        budget = token_budget - self.system_tokens
+        pinned = self._newest_turn_size()
+        while self._size > pinned and (self.tokens > budget or self._roles[self._head] != ROLE_USER):
+            evicted.append(self._pop_oldest())
+        if self.tokens > budget:
+            self._truncate_newest_turn(budget)
+        return evicted
+
+    def iter_messages(self) -> Iterator[Tuple[int, str]]:
+        """依時間順序列出 (role, content)，不含系統提示詞"""
+        for i in range(self._size):
+            slot = (self._head + i) % self.capacity
+            yield self._roles[slot], self._resolve(self._contents[slot])
+
+    def to_messages(self, token_budget: Optional[int] = None) -> List[dict]:
+        """
+        轉換成 Groq API 需要的訊息格式
+
+        :param token_budget: 若指定，只取最新且總數不超過預算的訊息（不修改紀錄本身），
+                             用於 context 較小的備用模型
+        """
+        skip = 0
+        if token_budget is not None:
+            remaining = token_budget - self.system_tokens
+            kept = 0
+            for i in range(self._size - 1, -1, -1):
+                remaining -= self._token_counts[(self._head + i) % self.capacity]
+                if remaining < 0 and kept:
+                    break
+                kept += 1
+            skip = self._size - kept
+            # 截斷後不以助手回覆開頭
+            while skip < self._size - 1 and self._roles[(self._head + skip) % self.capacity] != ROLE_USER:
+                skip += 1
+
+        messages = [{"role": ROLE_NAMES[ROLE_SYSTEM], "content": prompt_interner.text(self.system)}]
+        summary = self.summary
+        if summary:
+            messages.append({"role": ROLE_NAMES[ROLE_SYSTEM], "content": SUMMARY_PREFIX + summary})
+        for i, (role, content) in enumerate(self.iter_messages()):
+            if i >= skip:
+                messages.append({"role": ROLE_NAMES[role], "content": content})
+        return messages
+
+    def dump(self) -> dict:
+        """轉成可序列化的精簡格式（模板以原文保存，讓其他行程可以重新建立參照）"""
+        messages = []
+        for i in range(self._size):
+            slot = (self._head + i) % self.capacity
+            content = self._contents[slot]
+            if type(content) is int:
+                messages.append([self._roles[slot], prompt_interner.text(content), 1])
+            else:
+                messages.append([self._roles[slot], content])
+        return {
+            "system": prompt_interner.text(self.system),
+            "capacity": self.capacity,
+            "summary": self.summary,
+            "messages": messages
+        }
+
+    @classmethod
+    def load(cls, data: dict) -> 'Conversation':
+        """由 dump() 的結果還原對話紀錄"""
+        conversation = cls(data["system"], capacity=data["capacity"])
+        conversation.set_summary(data.get("summary"))
+        for message in data["messages"]:
+            conversation.append(message[0], message[1], intern=len(message) > 2)
+        return conversation
+
+    def _newest_turn_size(self) -> int:
+        """最新一輪的訊息數：從最新一則使用者訊息到結尾，沒有使用者訊息時為 0"""
+        for i in range(self._size - 1, -1, -1):
+            if self._roles[(self._head + i) % self.capacity] == ROLE_USER:
+                return self._size - i
+        return 0
+
+    def _truncate_newest_turn(self, budget: int) -> None:
+        """將最新一輪的訊息截斷到預算內，較短的訊息先保留完整，剩下的預算平均分給較長的訊息"""
+        slots = [(self._head + i) % self.capacity for i in range(self._size - self._newest_turn_size(), self._size)]
+        slots.sort(key=lambda slot: self._token_counts[slot])
+        remaining = budget
+        for i, slot in enumerate(slots):
+            share = max(remaining // (len(slots) - i), 0)
+            if self._token_counts[slot] > share:
+                content = truncate_to_tokens(self._resolve(self._contents[slot]), share)
+                token_count = estimate_tokens(content)
+                self.tokens += token_count - self._token_counts[slot]
+                self._contents[slot] = content
+                self._token_counts[slot] = token_count
+            remaining -= self._token_counts[slot]
+
+    def _pop_oldest(self) -> Tuple[int, str]:
+        slot = self._head
+        evicted = (self._roles[slot], self._resolve(self._contents[slot]))
+        self.tokens -= self._token_counts[slot]
+        self._contents[slot] = None
+        self._head = (slot + 1) % self.capacity
+        self._size -= 1
+        if self._size == 0:
+            # 清空後從頭開始，讓尚未填滿的緩衝區可以繼續以 append 成長
+            self._head = 0
+            self._roles = bytearray()
+            self._contents = []
+            self._token_counts = array('I')
+        return evicted
+
+    @staticmethod
+    def _resolve(content) -> str:
+        return prompt_interner.text(content) if type(content) is int else content
@@ -0,0 +1,90 @@
+import logging
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+
+from app.services.conversation_store import Conversation
+
+logger = logging.getLogger(__name__)
+
+# 單則被移除訊息送去摘要時的最大字數，避免摘要請求本身過大
+MAX_TURN_CHARS = 500
+
+
+class ConversationSummarizer:
+    """
+    在背景將被修剪掉的對話合併進摘要，不佔用使用者請求的時間
+
+    同一聊天室在背景處理前累積的多批被移除訊息會合併成一次摘要請求。
+    摘要完成後重新讀取最新的對話紀錄再寫回，避免覆蓋處理期間新增的對話。
+    """
+
+    def __init__(self, summarize: Callable[[str, str, Optional[str], List[Tuple[int, str]]], Optional[str]],
+                 load: Callable[[str, str], Optional[Conversation]],
+                 save: Callable[[str, str, Conversation], None],
+                 hold: Callable[[str, str], ContextManager] = None):
+        """
+        :param summarize: 摘要函式，接收 (session_type, chat_id, 既有摘要, 被移除的 (role, content))，回傳新摘要，失敗回傳 None
+        :param load: 讀取對話紀錄，接收 (session_type, chat_id)
+        :param save: 寫回對話紀錄，接收 (session_type, chat_id, conversation)
+        :param hold: 取得該聊天室的鎖，寫回摘要時持有，避免與同時進行的對話互相覆蓋
+        """
+        self._summarize = summarize
+        self._load = load
+        self._save = save
+        self._hold = hold or (lambda session_type, chat_id: nullcontext())
+        self._pending: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, session_type: str, chat_id: str, evicted: List[Tuple[int, str]]) -> None:
+        """排入被移除的訊息，由背景執行緒更新該對話的摘要"""
+        if not evicted:
+            return
+
+        key = (session_type, chat_id)
+        turns = [(role, content[:MAX_TURN_CHARS]) for role, content in evicted]
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.extend(turns)
+                return
+            self._pending[key] = turns
+            self._ensure_worker()
+        self._queue.put(key)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="conversation-summarizer", daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            key = self._queue.get()
+            with self._lock:
+                turns = self._pending.pop(key, None)
+            if not turns:
+                continue
+
+            try:
+                conversation = self._load(*key)
+                if conversation is None:
+                    continue
+
+                summary = self._summarize(*key, conversation.summary, turns)
+                if not summary:
+                    continue
+
+                # 摘要期間對話可能已更新，寫回最新的紀錄
+                with self._hold(*key):
+                    conversation = self._load(*key)
+                    if conversation is None:
+                        continue
+                    conversation.set_summary(summary)
+                    self._save(*key, conversation)
+                logger.info(f"Updated conversation summary for {key[0]}/{key[1]} "
+                            f"({len(turns)} evicted messages, {conversation.summary_tokens} tokens)")
+            except Exception as e:
+                logger.error(f"Failed to summarize evicted messages for {key[0]}/{key[1]}: {e}")
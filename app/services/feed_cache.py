@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class StaleWhileRevalidateCache:
+    """
+    過期後仍可先使用舊內容的快取（stale-while-revalidate）
+
+    - 新鮮期內直接回傳
+    - 過了新鮮期但仍在可用期內：立即回傳舊內容，並在背景更新一次（同一個鍵同時只有一個更新）
+    - 沒有內容或超過可用期：同步取得，同時的相同請求只取得一次
+    """
+
+    def __init__(self, fetch: Callable[[Hashable], Any], fresh_ttl: float = 300, stale_ttl: float = 3600,
+                 name: str = "feed"):
+        """
+        :param fetch: 取得內容的函式，接收鍵，回傳內容
+        :param fresh_ttl: 新鮮期（秒）
+        :param stale_ttl: 可用期（秒），超過後不再使用舊內容
+        :param name: 日誌中使用的名稱
+        """
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = max(stale_ttl, fresh_ttl)
+        self.name = name
+        self._fetch = fetch
+        self._flight = SingleFlight()
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, key: Hashable) -> Any:
+        """取得內容，沒有可用的內容且取得失敗時拋出例外"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry[1] if entry is not None else None
+            if age is not None and age < self.fresh_ttl:
+                self.fresh_hits += 1
+                return entry[0]
+            if age is not None and age < self.stale_ttl:
+                self.stale_hits += 1
+                refresh = key not in self._refreshing
+                if refresh:
+                    self._refreshing.add(key)
+            else:
+                self.misses += 1
+                entry = None
+
+        if entry is None:
+            value, _ = self._flight.do(key, lambda: self._load(key))
+            return value
+
+        if refresh:
+            threading.Thread(target=self._refresh, args=(key,), name=f"{self.name}-refresh", daemon=True).start()
+        return entry[0]
+
+    def contains(self, key: Hashable) -> bool:
+        """是否有仍可使用的內容（新鮮或在可用期內）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[1] < self.stale_ttl
+
+    def _load(self, key: Hashable) -> Any:
+        value = self._fetch(key)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+        return value
+
+    def _refresh(self, key: Hashable) -> None:
+        try:
+            self._flight.do(key, lambda: self._load(key))
+            with self._lock:
+                self.refreshes += 1
+        except Exception as e:
+            # 更新失敗時保留舊內容，直到超過可用期
+            with self._lock:
+                self.refresh_errors += 1
+            logger.error(f"Background {self.name} refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.fresh_hits + self.stale_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "fresh_hits": self.fresh_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.fresh_hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors
+            }
@@ -0,0 +1,228 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import httpx
+from groq import AsyncGroq
+
+logger = logging.getLogger(__name__)
+
+
+# 請求的優先等級：即時回覆使用者的請求優先於排程等批次工作
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+_current_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """在此區塊內（同一執行緒）送出的請求都使用指定的優先等級"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class ModelBusyError(Exception):
+    """模型的同時請求數已滿，且在等待時間內未取得名額"""
+
+
+class _PriorityGate:
+    """
+    單一模型的同時請求名額，依優先等級分配（只在事件迴圈執行緒中使用）
+
+    - 有名額釋出時，先分配給等待中的即時請求，同等級依到達順序
+    - 批次請求最多佔用 batch_limit 個名額，其餘保留給即時請求
+    """
+
+    def __init__(self, limit: int, batch_limit: int):
+        self.limit = limit
+        self.batch_limit = batch_limit
+        self.active = 0
+        self.active_batch = 0
+        self._waiters = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int, timeout: float) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        if future.done():
+            return
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            # 逾時的同時剛好分配到名額，要歸還
+            if future.done() and not future.cancelled():
+                self.release(priority)
+            raise
+
+    def release(self, priority: int) -> None:
+        self.active -= 1
+        if priority != PRIORITY_INTERACTIVE:
+            self.active_batch -= 1
+        self._dispatch()
+
+    def waiting(self) -> Dict[int, int]:
+        counts = {}
+        for priority, _, future in list(self._waiters):
+            if not future.done():
+                counts[priority] = counts.get(priority, 0) + 1
+        return counts
+
+    def _dispatch(self) -> None:
+        while self._waiters and self.active < self.limit:
+            entry = heapq.heappop(self._waiters)
+            priority, _, future = entry
+            if future.done():
+                # 已逾時放棄的請求
+                continue
+            if priority != PRIORITY_INTERACTIVE and self.active_batch >= self.batch_limit:
+                # 佇列依優先等級排序，之後剩下的都是批次請求
+                heapq.heappush(self._waiters, entry)
+                break
+            self.active += 1
+            if priority != PRIORITY_INTERACTIVE:
+                self.active_batch += 1
+            future.set_result(None)
+
+
+class AsyncGroqClient:
+    """
+    在專用事件迴圈上執行的 Groq 非同步客戶端
+
+    - 所有請求共用一個 httpx 連線池（keep-alive），不需每個請求佔用一條執行緒
+    - 每個模型有各自的同時請求上限，避免瞬間大量請求觸發連鎖 429
+    - 名額依優先等級分配：排程等批次工作排在即時請求之後，且只能使用部分名額
+    - 提供同步介面 chat_completion() 給既有的同步呼叫端使用
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, default_concurrency: int = 4,
+                 model_concurrency: Dict[str, int] = None, queue_timeout: float = 5.0,
+                 max_connections: int = 32, max_keepalive_connections: int = 16,
+                 batch_share: float = 0.5, batch_queue_timeout: float = 60.0, max_retries: int = 2):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.default_concurrency = default_concurrency
+        self.model_concurrency = dict(model_concurrency or {})
+        self.queue_timeout = queue_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.batch_share = batch_share
+        self.batch_queue_timeout = batch_queue_timeout
+        self.max_retries = max_retries
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[AsyncGroq] = None
+        self._gates: Dict[str, _PriorityGate] = {}
+        # priority -> [取得名額的次數, 總等待秒數, 最長等待秒數, 逾時次數]
+        self._queue_stats: Dict[int, list] = {priority: [0, 0.0, 0.0, 0] for priority in PRIORITY_NAMES}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """啟動事件迴圈執行緒（fork 後的 worker 會重新建立）"""
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="groq-event-loop", daemon=True)
+            thread.start()
+
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=30
+                ),
+                timeout=httpx.Timeout(30.0, connect=5.0)
+            )
+            self._client = AsyncGroq(api_key=self.api_key, base_url=self.base_url, http_client=http_client,
+                                     max_retries=self.max_retries)
+            self._gates = {}
+            self._pid = os.getpid()
+            self._loop = loop
+            logger.info(f"Groq event loop started (pid {self._pid})")
+            return loop
+
+    def _gate(self, model: str) -> _PriorityGate:
+        # 只在事件迴圈執行緒中呼叫，不需加鎖
+        gate = self._gates.get(model)
+        if gate is None:
+            limit = self.model_concurrency.get(model, self.default_concurrency)
+            gate = _PriorityGate(limit, max(1, int(limit * self.batch_share)))
+            self._gates[model] = gate
+        return gate
+
+    async def _chat_completion(self, model: str, priority: int, **kwargs):
+        gate = self._gate(model)
+        stats = self._queue_stats[priority]
+        timeout = self.queue_timeout if priority == PRIORITY_INTERACTIVE else self.batch_queue_timeout
+
+        start = asyncio.get_running_loop().time()
+        try:
+            await gate.acquire(priority, timeout)
+        except asyncio.TimeoutError:
+            stats[3] += 1
+            raise ModelBusyError(f"Model {model} is at its concurrency limit")
+
+        wait = asyncio.get_running_loop().time() - start
+        stats[0] += 1
+        stats[1] += wait
+        stats[2] = max(stats[2], wait)
+        try:
+            return await self._client.chat.completions.create(model=model, **kwargs)
+        finally:
+            gate.release(priority)
+
+    def submit_chat_completion(self, model: str, priority: int = None, **kwargs) -> Future:
+        """
+        送出非阻塞的聊天請求
+        :param priority: 優先等級，預設使用呼叫端目前的 llm_priority（未設定時為即時請求）
+        :return: concurrent.futures.Future，結果為 Groq 的 ChatCompletion
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._chat_completion(model, priority, **kwargs), loop)
+
+    def chat_completion(self, model: str, priority: int = None, **kwargs):
+        """同步介面：送出請求並等待結果"""
+        return self.submit_chat_completion(model, priority, **kwargs).result()
+
+    def in_flight(self) -> Dict[str, int]:
+        """各模型目前佔用的同時請求數"""
+        return {model: gate.active for model, gate in list(self._gates.items()) if gate.active}
+
+    def queue_stats(self) -> dict:
+        """各優先等級等待名額的次數與時間"""
+        waiting = {}
+        for gate in list(self._gates.values()):
+            for priority, count in gate.waiting().items():
+                waiting[priority] = waiting.get(priority, 0) + count
+
+        result = {}
+        for priority, (count, total_wait, max_wait, timeouts) in self._queue_stats.items():
+            result[PRIORITY_NAMES[priority]] = {
+                "acquired": count,
+                "waiting": waiting.get(priority, 0),
+                "timeouts": timeouts,
+                "avg_wait_ms": round(total_wait / count * 1000, 2) if count else 0.0,
+                "max_wait_ms": round(max_wait * 1000, 2)
+            }
+        return result
@@ -1,12 +1,22 @@
 import logging
-from typing import Union
+import time
+from typing import Tuple, Union
 
-from groq import Groq
 from linebot.models import (
     FlexSendMessage, BubbleContainer, BoxComponent,
-    TextComponent, BubbleStyle, BlockStyle, SeparatorComponent
+    TextComponent, BubbleStyle, BlockStyle, SeparatorComponent,
+    ButtonComponent, PostbackAction
 )
 
+from app.services.chat_locks import ChatLockManager
+from app.services.conversation_store import Conversation, ROLE_USER, ROLE_ASSISTANT, ROLE_NAMES
+from app.services.conversation_summarizer import ConversationSummarizer
+from app.services.groq_async import AsyncGroqClient, PRIORITY_BATCH
+from app.services.model_router import ChatModelRouter
+from app.services.response_cache import NearDuplicateCache
+from app.services.session_backend import SessionBackend, MemorySessionBackend, create_session_backend
+from app.services.single_flight import SingleFlight
+from app.services.token_usage import TokenUsageTracker, SHARED_CHAT_ID
 from app.utils.theme import COLOR_THEME
 
 logger = logging.getLogger(__name__)
@@ -17,23 +27,74 @@ logging.getLogger("groq._base_client").setLevel(logging.WARNING)
 
 groq_client = None
 
+# 各模型的同時請求上限，未列出的模型使用 GROQ_MODEL_CONCURRENCY
+# 每分鐘 token 額度較低的模型給較小的上限
+MODEL_CONCURRENCY_LIMITS = {
+    "mistral-saba-24b": 2,
+    "meta-llama/llama-4-maverick-17b-128e-instruct": 2,
+    "qwen-qwq-32b": 2,
+    "deepseek-r1-distill-llama-70b": 2,
+    "llama3-70b-8192": 2,
+    "llama3-8b-8192": 2,
+    "allam-2-7b": 2,
+}
+
 
-def get_groq_client(GROQ_API_KEY) -> Groq:
+def get_groq_client(GROQ_API_KEY, default_concurrency: int = 4, max_connections: int = 32,
+                    base_url: str = None, max_retries: int = 2) -> AsyncGroqClient:
     global groq_client
     if groq_client is None:
-        groq_client = Groq(api_key=GROQ_API_KEY)
+        groq_client = AsyncGroqClient(
+            api_key=GROQ_API_KEY,
+            base_url=base_url or None,
+            default_concurrency=default_concurrency,
+            model_concurrency=MODEL_CONCURRENCY_LIMITS,
+            max_connections=max_connections,
+            max_retries=max_retries
+        )
     return groq_client
 
 
-user_sessions = {
-    'chat': {},  # 一般聊天
-    'english': {},  # 英文學習
-    'japanese': {},  # 日文學習
-}
+# 對話紀錄與 AI 回應狀態的儲存後端，預設為單一行程的記憶體
+session_backend: SessionBackend = MemorySessionBackend()
+
+
+def init_session_backend(backend: str, db_path: str = None, flush_interval: float = 0.2) -> SessionBackend:
+    """
+    設定會話儲存後端，多個 worker 時使用 sqlite 讓同一主機上的行程共享對話與 AI 狀態
+    :param backend: 'memory' 或 'sqlite'
+    :param db_path: SQLite 資料庫路徑
+    :param flush_interval: 批次寫入間隔（秒）
+    """
+    global session_backend
+    session_backend = create_session_backend(backend, db_path, flush_interval)
+    return session_backend
+
+
+# Token 用量統計與每日額度，預設只記錄在行程內
+usage_tracker = TokenUsageTracker()
+
+
+def init_usage_tracker(db_path: str = None, flush_interval: float = 30.0, daily_budget: int = 0) -> TokenUsageTracker:
+    """
+    設定 token 用量統計
+    :param db_path: SQLite 資料庫路徑，多個 worker 共用同一個檔案以合併用量
+    :param flush_interval: 寫入間隔（秒）
+    :param daily_budget: 每個聊天室每日的 token 額度，0 表示不限制
+    """
+    global usage_tracker
+    usage_tracker = TokenUsageTracker(db_path or ":memory:", flush_interval=flush_interval, daily_budget=daily_budget)
+    return usage_tracker
 
-# 追蹤用戶的 AI 回應狀態
-chat_ai_status = {}
+# 保留的最大對話輪數（一來一往算一輪），實際送出的歷史由 token 預算決定
+MAX_HISTORY_TURNS = 20
 
+# 這些會話被修剪掉的早期對話會在背景濃縮成摘要
+SUMMARY_SESSION_TYPES = ('chat',)
+
+# 產生摘要使用的便宜快速模型
+SUMMARY_MODEL = "llama-3.1-8b-instant"
+SUMMARY_MAX_TOKENS = 300
 
 def toggle_ai_status(chat_id: str) -> bool:
     """
@@ -41,9 +102,9 @@ def toggle_ai_status(chat_id: str) -> bool:
     :param chat_id: 聊天室 ID（群組 ID 或用戶 ID）
     :return: 切換後的狀態（True 表示開啟，False 表示關閉）
     """
-    current_status = chat_ai_status.get(chat_id, False)
-    chat_ai_status[chat_id] = not current_status
-    return chat_ai_status[chat_id]
+    new_status = not session_backend.get_ai_status(chat_id)
+    session_backend.set_ai_status(chat_id, new_status)
+    return new_status
 
 
 def get_ai_status(chat_id: str) -> bool:
@@ -52,7 +113,27 @@ def get_ai_status(chat_id: str) -> bool:
     :param chat_id: 聊天室 ID（群組 ID 或用戶 ID）
     :return: 當前狀態（True 表示開啟，False 表示關閉）
     """
-    return chat_ai_status.get(chat_id, False)
+    return session_backend.get_ai_status(chat_id)
+
+
+def toggle_debounce_status(chat_id: str) -> bool:
+    """
+    切換聊天室的連發訊息合併功能
+    :param chat_id: 聊天室 ID（群組 ID 或用戶 ID）
+    :return: 切換後的狀態（True 表示開啟，False 表示關閉）
+    """
+    new_status = not session_backend.get_debounce_status(chat_id)
+    session_backend.set_debounce_status(chat_id, new_status)
+    return new_status
+
+
+def get_debounce_status(chat_id: str) -> bool:
+    """
+    獲取聊天室的連發訊息合併狀態
+    :param chat_id: 聊天室 ID（群組 ID 或用戶 ID）
+    :return: 當前狀態（True 表示開啟，False 表示關閉）
+    """
+    return session_backend.get_debounce_status(chat_id)
 
 
 # 20250505 根據模型性能和限制重新排序的備用模型列表
@@ -72,6 +153,74 @@ FALLBACK_MODELS = [
     "allam-2-7b",  # 每分鐘 6,000 tokens、每日 7,000 請求
 ]
 
+# 各模型的 (context window, 每次請求的歷史 token 上限)
+# 歷史上限用來控制成本：每分鐘 token 額度越低的模型，送出的歷史越短
+MODEL_TOKEN_LIMITS = {
+    "compound-beta": (131072, 6000),
+    "meta-llama/llama-4-scout-17b-16e-instruct": (131072, 6000),
+    "gemma2-9b-it": (8192, 4000),
+    "llama-guard-3-8b": (8192, 4000),
+    "llama-3.3-70b-versatile": (131072, 4000),
+    "mistral-saba-24b": (32768, 2000),
+    "meta-llama/llama-4-maverick-17b-128e-instruct": (131072, 2000),
+    "qwen-qwq-32b": (131072, 2000),
+    "deepseek-r1-distill-llama-70b": (131072, 2000),
+    "llama-3.1-8b-instant": (131072, 2000),
+    "llama3-70b-8192": (8192, 2000),
+    "llama3-8b-8192": (8192, 2000),
+    "allam-2-7b": (4096, 2000),
+}
+DEFAULT_TOKEN_LIMITS = (8192, 2000)
+
+# 回覆的最大 token 數
+MAX_COMPLETION_TOKENS = 2000
+
+# 未指定模型時使用的大模型
+DEFAULT_CHAT_MODEL = "llama-3.3-70b-versatile"
+
+# 這些會話未指定模型時依訊息複雜度選擇模型，簡單訊息交給快速小模型
+ROUTED_SESSION_TYPES = ('chat',)
+FAST_CHAT_MODEL = "llama-3.1-8b-instant"
+FAST_MAX_COMPLETION_TOKENS = 300
+
+
+def get_history_budget(model: str, max_tokens: int = MAX_COMPLETION_TOKENS) -> int:
+    """
+    計算送給指定模型的歷史 token 預算（含系統提示詞）
+    :param model: 模型名稱
+    :param max_tokens: 預留給回覆的 token 數
+    :return: 歷史 token 預算
+    """
+    context_window, history_cap = MODEL_TOKEN_LIMITS.get(model, DEFAULT_TOKEN_LIMITS)
+    return max(min(context_window - max_tokens, history_cap), 0)
+
+
+# 所有模型都失敗時回覆的訊息
+FAILURE_REPLY = "很抱歉，我現在暫時無法處理您的請求。請稍後再試。"
+
+# 結構化內容（單字等）要求模型以 JSON 物件回覆
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+# 聊天室當日 token 額度用完時回覆的訊息
+BUDGET_EXCEEDED_REPLY = "今天的 AI 使用額度已經用完了，請明天再試。"
+
+# 合併同時進行的相同請求
+llm_single_flight = SingleFlight()
+
+# 同一聊天室的會話操作序列化（每個聊天室各自一把鎖，只在行程內有效）
+chat_locks = ChatLockManager()
+
+# 一般聊天的模型分流
+chat_model_router = ChatModelRouter(FAST_CHAT_MODEL, FAST_MAX_COMPLETION_TOKENS)
+
+# 這些會話的第一輪對話（沒有上下文）遇到近似的問題時直接使用快取的回覆
+# 回覆只在同一聊天室內重複使用，只有問候、道謝等固定用語的回覆跨聊天室共用
+CACHED_SESSION_TYPES = ('chat',)
+SHARED_CACHE_ROUTES = ('greeting',)
+# 超過此長度的訊息不太會重複，不查詢也不保存
+MAX_CACHEABLE_CHARS = 200
+response_cache = NearDuplicateCache(threshold=0.85, ttl=3600, max_entries=2000)
+
 SYSTEM_PROMPTS = {
     'chat':
         """
@@ -97,14 +246,14 @@ SYSTEM_PROMPTS = {
 }
 
 
-def chat_with_groq(chat_id: str, message: str, model: str = "llama-3.3-70b-versatile",
+def chat_with_groq(chat_id: str, message: str, model: str = None,
                    session_type: str = "chat") -> Union[str, None]:
     """
     使用 Groq 語言模型進行對話，支援多輪對話和不同功能的會話隔離。如果指定模型發生異常，將自動嘗試備用模型。
 
     :param chat_id: 聊天室 ID（群組 ID 或用戶 ID）
     :param message: 使用者輸入訊息
-    :param model: 使用的模型名稱，預設為 llama-3.3-70b-versatile
+    :param model: 使用的模型名稱，未指定時一般聊天依訊息複雜度選擇模型，其他會話使用 llama-3.3-70b-versatile
     :param session_type: 會話類型 ('chat', 'english', 'japanese')，預設為 'chat'
     :return: 模型回應的內容，如果是一般聊天且 AI 功能關閉則返回 None
     """
@@ -112,83 +261,259 @@ def chat_with_groq(chat_id: str, message: str, model: str = "llama-3.3-70b-versa
     if session_type == 'chat' and not get_ai_status(chat_id):
         return None
 
+    # 呼叫前檢查該聊天室今日的 token 額度
+    if not usage_tracker.within_budget(chat_id):
+        logger.warning(f"Daily token budget exceeded for chat_id {chat_id}, skipping {session_type} request")
+        return BUDGET_EXCEEDED_REPLY
+
+    # 同一聊天室的會話操作依序執行，避免同時的請求互相覆蓋對話紀錄
+    with chat_locks.hold((session_type, chat_id)):
+        return _chat_with_history(chat_id, message, model, session_type)
+
+
+def _chat_with_history(chat_id: str, message: str, model: Union[str, None], session_type: str) -> str:
+    """帶入並更新該聊天室的對話紀錄（呼叫端需持有該聊天室的鎖）"""
     # 初始化使用者對話紀錄，使用對應的系統提示詞
-    if chat_id not in user_sessions[session_type]:
-        user_sessions[session_type][chat_id] = [
-            {"role": "system", "content": SYSTEM_PROMPTS[session_type]}
-        ]
+    conversation = session_backend.get_conversation(session_type, chat_id)
+    if conversation is None:
+        conversation = Conversation(SYSTEM_PROMPTS[session_type], capacity=MAX_HISTORY_TURNS * 2)
+
+    # 未指定模型時依訊息長度、語言、疑問字詞與對話深度選擇模型
+    decision = None
+    max_tokens = MAX_COMPLETION_TOKENS
+    if model is None and session_type in ROUTED_SESSION_TYPES:
+        decision = chat_model_router.route(message, len(conversation), DEFAULT_CHAT_MODEL, MAX_COMPLETION_TOKENS)
+        model, max_tokens = decision.model, decision.max_tokens
+    model = model or DEFAULT_CHAT_MODEL
+    # 修剪會永久刪除對話紀錄，因此依大模型的預算保留；分流到預算較小的模型時，只在送出請求時截取放得下的部分
+    history_budget = max(get_history_budget(DEFAULT_CHAT_MODEL), get_history_budget(model, max_tokens))
+
+    # 沒有任何上下文的第一輪對話，回覆只取決於訊息本身，可以重複使用
+    cacheable = (session_type in CACHED_SESSION_TYPES and len(conversation) == 0
+                 and conversation.summary is None and len(message) <= MAX_CACHEABLE_CHARS)
+    shared_reply = decision is not None and decision.reason in SHARED_CACHE_ROUTES
+    cache_partition = (session_type, SHARED_CHAT_ID if shared_reply else chat_id)
 
     # 加入使用者訊息
-    user_sessions[session_type][chat_id].append({"role": "user", "content": message})
+    evicted = []
+    overflow = conversation.append(ROLE_USER, message)
+    if overflow:
+        evicted.append(overflow)
+
+    # 依 token 預算修剪歷史，只保留放得下的最新對話
+    evicted.extend(conversation.trim_to_budget(history_budget))
+
+    reply = response_cache.get(cache_partition, message) if cacheable else None
+    if reply is not None:
+        used_model = "response cache"
+    else:
+        # 分流的快速模型或備用模型的預算可能較小，只取放得下的最新對話（不修改對話紀錄）
+        start = time.perf_counter()
+        reply, used_model = _complete_with_fallback(
+            lambda current_model: conversation.to_messages(get_history_budget(current_model, max_tokens)),
+            model, session_type, chat_id, max_tokens=max_tokens
+        )
+        latency = time.perf_counter() - start
+
+        if decision is not None:
+            chat_model_router.observe(decision.route, latency)
+            logger.info(f"Routed chat_id {chat_id} to {decision.route} model {model} ({decision.reason}), "
+                        f"answered by {used_model} in {latency * 1000:.0f} ms")
 
+        if reply is not None and cacheable:
+            response_cache.put(cache_partition, message, reply)
+
+    if reply is None:
+        # 所有模型都失敗，清理該聊天室的會話記錄
+        logger.warning(f"Clearing session for chat_id {chat_id} due to repeated failures")
+        session_backend.delete_conversation(session_type, chat_id)
+        return FAILURE_REPLY
+
+    # 加入機器人回應到對話紀錄，超過保留輪數時由環形緩衝區覆蓋最舊的訊息
+    overflow = conversation.append(ROLE_ASSISTANT, reply)
+    if overflow:
+        evicted.append(overflow)
+    evicted.extend(conversation.trim_to_budget(history_budget))
+    session_backend.save_conversation(session_type, chat_id, conversation)
+
+    # 被修剪掉的早期對話交給背景執行緒濃縮成摘要，之後的請求只送摘要加上近期對話
+    if evicted and session_type in SUMMARY_SESSION_TYPES:
+        conversation_summarizer.submit(session_type, chat_id, evicted)
+
+    # 記錄使用了哪個模型
+    logger.info(f"Response for user {chat_id} (session: {session_type}) was generated by model {used_model}")
+    return reply
+
+
+def generate_json(chat_id: str, message: str, session_type: str,
+                  shared: bool = False) -> Tuple[Union[str, None], Union[str, None]]:
+    """
+    以 JSON 物件模式送出不帶對話紀錄的請求（結構化內容使用）
+
+    :param shared: 不屬於單一聊天室的請求，相同的同時請求共用同一次 API 呼叫的結果
+    :return: (回應內容, 使用的模型)，額度用完或所有模型都失敗時為 (None, None)
+    """
+    if shared:
+        return _complete_stateless(chat_id, message, DEFAULT_CHAT_MODEL, session_type, SHARED_CHAT_ID,
+                                   JSON_OBJECT_FORMAT)
+
+    if not usage_tracker.within_budget(chat_id):
+        logger.warning(f"Daily token budget exceeded for chat_id {chat_id}, skipping {session_type} request")
+        return None, None
+
+    return _complete_stateless(chat_id, message, DEFAULT_CHAT_MODEL, session_type, chat_id, JSON_OBJECT_FORMAT)
+
+
+def _complete_stateless(chat_id: str, message: str, model: str, session_type: str, usage_chat_id: str,
+                        response_format: dict = None) -> Tuple[Union[str, None], Union[str, None]]:
+    """
+    不帶對話紀錄的請求：以正規化後的 (模型, 會話類型, 回覆格式, 訊息) 為鍵，同時進行的相同請求只呼叫一次 API
+    :param usage_chat_id: 用量記在哪個聊天室
+    :return: (回應內容, 使用的模型)，所有模型都失敗時為 (None, None)
+    """
+    key = (model, session_type, bool(response_format), _normalize_prompt(message))
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPTS[session_type]},
+        {"role": "user", "content": message}
+    ]
+
+    def complete():
+        return _complete_with_fallback(lambda current_model: messages, model, session_type, chat_id,
+                                       usage_chat_id=usage_chat_id, response_format=response_format)
+
+    (reply, used_model), coalesced = llm_single_flight.do(key, complete)
+    if reply is not None:
+        source = "shared in-flight call" if coalesced else "new call"
+        logger.info(f"Response for user {chat_id} (session: {session_type}, {source}) "
+                    f"was generated by model {used_model}")
+    return reply, used_model
+
+
+def _normalize_prompt(message: str) -> str:
+    """合併連續空白，讓只有縮排或換行不同的提示詞視為同一個請求"""
+    return " ".join(message.split())
+
+
+def _complete_with_fallback(build_messages, model: str, session_type: str, chat_id: str,
+                            usage_chat_id: str = None,
+                            max_tokens: int = MAX_COMPLETION_TOKENS,
+                            response_format: dict = None) -> Tuple[Union[str, None], Union[str, None]]:
+    """
+    依序嘗試主要模型與備用模型，直到取得回應
+
+    :param build_messages: 接收模型名稱、回傳該模型要送出的訊息
+    :param usage_chat_id: 用量記在哪個聊天室，預設為 chat_id
+    :param max_tokens: 回覆的最大 token 數
+    :param response_format: 回覆格式（例如 JSON 物件模式），未指定時為一般文字
+    :return: (回應內容, 使用的模型)，全部失敗時為 (None, None)
+    """
     # 確定要嘗試的模型順序
     models_to_try = [m for m in FALLBACK_MODELS if m != model]
     models_to_try.insert(0, model)
 
-    reply = None
-    used_model = None
-
     # 依序嘗試每個模型
     for current_model in models_to_try:
         try:
             logger.info(f"Attempting to use model: {current_model} for session type: {session_type}")
 
             # 呼叫 Groq API
-            response = groq_client.chat.completions.create(
-                messages=user_sessions[session_type][chat_id],
+            response = groq_client.chat_completion(
+                messages=build_messages(current_model),
                 model=current_model,
                 temperature=0.7,
-                max_tokens=2000,
-                timeout=10
+                max_tokens=max_tokens,
+                timeout=10,
+                **({"response_format": response_format} if response_format else {})
             )
+            usage_tracker.record(usage_chat_id or chat_id, session_type, current_model, response.usage)
 
-            reply = response.choices[0].message.content
-            used_model = current_model
-            break
+            return response.choices[0].message.content, current_model
 
         except Exception as e:
             error_msg = str(e).lower()
             logger.error(f"An exception occurred with model {current_model} for chat_id {chat_id}: {error_msg}")
-            # 如果是最後一個模型也失敗了，清理該聊天室的會話記錄
-            if current_model == models_to_try[-1]:
-                logger.warning(f"Clearing session for chat_id {chat_id} due to repeated failures")
-                if chat_id in user_sessions[session_type]:
-                    del user_sessions[session_type][chat_id]
             continue
 
-    if reply is None:
-        logger.error(f"All models failed for chat_id {chat_id}, session_type {session_type}")
-        reply = "很抱歉，我現在暫時無法處理您的請求。請稍後再試。"
+    logger.error(f"All models failed for chat_id {chat_id}, session_type {session_type}")
+    return None, None
 
-    # 加入機器人回應到對話紀錄
-    user_sessions[session_type][chat_id].append({"role": "assistant", "content": reply})
 
-    # 控制對話歷史長度，避免消耗過多 tokens
-    _trim_conversation_history(chat_id, session_type)
+def get_single_flight_stats() -> dict:
+    """單一飛行（請求合併）統計"""
+    return llm_single_flight.stats()
 
-    # 記錄使用了哪個模型
-    logger.info(f"Response for user {chat_id} (session: {session_type}) was generated by model {used_model}")
-    return reply
 
+def get_chat_lock_stats() -> dict:
+    """聊天室鎖的爭用統計"""
+    return chat_locks.stats()
 
-def _trim_conversation_history(chat_id: str, session_type: str = "chat", max_turns: int = 10) -> None:
-    """
-    修剪對話歷史以控制長度
 
-    :param chat_id: 聊天室 ID
+def get_model_routing_stats() -> dict:
+    """一般聊天模型分流的次數與平均回應時間"""
+    return chat_model_router.stats()
+
+
+def get_response_cache_stats() -> dict:
+    """近似問題回覆快取的命中統計"""
+    return response_cache.stats()
+
+
+def get_llm_queue_stats() -> dict:
+    """各優先等級（即時／批次）等待模型名額的統計"""
+    if groq_client is None:
+        return {}
+    return groq_client.queue_stats()
+
+
+def get_usage_summary(days: int = 1) -> dict:
+    """最近幾天的 token 用量彙總"""
+    return usage_tracker.summary(days)
+
+
+def _summarize_evicted_turns(session_type: str, chat_id: str, previous_summary: Union[str, None],
+                             turns: list) -> Union[str, None]:
+    """
+    將既有摘要與被移除的對話合併成新的簡短摘要（由背景執行緒呼叫）
     :param session_type: 會話類型
-    :param max_turns: 保留的最大對話輪數(一來一往算一輪)
+    :param chat_id: 聊天室 ID，摘要的用量記在該聊天室的 summary 類型下
+    :param previous_summary: 既有摘要，沒有則為 None
+    :param turns: 被移除的 (role, content)
+    :return: 新摘要，失敗時返回 None
     """
-    if session_type in user_sessions and chat_id in user_sessions[session_type]:
-        history = user_sessions[session_type][chat_id]
+    if groq_client is None:
+        return None
 
-        # 如果歷史記錄超過限制
-        if len(history) > (max_turns * 2 + 1):  # +1 是因為有系統提示
-            # 保留系統提示和最近的對話
-            user_sessions[session_type][chat_id] = [
-                history[0],  # 系統提示
-                *history[-(max_turns * 2):]  # 最近的對話
-            ]
+    transcript = "\n".join(f"{ROLE_NAMES[role]}: {content}" for role, content in turns)
+    prompt = f"""請將以下「既有摘要」與「較早的對話」整合成一段不超過 150 字的繁體中文摘要，
+    保留使用者的需求、偏好、重要事實與尚未解決的問題，只輸出摘要本身。
+
+    既有摘要：
+    {previous_summary or "（無）"}
+
+    較早的對話：
+    {transcript}
+    """
+
+    # 摘要是背景工作，排在使用者的即時請求之後
+    response = groq_client.chat_completion(
+        messages=[{"role": "user", "content": prompt}],
+        model=SUMMARY_MODEL,
+        priority=PRIORITY_BATCH,
+        temperature=0.3,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        timeout=10
+    )
+    usage_tracker.record(chat_id, "summary", SUMMARY_MODEL, response.usage)
+    return response.choices[0].message.content.strip()
+
+
+conversation_summarizer = ConversationSummarizer(
+    _summarize_evicted_turns,
+    load=lambda session_type, chat_id: session_backend.get_conversation(session_type, chat_id),
+    save=lambda session_type, chat_id, conversation: session_backend.save_conversation(
+        session_type, chat_id, conversation),
+    hold=lambda session_type, chat_id: chat_locks.hold((session_type, chat_id))
+)
 
 
 def get_ai_status_flex(chat_id: str) -> FlexSendMessage:
@@ -241,10 +566,30 @@ def get_ai_status_flex(chat_id: str) -> FlexSendMessage:
         background_color=COLOR_THEME['card']
     )
 
+    footer_box = BoxComponent(
+        layout="vertical",
+        contents=[
+            ButtonComponent(
+                action=PostbackAction(
+                    label="連發訊息合併開關",
+                    data="action=toggle_debounce",
+                    display_text="AI 回應：切換連發訊息合併"
+                ),
+                style="secondary",
+                color=COLOR_THEME['info'],
+                height="sm"
+            )
+        ],
+        padding_all="lg",
+        background_color=COLOR_THEME['card']
+    )
+
     bubble = BubbleContainer(
         body=body_box,
+        footer=footer_box,
         styles=BubbleStyle(
-            body=BlockStyle(background_color=COLOR_THEME['card'])
+            body=BlockStyle(background_color=COLOR_THEME['card']),
+            footer=BlockStyle(background_color=COLOR_THEME['card'])
         )
     )
 
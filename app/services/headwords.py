@@ -0,0 +1,246 @@
+import hashlib
+import logging
+import mmap
+import os
+import random
+import struct
+import threading
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from app.services.word_cache import normalize_word
+
+logger = logging.getLogger(__name__)
+
+# 隨專案附帶的單字清單：<語言>/<難度>.txt，每行一個單字，# 開頭為註解
+BUNDLED_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wordlists")
+
+# 編譯後的格式：檔頭（識別碼、來源清單的雜湊、單字數）+ 各單字的位移（uint32）+ UTF-8 單字內容
+_MAGIC = b"HWL1"
+_HEADER = struct.Struct("<4s16sI")
+_OFFSET = struct.Struct("<I")
+
+# 隨機抽出所需數量幾倍的候選，再過濾看過的單字；不足時才掃描整份清單
+PICK_CANDIDATE_FACTOR = 4
+
+
+def _read_source(source_path: str) -> Tuple[List[str], bytes]:
+    """讀取來源清單，回傳去除重複後的單字與內容雜湊"""
+    with open(source_path, "rb") as f:
+        raw = f.read()
+
+    words = []
+    known = set()
+    for line in raw.decode("utf-8").splitlines():
+        word = line.strip()
+        if not word or word.startswith("#"):
+            continue
+        key = normalize_word(word)
+        if key in known:
+            continue
+        known.add(key)
+        words.append(word)
+    return words, hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def compile_wordlist(source_path: str, target_path: str) -> bool:
+    """
+    將文字清單編譯為可記憶體映射的二進位檔，來源內容沒有變更時略過
+    :return: 是否重新編譯
+    """
+    words, digest = _read_source(source_path)
+    if _compiled_digest(target_path) == digest:
+        return False
+
+    encoded = [word.encode("utf-8") for word in words]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+
+    directory = os.path.dirname(target_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # 先寫入暫存檔再替換，同時啟動的多個 worker 不會讀到寫到一半的檔案
+    temp_path = f"{target_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, digest, len(words)))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(b"".join(encoded))
+    os.replace(temp_path, target_path)
+    return True
+
+
+def _compiled_digest(path: str) -> Optional[bytes]:
+    try:
+        with open(path, "rb") as f:
+            magic, digest, _ = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return digest if magic == _MAGIC else None
+
+
+class HeadwordList:
+    """
+    記憶體映射的唯讀單字清單
+
+    檔案以唯讀方式映射，單字只在讀取時才解碼；fork 出的多個 worker 共用作業系統的同一份分頁快取
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, self._count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a compiled word list: {path}")
+        self._data_start = _HEADER.size + _OFFSET.size * (self._count + 1)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        position = _HEADER.size + _OFFSET.size * index
+        start, end = struct.unpack_from("<2I", self._map, position)
+        return self._map[self._data_start + start:self._data_start + end].decode("utf-8")
+
+
+class HeadwordLibrary:
+    """
+    各語言、各難度的單字清單
+
+    選字在本地完成（隨機抽出使用者沒看過的單字），模型只需要補上單字的詳細資料，
+    提示詞不用再描述難度，各難度的單字也保持一致
+    """
+
+    def __init__(self, compiled_dir: str, source_dir: str = BUNDLED_DIR):
+        """
+        :param compiled_dir: 編譯後的二進位清單存放目錄
+        :param source_dir: 文字清單的目錄
+        """
+        self.compiled_dir = compiled_dir
+        self.source_dir = source_dir
+        self._lists: Dict[Tuple[str, str], Optional[HeadwordList]] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+        self.picked = 0
+        self.exhausted = 0
+
+    def compile_all(self) -> int:
+        """編譯所有來源清單，回傳重新編譯的數量"""
+        compiled = 0
+        for language in sorted(os.listdir(self.source_dir)):
+            directory = os.path.join(self.source_dir, language)
+            if not os.path.isdir(directory):
+                continue
+            for name in sorted(os.listdir(directory)):
+                level, extension = os.path.splitext(name)
+                if extension == ".txt":
+                    compiled += compile_wordlist(os.path.join(directory, name), self._compiled_path(language, level))
+        return compiled
+
+    def _compiled_path(self, language: str, level: str) -> str:
+        return os.path.join(self.compiled_dir, language, f"{level}.bin")
+
+    def get(self, language: str, level: str) -> Optional[HeadwordList]:
+        """取得單字清單，沒有對應的清單時返回 None"""
+        key = (language, level)
+        with self._lock:
+            if key not in self._lists:
+                self._lists[key] = self._open(language, level)
+            return self._lists[key]
+
+    def _open(self, language: str, level: str) -> Optional[HeadwordList]:
+        source = os.path.join(self.source_dir, language, f"{level}.txt")
+        if not os.path.exists(source):
+            return None
+        target = self._compiled_path(language, level)
+        try:
+            compile_wordlist(source, target)
+            return HeadwordList(target)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to load {language} {level} word list: {e}")
+            return None
+
+    def pick(self, language: str, level: str, count: int, exclude: Collection[str] = (),
+             accept: Optional[Callable[[List[str]], List[bool]]] = None) -> List[str]:
+        """
+        隨機選出最多 count 個單字
+        :param exclude: 要避開的單字
+        :param accept: 過濾候選單字，回傳每個候選是否可用（例如排除使用者看過的單字）
+        """
+        headwords = self.get(language, level)
+        if not headwords or count <= 0:
+            return []
+
+        excluded = {normalize_word(word) for word in exclude}
+        total = len(headwords)
+        picked = []
+        tried = set()
+        # 先抽少量候選，大多數情況一次就足夠；使用者看過大部分單字時才掃描整份清單
+        for sample_size in (min(total, count * PICK_CANDIDATE_FACTOR), total):
+            indexes = [i for i in self._random.sample(range(total), sample_size) if i not in tried]
+            tried.update(indexes)
+            candidates = [word for word in map(headwords.__getitem__, indexes)
+                          if normalize_word(word) not in excluded]
+            usable = accept(candidates) if accept is not None and candidates else [True] * len(candidates)
+            for word, ok in zip(candidates, usable):
+                if ok:
+                    picked.append(word)
+                    excluded.add(normalize_word(word))
+                    if len(picked) == count:
+                        break
+            if len(picked) == count or sample_size == total:
+                break
+
+        with self._lock:
+            self.picked += len(picked)
+            if len(picked) < count:
+                self.exhausted += 1
+        if len(picked) < count:
+            logger.warning(f"{language} {level} word list exhausted: {len(picked)}/{count} words available")
+        return picked
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "lists": {f"{language}/{level}": len(headwords)
+                          for (language, level), headwords in self._lists.items() if headwords is not None},
+                "picked": self.picked,
+                "exhausted": self.exhausted
+            }
+
+
+# 全域的單字清單，未初始化時由模型選字
+headword_library: Optional[HeadwordLibrary] = None
+
+
+def init_headwords(compiled_dir: str, source_dir: str = BUNDLED_DIR) -> HeadwordLibrary:
+    """
+    編譯隨專案附帶的單字清單並啟用本地選字
+    :param compiled_dir: 編譯後的二進位清單存放目錄
+    :param source_dir: 文字清單的目錄
+    """
+    global headword_library
+    library = HeadwordLibrary(compiled_dir, source_dir)
+    compiled = library.compile_all()
+    if compiled:
+        logger.info(f"Compiled {compiled} word lists into {compiled_dir}")
+    headword_library = library
+    return library
+
+
+def has_headwords(language: str, level: str) -> bool:
+    return headword_library is not None and headword_library.get(language, level) is not None
+
+
+def pick_headwords(language: str, level: str, count: int, exclude: Collection[str] = (),
+                   accept: Optional[Callable[[List[str]], List[bool]]] = None) -> List[str]:
+    if headword_library is None:
+        return []
+    return headword_library.pick(language, level, count, exclude, accept)
+
+
+def get_headword_stats() -> Optional[dict]:
+    return headword_library.stats() if headword_library is not None else None
@@ -0,0 +1,120 @@
+import re
+import threading
+from typing import Dict, NamedTuple, Optional
+
+# 問候、道謝、附和等不需要大模型的訊息
+TRIVIAL_PHRASES = {
+    "hi", "hello", "hey", "yo", "ok", "okay", "thanks", "thank you", "thx", "bye", "good morning", "good night",
+    "你好", "您好", "哈囉", "嗨", "早安", "午安", "晚安", "謝謝", "感謝", "謝啦", "好", "好的", "好喔", "好啊",
+    "嗯", "嗯嗯", "對", "是", "不是", "沒事", "掰掰", "拜拜", "哈哈", "哈哈哈", "讚", "收到", "了解", "知道了",
+}
+
+# 需要推理、產生長文或處理內容的請求字詞
+SUBSTANTIVE_MARKERS = (
+    "為什麼", "為何", "如何", "怎麼", "怎樣", "解釋", "說明", "分析", "比較", "差別", "差異", "建議", "推薦",
+    "翻譯", "計算", "寫", "整理", "摘要", "總結", "規劃", "步驟", "程式", "代碼", "範例", "優缺點",
+    "why", "how", "explain", "compare", "write", "translate", "summarize", "calculate", "code", "plan",
+)
+
+QUESTION_MARKERS = ("?", "？", "嗎", "呢", "什麼", "哪", "誰", "幾", "what", "who", "where", "when", "which")
+
+_CJK_PATTERN = re.compile(r"[一-鿿]")
+_OTHER_SCRIPT_PATTERN = re.compile(r"[぀-ヿ가-힯Ѐ-ӿ฀-๿]")
+_LATIN_WORD_PATTERN = re.compile(r"[A-Za-z0-9]+")
+_STRUCTURE_PATTERN = re.compile(r"https?://|```|[{}<>=]|\d\s*[-+*/^]\s*\d")
+_PUNCTUATION = " \t\r\n.,!~…。，！～、:：;；\"'「」()（）"
+
+
+class RouteDecision(NamedTuple):
+    route: str
+    model: str
+    max_tokens: int
+    reason: str
+
+
+def message_length(text: str) -> int:
+    """訊息長度：中文每個字、英文每個單字各算一個單位"""
+    return len(_CJK_PATTERN.findall(text)) + len(_LATIN_WORD_PATTERN.findall(text))
+
+
+class ChatModelRouter:
+    """
+    依訊息複雜度選擇一般聊天使用的模型
+
+    以本地規則判斷（訊息長度、語言、疑問與請求字詞、對話深度），
+    問候、道謝或很短的簡單訊息交給快速小模型並限制回覆長度，其餘維持使用大模型。
+    """
+
+    def __init__(self, fast_model: str, fast_max_tokens: int, max_trivial_length: int = 6,
+                 max_history_messages: int = 6):
+        """
+        :param fast_model: 簡單訊息使用的快速模型
+        :param fast_max_tokens: 快速模型的最大回覆 token 數
+        :param max_trivial_length: 視為簡單訊息的最大長度（字或單字數）
+        :param max_history_messages: 對話紀錄超過此數量時，除了問候道謝外都使用大模型（短訊息多半是接續前文的追問）
+        """
+        self.fast_model = fast_model
+        self.fast_max_tokens = fast_max_tokens
+        self.max_trivial_length = max_trivial_length
+        self.max_history_messages = max_history_messages
+
+        self._lock = threading.Lock()
+        # route -> [次數, 總延遲秒數]
+        self._latency: Dict[str, list] = {}
+
+    def classify(self, message: str, history_size: int = 0) -> Optional[str]:
+        """
+        判斷訊息是否可交給快速模型
+        :return: 可交給快速模型時回傳原因，否則回傳 None
+        """
+        text = message.strip().lower()
+        if text.strip(_PUNCTUATION) in TRIVIAL_PHRASES:
+            return "greeting"
+
+        # 日文、韓文等其他語言交給大模型，小模型的多語言能力較弱
+        if _OTHER_SCRIPT_PATTERN.search(text) or "\n" in text or _STRUCTURE_PATTERN.search(text):
+            return None
+        if any(marker in text for marker in SUBSTANTIVE_MARKERS):
+            return None
+        if history_size > self.max_history_messages:
+            return None
+
+        length = message_length(text)
+        if length == 0:
+            return "symbols"
+        limit = self.max_trivial_length
+        # 短問句仍可能需要知識，門檻減半
+        if any(marker in text for marker in QUESTION_MARKERS):
+            limit //= 2
+        if length <= limit:
+            return "short"
+        return None
+
+    def route(self, message: str, history_size: int, default_model: str, default_max_tokens: int) -> RouteDecision:
+        """
+        :param message: 使用者訊息
+        :param history_size: 目前對話紀錄的訊息數（不含這則訊息）
+        :param default_model: 一般訊息使用的模型
+        :param default_max_tokens: 一般訊息的最大回覆 token 數
+        """
+        reason = self.classify(message, history_size)
+        if reason is None:
+            return RouteDecision("default", default_model, default_max_tokens, "substantive")
+        return RouteDecision("fast", self.fast_model, self.fast_max_tokens, reason)
+
+    def observe(self, route: str, latency: float) -> None:
+        """記錄某個路徑的回應時間"""
+        with self._lock:
+            counters = self._latency.setdefault(route, [0, 0.0])
+            counters[0] += 1
+            counters[1] += latency
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "fast_model": self.fast_model,
+                "routes": {
+                    route: {"requests": count, "avg_latency_ms": round(total / count * 1000, 1)}
+                    for route, (count, total) in self._latency.items()
+                }
+            }
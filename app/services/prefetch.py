@@ -0,0 +1,219 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from app.services.groq_async import llm_priority, PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+# take() 沒有可用的預取結果時的回傳值（預取結果本身可能是 None）
+MISS = object()
+
+
+class _Slot:
+    __slots__ = ('key', 'future', 'expires_at', 'on_discard')
+
+    def __init__(self, key: Hashable, future: Optional[Future], expires_at: float,
+                 on_discard: Optional[Callable[[Any], None]] = None):
+        # future 為 None 表示不需要預取（例如快取中已有可用的結果）
+        self.key = key
+        self.future = future
+        self.expires_at = expires_at
+        self.on_discard = on_discard
+
+
+class Prefetcher:
+    """
+    依選單流程預先執行下一步的工作
+
+    顯示選單時（例如英文難度 → 數量選單）先在背景以批次優先等級開始最後一步需要的工作，
+    結果放在每個聊天室一個、短時間有效的位置；使用者點選最後一步時直接取用，沒有結果時照常即時執行。
+
+    - 同一個聊天室的新預取會取代尚未使用的舊預取（計為浪費）
+    - 逾時未取用或最後一步與預取的內容不同，也計為浪費
+    - 捨棄的預取已完成（或之後完成）時，結果交給 on_discard 處理，例如把預取時取出的單字歸還單字池
+    - 不需要預取時以 skip() 記錄，最後一步照常即時執行，計為略過而不是未命中
+    """
+
+    def __init__(self, ttl: float = 60.0, max_workers: int = 2):
+        """
+        :param ttl: 預取結果的有效時間（秒），0 為停用
+        :param max_workers: 背景預取的執行緒數
+        """
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch") \
+            if ttl > 0 else None
+        self._slots: Dict[str, _Slot] = {}
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.wasted = 0
+        self.recycled = 0
+
+    def start(self, chat_id: str, key: Hashable, fn: Callable[..., Any], *args,
+              on_discard: Optional[Callable[[Any], None]] = None) -> None:
+        """
+        在背景開始預取，同一個聊天室已有相同 key 的有效預取時略過
+        :param key: 預取內容的鍵，最後一步以相同的 key 取用
+        :param on_discard: 預取結果沒有被取用時的處理（在背景執行緒或呼叫端執行）
+        """
+        if self._executor is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            discarded = self._expire(now)
+            slot = self._slots.get(chat_id)
+            if slot is None or slot.key != key or slot.future is None:
+                if slot is not None:
+                    discarded.append(self._discard(self._slots.pop(chat_id)))
+                try:
+                    future = self._executor.submit(self._run, fn, *args)
+                except RuntimeError as e:
+                    logger.warning(f"Prefetch not started for {chat_id}: {e}")
+                else:
+                    self._slots[chat_id] = _Slot(key, future, now + self.ttl, on_discard)
+                    self.started += 1
+        self._recycle(discarded)
+
+    def skip(self, chat_id: str, key: Hashable) -> None:
+        """
+        記錄這一步不需要預取（例如快取中已有可用的結果），最後一步取用時計為略過
+        """
+        if self._executor is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            discarded = self._expire(now)
+            slot = self._slots.pop(chat_id, None)
+            if slot is not None:
+                discarded.append(self._discard(slot))
+            self._slots[chat_id] = _Slot(key, None, now + self.ttl)
+        self._recycle(discarded)
+
+    @staticmethod
+    def _run(fn: Callable[..., Any], *args) -> Any:
+        # 預取是推測性的工作，排在使用者的即時請求之後
+        with llm_priority(PRIORITY_BATCH):
+            return fn(*args)
+
+    def take(self, chat_id: str, key: Hashable, timeout: Optional[float] = None) -> Any:
+        """
+        取用預取結果，仍在執行中時最多等待 timeout 秒（等待剩餘時間仍比重新執行快）
+        :return: 預取結果，沒有可用的結果時返回 MISS
+        """
+        if self._executor is None:
+            return MISS
+
+        with self._lock:
+            discarded = self._expire(time.monotonic())
+            slot = self._slots.pop(chat_id, None)
+            if slot is not None and slot.key == key and slot.future is None:
+                self.skipped += 1
+                slot = None
+            elif slot is None or slot.key != key:
+                if slot is not None:
+                    discarded.append(self._discard(slot))
+                self.misses += 1
+                slot = None
+        self._recycle(discarded)
+        if slot is None:
+            return MISS
+
+        try:
+            result = slot.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.warning(f"Prefetch for {chat_id} still running after {timeout}s, running live")
+            # 即時執行不會用到這次預取，之後完成的結果交給 on_discard
+            self._recycle([slot])
+            result = MISS
+        except Exception as e:
+            logger.error(f"Prefetch for {chat_id} failed: {e}")
+            result = MISS
+
+        with self._lock:
+            if result is MISS:
+                self.misses += 1
+                self.wasted += 1
+            else:
+                self.hits += 1
+        return result
+
+    def _expire(self, now: float) -> List[_Slot]:
+        """移除逾時的預取，回傳捨棄的項目（在鎖外交給 _recycle 處理）"""
+        expired = [chat_id for chat_id, slot in self._slots.items() if slot.expires_at <= now]
+        return [self._discard(self._slots.pop(chat_id)) for chat_id in expired]
+
+    def _discard(self, slot: _Slot) -> _Slot:
+        """捨棄沒有被取用的預取，尚未開始的工作直接取消"""
+        if slot.future is not None:
+            slot.future.cancel()
+            self.wasted += 1
+        return slot
+
+    def _recycle(self, slots: List[_Slot]) -> None:
+        """捨棄的預取已經開始執行時，完成後把結果交給 on_discard（已完成的在呼叫端立即執行）"""
+        for slot in slots:
+            if slot.future is not None and slot.on_discard is not None and not slot.future.cancelled():
+                slot.future.add_done_callback(lambda future, slot=slot: self._return_result(slot, future))
+
+    def _return_result(self, slot: _Slot, future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            slot.on_discard(future.result())
+        except Exception as e:
+            logger.error(f"Failed to recycle discarded prefetch {slot.key}: {e}")
+            return
+        with self._lock:
+            self.recycled += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            taken = self.hits + self.misses
+            return {
+                "enabled": self._executor is not None,
+                "active": len(self._slots),
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "wasted": self.wasted,
+                "recycled": self.recycled,
+                "hit_rate": round(self.hits / taken, 4) if taken else 0.0,
+                "waste_rate": round(self.wasted / self.started, 4) if self.started else 0.0
+            }
+
+
+# 全域的預取器
+prefetcher = Prefetcher()
+
+
+def init_prefetcher(ttl: float = 60.0, max_workers: int = 2) -> Prefetcher:
+    """
+    設定預取器
+    :param ttl: 預取結果的有效時間（秒），0 為停用
+    :param max_workers: 背景預取的執行緒數
+    """
+    global prefetcher
+    prefetcher = Prefetcher(ttl, max_workers)
+    return prefetcher
+
+
+def start_prefetch(chat_id: str, key: Hashable, fn: Callable[..., Any], *args,
+                   on_discard: Optional[Callable[[Any], None]] = None) -> None:
+    prefetcher.start(chat_id, key, fn, *args, on_discard=on_discard)
+
+
+def skip_prefetch(chat_id: str, key: Hashable) -> None:
+    prefetcher.skip(chat_id, key)
+
+
+def take_prefetched(chat_id: str, key: Hashable, timeout: Optional[float] = None) -> Any:
+    return prefetcher.take(chat_id, key, timeout)
@@ -0,0 +1,185 @@
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, List, Optional, Set, Tuple
+
+# MinHash 使用的梅森質數
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# 中日韓文字每個字一個詞，數字與其他文字以連續字元為一個詞
+_CJK_CHARS = r'\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff'
+_TOKEN_RE = re.compile(rf'[{_CJK_CHARS}]|\d+|[^\W\d_{_CJK_CHARS}]+')
+
+
+class _Entry:
+    __slots__ = ('key', 'shingles', 'exact', 'bands', 'reply', 'expires')
+
+    def __init__(self, key: Hashable, shingles: FrozenSet[str], exact: FrozenSet[str],
+                 bands: List[Tuple[int, tuple]], reply: str, expires: float):
+        self.key = key
+        self.shingles = shingles
+        self.exact = exact
+        self.bands = bands
+        self.reply = reply
+        self.expires = expires
+
+
+class NearDuplicateCache:
+    """
+    近似重複問題的回覆快取
+
+    - 訊息正規化後切成詞（中日韓文字每字一詞），以連續詞組成的 shingle 計算 MinHash 簽章，分段（LSH）找出候選
+    - 候選再以 shingle 的 Jaccard 相似度確認，超過門檻才視為命中
+    - 數字與專有名詞（訊息開頭以外含大寫字母的多字母詞）必須完全相同，
+      避免只差一個數字或地名的問題拿到錯誤的回覆
+    - 項目有存活時間，超過容量時淘汰最久未使用的項目
+
+    分區鍵決定哪些訊息可以互相命中；回覆可能帶有使用者提供的個人資料，不應跨聊天室共用。
+    """
+
+    def __init__(self, threshold: float = 0.85, ttl: float = 3600, max_entries: int = 2000,
+                 num_perm: int = 64, bands: int = 16, shingle_size: int = 2, seed: int = 1):
+        """
+        :param threshold: 視為相同問題的最低 Jaccard 相似度
+        :param ttl: 回覆的存活時間（秒）
+        :param max_entries: 最多保留的項目數
+        :param num_perm: MinHash 簽章長度
+        :param bands: LSH 分段數，必須整除 num_perm
+        :param shingle_size: 每個 shingle 的連續詞數
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+        self._entries: OrderedDict = OrderedDict()
+        # (分區鍵, (分段編號, 該段簽章)) -> 項目 ID
+        self._buckets: Dict[Tuple[Hashable, Tuple[int, tuple]], Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """全形轉半形、轉小寫"""
+        return unicodedata.normalize("NFKC", text).lower()
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """切成詞，去除空白與標點"""
+        return _TOKEN_RE.findall(NearDuplicateCache.normalize(text))
+
+    @staticmethod
+    def exact_tokens(text: str) -> FrozenSet[str]:
+        """必須完全相同的詞：數字，以及訊息開頭以外含大寫字母的多字母詞（專有名詞、縮寫）"""
+        tokens = _TOKEN_RE.findall(unicodedata.normalize("NFKC", text))
+        return frozenset(token.lower() for i, token in enumerate(tokens)
+                         if token.isdigit() or (i > 0 and len(token) > 1 and token != token.lower()))
+
+    def _shingles(self, text: str) -> FrozenSet[str]:
+        tokens = self.tokenize(text)
+        if len(tokens) <= self.shingle_size:
+            return frozenset([" ".join(tokens)]) if tokens else frozenset()
+        return frozenset(" ".join(tokens[i:i + self.shingle_size])
+                         for i in range(len(tokens) - self.shingle_size + 1))
+
+    def _bands(self, shingles: FrozenSet[str]) -> List[Tuple[int, tuple]]:
+        hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+        signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+        return [(band, tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    def get(self, key: Hashable, message: str) -> Optional[str]:
+        """
+        查詢近似問題的回覆
+        :param key: 分區鍵（例如會話類型），不同分區互不命中
+        :param message: 使用者訊息
+        """
+        shingles = self._shingles(message)
+        if not shingles:
+            return None
+        exact = self.exact_tokens(message)
+        bands = self._bands(shingles)
+        now = time.monotonic()
+
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band in bands:
+                candidates.update(self._buckets.get((key, band), ()))
+
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if entry.expires <= now:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                if entry.exact != exact:
+                    continue
+                similarity = len(shingles & entry.shingles) / len(shingles | entry.shingles)
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None:
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id].reply
+
+    def put(self, key: Hashable, message: str, reply: str) -> None:
+        """保存問題與回覆"""
+        shingles = self._shingles(message)
+        if not shingles:
+            return
+        bands = self._bands(shingles)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(key, shingles, self.exact_tokens(message), bands, reply,
+                                             time.monotonic() + self.ttl)
+            for band in bands:
+                self._buckets.setdefault((key, band), set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for band in entry.bands:
+            bucket = self._buckets.get((entry.key, band))
+            if bucket is None:
+                continue
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[(entry.key, band)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
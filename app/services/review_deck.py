@@ -0,0 +1,380 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SM-2 的初始與最低難易度（以 100 倍的整數保存）
+INITIAL_EASE = 250
+MIN_EASE = 130
+# 新單字在收到的隔天第一次複習
+FIRST_REVIEW_DELAY = 1
+# 間隔天數上限（陣列以 16 位元保存）
+MAX_INTERVAL = 36500
+
+# 複習時的自評分數（SM-2 的 0-5 分）
+QUALITY_MIN = 0
+QUALITY_MAX = 5
+QUALITY_AGAIN = 1
+QUALITY_HARD = 3
+QUALITY_GOOD = 4
+QUALITY_EASY = 5
+
+# 延遲更新的 heap 中過期項目超過卡片數的倍數時重建
+HEAP_REBUILD_FACTOR = 2
+
+
+def today() -> int:
+    return date.today().toordinal()
+
+
+def card_id(language: str, word: str) -> int:
+    """(語言, 正規化單字) 的 64 位元有號雜湊，作為卡片與單字內容的鍵"""
+    normalized = " ".join(unicodedata.normalize("NFKC", word).strip().lower().split())
+    digest = hashlib.blake2b(f"{language}\0{normalized}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class _Deck:
+    """
+    單一使用者的複習卡片：每個欄位一個緊湊陣列，另以 (到期日, 位置) 的 heap 取出最早到期的卡片
+
+    排程更新時只推入新的 heap 項目，舊項目在取出時比對到期日後丟棄；
+    到期數量每天只完整計算一次，之後隨到期日的變更增減
+    """
+    __slots__ = ('ids', 'due', 'ease', 'interval', 'reps', 'positions', 'heap', 'version', 'due_day', 'due_count')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.due = array('l')
+        self.ease = array('H')
+        self.interval = array('H')
+        self.reps = array('B')
+        self.positions: Dict[int, int] = {}
+        self.heap: List[Tuple[int, int]] = []
+        self.version = 0
+        # 已計算到期數量的日期與數量
+        self.due_day: Optional[int] = None
+        self.due_count = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, cid: int, due: int) -> bool:
+        if cid in self.positions:
+            return False
+        position = len(self.ids)
+        self.ids.append(cid)
+        self.due.append(due)
+        self.ease.append(INITIAL_EASE)
+        self.interval.append(0)
+        self.reps.append(0)
+        self.positions[cid] = position
+        if self.due_day is not None and due <= self.due_day:
+            self.due_count += 1
+        heapq.heappush(self.heap, (due, position))
+        return True
+
+    def peek_due(self, day: int) -> Optional[int]:
+        """最早到期且已到期的卡片位置，沒有時返回 None"""
+        heap = self.heap
+        while heap:
+            due, position = heap[0]
+            if due != self.due[position]:
+                heapq.heappop(heap)
+                continue
+            return position if due <= day else None
+        return None
+
+    def schedule(self, position: int, quality: int, day: int) -> int:
+        """
+        依 SM-2 更新卡片的難易度與間隔
+        :return: 下次複習的間隔天數
+        """
+        if quality < 3:
+            reps, interval = 0, 1
+        else:
+            reps = self.reps[position]
+            if reps == 0:
+                interval = 1
+            elif reps == 1:
+                interval = 6
+            else:
+                interval = round(self.interval[position] * self.ease[position] / 100)
+            reps = min(reps + 1, 255)
+
+        penalty = 5 - quality
+        ease = self.ease[position] + 10 - penalty * (8 + penalty * 2)
+        interval = max(1, min(interval, MAX_INTERVAL))
+
+        self.ease[position] = max(MIN_EASE, ease)
+        self.interval[position] = interval
+        self.reps[position] = reps
+        self.reschedule(position, day + interval)
+        if len(self.heap) > HEAP_REBUILD_FACTOR * len(self.ids) + 16:
+            self._rebuild_heap()
+        return interval
+
+    def reschedule(self, position: int, due: int) -> None:
+        """變更卡片的到期日（舊的 heap 項目留待取出時丟棄）"""
+        if self.due_day is not None:
+            self.due_count += (due <= self.due_day) - (self.due[position] <= self.due_day)
+        self.due[position] = due
+        heapq.heappush(self.heap, (due, position))
+
+    def count_due(self, day: int) -> int:
+        if self.due_day != day:
+            self.due_count = sum(1 for due in self.due if due <= day)
+            self.due_day = day
+        return self.due_count
+
+    def _rebuild_heap(self) -> None:
+        self.heap = [(due, position) for position, due in enumerate(self.due)]
+        heapq.heapify(self.heap)
+
+    def dump(self) -> tuple:
+        return (self.ids.tobytes(), self.due.tobytes(), self.ease.tobytes(),
+                self.interval.tobytes(), self.reps.tobytes())
+
+    @classmethod
+    def load(cls, ids: bytes, due: bytes, ease: bytes, interval: bytes, reps: bytes, version: int) -> '_Deck':
+        deck = cls()
+        deck.ids.frombytes(ids)
+        deck.due.frombytes(due)
+        deck.ease.frombytes(ease)
+        deck.interval.frombytes(interval)
+        deck.reps.frombytes(reps)
+        deck.positions = {cid: position for position, cid in enumerate(deck.ids)}
+        deck.version = version
+        deck._rebuild_heap()
+        return deck
+
+
+class ReviewStore:
+    """
+    間隔重複（SM-2）的單字複習
+
+    - 使用者收到的單字加入各自的卡片組；單字內容依 (語言, 單字) 只保存一份，所有使用者共用
+    - 卡片組保存於 SQLite；行程內保留最近使用的卡片組，以版本號確認其他 worker 沒有更新過
+    - 取出到期卡片為 O(log n)，複習不需要呼叫 LLM
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_cached_decks: int = 256):
+        """
+        :param db_path: SQLite 資料庫路徑
+        :param max_cached_decks: 行程內保留的卡片組數
+        """
+        self.db_path = db_path
+        self.max_cached_decks = max_cached_decks
+        self._decks: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+        self.reviews = 0
+        self.cards_added = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.db_path != ":memory:":
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_decks (
+                chat_id TEXT PRIMARY KEY,
+                ids BLOB NOT NULL,
+                due BLOB NOT NULL,
+                ease BLOB NOT NULL,
+                interval BLOB NOT NULL,
+                reps BLOB NOT NULL,
+                version INTEGER NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS review_entries (
+                card_id INTEGER PRIMARY KEY,
+                language TEXT NOT NULL,
+                level TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+        """)
+        self._conn = conn
+        self._pid = os.getpid()
+        self._decks.clear()
+        return conn
+
+    def _deck(self, conn: sqlite3.Connection, chat_id: str) -> _Deck:
+        """取得卡片組，行程內的版本與資料庫不同時重新載入"""
+        row = conn.execute("SELECT version FROM review_decks WHERE chat_id = ?", (chat_id,)).fetchone()
+        version = row[0] if row else 0
+        deck = self._decks.get(chat_id)
+        if deck is None or deck.version != version:
+            if row is None:
+                deck = _Deck()
+            else:
+                deck = _Deck.load(*conn.execute(
+                    "SELECT ids, due, ease, interval, reps, version FROM review_decks WHERE chat_id = ?",
+                    (chat_id,)
+                ).fetchone())
+            self._decks[chat_id] = deck
+        self._decks.move_to_end(chat_id)
+        while len(self._decks) > self.max_cached_decks:
+            self._decks.popitem(last=False)
+        return deck
+
+    def _save(self, conn: sqlite3.Connection, chat_id: str, deck: _Deck) -> None:
+        deck.version += 1
+        conn.execute(
+            "INSERT INTO review_decks (chat_id, ids, due, ease, interval, reps, version) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(chat_id) DO UPDATE SET ids = excluded.ids, due = excluded.due, ease = excluded.ease, "
+            "interval = excluded.interval, reps = excluded.reps, version = excluded.version",
+            (chat_id, *deck.dump(), deck.version)
+        )
+
+    def add_words(self, chat_id: str, language: str, level: str, words: List[dict]) -> int:
+        """
+        將使用者收到的單字加入卡片組（已在卡片組中的單字略過）
+        :return: 新加入的卡片數
+        """
+        words = [word_data for word_data in words if word_data.get("word")]
+        if not words:
+            return 0
+
+        due = today() + FIRST_REVIEW_DELAY
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO review_entries (card_id, language, level, data) VALUES (?, ?, ?, ?)",
+                    [(card_id(language, word_data["word"]), language, level,
+                      json.dumps(word_data, ensure_ascii=False)) for word_data in words]
+                )
+                deck = self._deck(conn, chat_id)
+                added = sum(deck.add(card_id(language, word_data["word"]), due) for word_data in words)
+                if added:
+                    self._save(conn, chat_id, deck)
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                self._decks.pop(chat_id, None)
+                logger.error(f"Failed to add review cards for {chat_id}: {e}")
+                return 0
+            self.cards_added += added
+            return added
+
+    def next_card(self, chat_id: str) -> Optional[Tuple[int, str, str, dict]]:
+        """
+        取出最早到期的卡片
+        :return: (卡片 ID, 語言, 難度, 單字內容)，沒有到期的卡片時返回 None
+        """
+        day = today()
+        with self._lock:
+            conn = self._connection()
+            deck = self._deck(conn, chat_id)
+            while True:
+                position = deck.peek_due(day)
+                if position is None:
+                    return None
+                cid = deck.ids[position]
+                row = conn.execute(
+                    "SELECT language, level, data FROM review_entries WHERE card_id = ?", (cid,)
+                ).fetchone()
+                if row is not None:
+                    return cid, row[0], row[1], json.loads(row[2])
+
+                # 單字內容遺失的卡片無法顯示，排到很久以後
+                logger.warning(f"Missing review entry {cid} for {chat_id}, postponing card")
+                deck.reschedule(position, day + MAX_INTERVAL)
+                conn.execute("BEGIN IMMEDIATE")
+                self._save(conn, chat_id, deck)
+                conn.execute("COMMIT")
+
+    def get_entry(self, cid: int) -> Optional[Tuple[str, str, dict]]:
+        """
+        取得卡片的單字內容
+        :return: (語言, 難度, 單字內容)，不存在時返回 None
+        """
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT language, level, data FROM review_entries WHERE card_id = ?", (cid,)
+            ).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def grade(self, chat_id: str, cid: int, quality: int) -> Optional[int]:
+        """
+        記錄複習結果
+        :param quality: SM-2 的自評分數（QUALITY_MIN 到 QUALITY_MAX）
+        :return: 下次複習的間隔天數，卡片不存在時返回 None
+        """
+        if not QUALITY_MIN <= quality <= QUALITY_MAX:
+            raise ValueError(f"Review quality must be between {QUALITY_MIN} and {QUALITY_MAX}: {quality}")
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                deck = self._deck(conn, chat_id)
+                position = deck.positions.get(cid)
+                if position is None:
+                    conn.execute("ROLLBACK")
+                    return None
+                interval = deck.schedule(position, quality, today())
+                self._save(conn, chat_id, deck)
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                self._decks.pop(chat_id, None)
+                logger.error(f"Failed to record review for {chat_id}: {e}")
+                return None
+            self.reviews += 1
+            return interval
+
+    def summary(self, chat_id: str) -> Dict[str, int]:
+        """卡片總數與今天到期的數量"""
+        with self._lock:
+            deck = self._deck(self._connection(), chat_id)
+            return {"total": len(deck), "due": deck.count_due(today())}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached_decks": len(self._decks),
+                "cards_added": self.cards_added,
+                "reviews": self.reviews
+            }
+
+
+# 全域的複習卡片組，預設只保存在行程內
+review_store = ReviewStore()
+
+
+def init_review_store(db_path: str = None) -> ReviewStore:
+    """
+    設定複習卡片組的資料庫
+    :param db_path: SQLite 資料庫路徑，未指定時只保存在行程內
+    """
+    global review_store
+    review_store = ReviewStore(db_path or ":memory:")
+    return review_store
+
+
+def add_review_words(chat_id: str, language: str, level: str, words: List[dict]) -> int:
+    return review_store.add_words(chat_id, language, level, words)
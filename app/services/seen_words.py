@@ -0,0 +1,294 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 精確集合至少保留到此數量，之後只在 Bloom filter 比較小時才轉換（長期使用者）
+EXACT_LIMIT = 1024
+# 第一層 Bloom filter 的誤判率；容量為轉換時單字數的 BLOOM_GROWTH 倍，
+# 裝滿後加上容量加倍、誤判率減半的新一層，整體誤判率不超過此值的兩倍
+BLOOM_FP_RATE = 0.001
+BLOOM_GROWTH = 2
+# 提示詞中列出的最近單字數
+RECENT_LIMIT = 30
+# 每個行程快取的使用者索引數
+CACHE_SIZE = 1024
+
+KIND_EXACT = 0
+KIND_BLOOM = 1
+
+# 每層 Bloom filter 的標頭：位元數、容量、已加入數量、雜湊函式數量
+_LAYER_HEADER = struct.Struct('<IIIB')
+
+
+def word_id(word: str) -> int:
+    """單字正規化後的 64 位元雜湊，索引中只保存雜湊值"""
+    normalized = " ".join(word.strip().lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def bloom_size(capacity: int, fp_rate: float) -> Tuple[int, int]:
+    """
+    依容量與誤判率計算 Bloom filter 的大小
+    :return: (位元數（8 的倍數）, 雜湊函式數量)
+    """
+    bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    bits = (bits + 7) // 8 * 8
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+class _BloomLayer:
+    """依容量與誤判率配置大小的單層 Bloom filter"""
+    __slots__ = ('bits', 'capacity', 'items', 'hashes', 'data')
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.bits, self.hashes = bloom_size(capacity, fp_rate)
+        self.capacity = capacity
+        self.items = 0
+        self.data = bytearray(self.bits // 8)
+
+    def _positions(self, wid: int) -> Iterable[int]:
+        # 由 64 位元雜湊的高低兩半以雙重雜湊產生各個位置
+        h1, h2 = wid & 0xFFFFFFFF, (wid >> 32) | 1
+        return ((h1 + i * h2) % self.bits for i in range(self.hashes))
+
+    def contains(self, wid: int) -> bool:
+        return all(self.data[bit >> 3] & (1 << (bit & 7)) for bit in self._positions(wid))
+
+    def add(self, wid: int) -> None:
+        for bit in self._positions(wid):
+            self.data[bit >> 3] |= 1 << (bit & 7)
+        self.items += 1
+
+    def dump(self) -> bytes:
+        return _LAYER_HEADER.pack(self.bits, self.capacity, self.items, self.hashes) + self.data
+
+    @classmethod
+    def load(cls, data: bytes, offset: int) -> Tuple['_BloomLayer', int]:
+        """由 dump() 的結果還原，回傳 (該層, 下一層的位移)"""
+        layer = cls.__new__(cls)
+        layer.bits, layer.capacity, layer.items, layer.hashes = _LAYER_HEADER.unpack_from(data, offset)
+        offset += _LAYER_HEADER.size
+        layer.data = bytearray(data[offset:offset + layer.bits // 8])
+        return layer, offset + layer.bits // 8
+
+
+class _UserWords:
+    """單一使用者看過的單字：排序的雜湊陣列，超過上限且 Bloom filter 較小時轉為多層 Bloom filter"""
+    __slots__ = ('kind', 'ids', 'layers', 'count', 'recent')
+
+    def __init__(self):
+        self.kind = KIND_EXACT
+        self.ids = array('Q')
+        self.layers: List[_BloomLayer] = []
+        self.count = 0
+        self.recent: List[str] = []
+
+    def contains(self, wid: int) -> bool:
+        if self.kind == KIND_EXACT:
+            i = bisect_left(self.ids, wid)
+            return i < len(self.ids) and self.ids[i] == wid
+        return any(layer.contains(wid) for layer in self.layers)
+
+    def add(self, wid: int, word: str) -> None:
+        if self.contains(wid):
+            return
+        self.count += 1
+        if self.kind == KIND_EXACT:
+            self.ids.insert(bisect_left(self.ids, wid), wid)
+            if len(self.ids) > EXACT_LIMIT:
+                self._to_bloom()
+        else:
+            layer = self.layers[-1]
+            if layer.items >= layer.capacity:
+                layer = _BloomLayer(layer.capacity * BLOOM_GROWTH, BLOOM_FP_RATE / 2 ** len(self.layers))
+                self.layers.append(layer)
+            layer.add(wid)
+        self.recent.append(word)
+        del self.recent[:-RECENT_LIMIT]
+
+    def _to_bloom(self) -> None:
+        layer = _BloomLayer(len(self.ids) * BLOOM_GROWTH, BLOOM_FP_RATE)
+        # 精確集合仍比較小時維持原樣，等下次加入單字再判斷
+        if len(layer.data) >= len(self.ids) * self.ids.itemsize:
+            return
+        for wid in self.ids:
+            layer.add(wid)
+        self.kind = KIND_BLOOM
+        self.layers = [layer]
+        self.ids = array('Q')
+
+    @property
+    def size(self) -> int:
+        """索引佔用的位元組數"""
+        if self.kind == KIND_EXACT:
+            return len(self.ids) * self.ids.itemsize
+        return sum(len(layer.data) for layer in self.layers)
+
+    def dump(self) -> tuple:
+        if self.kind == KIND_EXACT:
+            data = self.ids.tobytes()
+        else:
+            data = b"".join(layer.dump() for layer in self.layers)
+        return self.kind, data, self.count, json.dumps(self.recent, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, kind: int, data: bytes, count: int, recent: str) -> '_UserWords':
+        words = cls()
+        words.kind = kind
+        words.count = count
+        words.recent = json.loads(recent)
+        if kind == KIND_EXACT:
+            words.ids.frombytes(data)
+        else:
+            offset = 0
+            while offset < len(data):
+                layer, offset = _BloomLayer.load(data, offset)
+                words.layers.append(layer)
+        return words
+
+
+class SeenWordIndex:
+    """
+    每個使用者看過的單字索引（依語言分開），取代以對話紀錄記住出過的單字
+
+    - 單字以 64 位元雜湊保存在排序陣列中；長期使用者超過上限後，若依目前數量與誤判率配置的 Bloom filter 較小，
+      改用 Bloom filter，裝滿後再加上更大的一層
+    - 另外保留最近幾個單字的原文，作為提示詞中「避免這些單字」的提示
+    - 保存於 SQLite，重新啟動與多個 worker 之間共用
+    - 解碼後的索引快取在行程內，其他 worker 寫入後（PRAGMA data_version 改變）才重新讀取
+    """
+
+    def __init__(self, db_path: str = ":memory:", cache_size: int = CACHE_SIZE):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self._data_version = None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.db_path != ":memory:":
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen_words (
+                language TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                kind INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                count INTEGER NOT NULL,
+                recent TEXT NOT NULL,
+                PRIMARY KEY (language, chat_id)
+            )
+        """)
+        self._conn = conn
+        self._pid = os.getpid()
+        self._cache.clear()
+        self._data_version = None
+        return conn
+
+    def _load(self, conn: sqlite3.Connection, language: str, chat_id: str) -> _UserWords:
+        # 其他連線提交後 data_version 會改變，快取的索引可能已過時
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._cache.clear()
+
+        key = (language, chat_id)
+        user = self._cache.get(key)
+        if user is not None:
+            self._cache.move_to_end(key)
+            return user
+
+        row = conn.execute(
+            "SELECT kind, data, count, recent FROM seen_words WHERE language = ? AND chat_id = ?", key
+        ).fetchone()
+        user = _UserWords.load(*row) if row else _UserWords()
+        self._cache[key] = user
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return user
+
+    def filter_unseen(self, language: str, chat_id: str, words: List[str]) -> List[bool]:
+        """回傳每個單字是否尚未看過"""
+        with self._lock:
+            user = self._load(self._connection(), language, chat_id)
+            return [not user.contains(word_id(word)) for word in words]
+
+    def recent(self, language: str, chat_id: str) -> List[str]:
+        """最近看過的單字原文（提示詞用）"""
+        with self._lock:
+            return list(self._load(self._connection(), language, chat_id).recent)
+
+    def mark_seen(self, language: str, chat_id: str, words: Iterable[str]) -> None:
+        """記錄使用者已看過這些單字"""
+        words = [word for word in words if word]
+        if not words:
+            return
+
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                user = self._load(conn, language, chat_id)
+                for word in words:
+                    user.add(word_id(word), word)
+                conn.execute(
+                    "INSERT INTO seen_words (language, chat_id, kind, data, count, recent) VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(language, chat_id) DO UPDATE SET kind = excluded.kind, data = excluded.data, "
+                    "count = excluded.count, recent = excluded.recent",
+                    (language, chat_id, *user.dump())
+                )
+                conn.execute("COMMIT")
+            except Exception as e:
+                conn.execute("ROLLBACK")
+                # 記憶體中的索引可能已修改，下次重新讀取
+                self._cache.pop((language, chat_id), None)
+                logger.error(f"Failed to record seen {language} words for {chat_id}: {e}")
+
+
+# 全域的已看過單字索引，預設只保存在行程內
+seen_word_index = SeenWordIndex()
+
+
+def init_seen_word_index(db_path: str = None) -> SeenWordIndex:
+    """
+    設定已看過單字索引的資料庫
+    :param db_path: SQLite 資料庫路徑，未指定時只保存在行程內
+    """
+    global seen_word_index
+    seen_word_index = SeenWordIndex(db_path or ":memory:")
+    return seen_word_index
+
+
+def filter_unseen(language: str, chat_id: str, words: List[str]) -> List[bool]:
+    return seen_word_index.filter_unseen(language, chat_id, words)
+
+
+def recent_words(language: str, chat_id: str) -> List[str]:
+    return seen_word_index.recent(language, chat_id)
+
+
+def mark_seen(language: str, chat_id: str, words: Iterable[str]) -> None:
+    seen_word_index.mark_seen(language, chat_id, words)
@@ -0,0 +1,321 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.services.conversation_store import Conversation
+
+logger = logging.getLogger(__name__)
+
+
+class SessionBackend(ABC):
+    """
+    會話狀態儲存後端：保存各功能的對話紀錄與聊天室的 AI 回應狀態、連發訊息合併狀態
+
+    save_conversation 的呼叫端需持有該聊天室的鎖，後端可在呼叫當下取得一致的內容
+    """
+
+    @abstractmethod
+    def get_conversation(self, session_type: str, chat_id: str) -> Optional[Conversation]:
+        ...
+
+    @abstractmethod
+    def save_conversation(self, session_type: str, chat_id: str, conversation: Conversation) -> None:
+        ...
+
+    @abstractmethod
+    def delete_conversation(self, session_type: str, chat_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_ai_status(self, chat_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def set_ai_status(self, chat_id: str, enabled: bool) -> None:
+        ...
+
+    @abstractmethod
+    def get_debounce_status(self, chat_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def set_debounce_status(self, chat_id: str, enabled: bool) -> None:
+        ...
+
+    def flush(self) -> None:
+        """將尚未寫入的變更寫出（記憶體後端不需處理）"""
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    單一行程的記憶體後端（預設），多個 worker 之間不共享
+    """
+
+    def __init__(self):
+        self.user_sessions: Dict[str, Dict[str, Conversation]] = {}
+        self.chat_ai_status: Dict[str, bool] = {}
+        self.chat_debounce_status: Dict[str, bool] = {}
+
+    def get_conversation(self, session_type: str, chat_id: str) -> Optional[Conversation]:
+        return self.user_sessions.get(session_type, {}).get(chat_id)
+
+    def save_conversation(self, session_type: str, chat_id: str, conversation: Conversation) -> None:
+        self.user_sessions.setdefault(session_type, {})[chat_id] = conversation
+
+    def delete_conversation(self, session_type: str, chat_id: str) -> None:
+        self.user_sessions.get(session_type, {}).pop(chat_id, None)
+
+    def get_ai_status(self, chat_id: str) -> bool:
+        return self.chat_ai_status.get(chat_id, False)
+
+    def set_ai_status(self, chat_id: str, enabled: bool) -> None:
+        self.chat_ai_status[chat_id] = enabled
+
+    def get_debounce_status(self, chat_id: str) -> bool:
+        return self.chat_debounce_status.get(chat_id, False)
+
+    def set_debounce_status(self, chat_id: str, enabled: bool) -> None:
+        self.chat_debounce_status[chat_id] = enabled
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    同一主機上多個 worker 共享的 SQLite（WAL 模式）後端
+
+    - 讀取：先查本地快取，只有在 PRAGMA data_version 顯示其他行程有寫入時，才比對該筆的版本並重新載入
+    - 寫入：對話紀錄在儲存當下（呼叫端持有該聊天室的鎖）序列化，由背景執行緒定期以單一交易批次寫出，
+      背景寫出時不會讀到請求執行緒修改到一半的對話紀錄；寫入失敗時整批放回待寫入清單
+    - AI 回應狀態與連發訊息合併狀態變動少且影響使用者體驗，直接寫入
+    """
+
+    # 聊天室開關狀態的資料表
+    _FLAG_TABLES = ('ai_status', 'debounce_status')
+
+    def __init__(self, db_path: str, flush_interval: float = 0.2, cache_size: int = 10000):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+
+        # key -> (version, Conversation, 驗證時的 generation)
+        self._cache: OrderedDict = OrderedDict()
+        # key -> (Conversation, 儲存當下序列化的內容)，None 表示刪除
+        self._dirty: Dict[Tuple[str, str], Optional[Tuple[Conversation, str]]] = {}
+        # (資料表, chat_id) -> (狀態, 驗證時的 generation)
+        self._flags: Dict[Tuple[str, str], Tuple[bool, int]] = {}
+        self._generation = 0
+        self._data_version = None
+
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+        self._flusher = None
+
+        # 結束行程前寫出尚未寫入的變更
+        atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立連線與背景執行緒）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS conversations (
+                session_type TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                version TEXT NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (session_type, chat_id)
+            )
+        """)
+        for table in self._FLAG_TABLES:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    chat_id TEXT PRIMARY KEY,
+                    enabled INTEGER NOT NULL
+                )
+            """)
+
+        self._conn = conn
+        self._pid = os.getpid()
+        self._cache.clear()
+        self._dirty.clear()
+        self._flags.clear()
+        self._data_version = None
+        self._flusher = threading.Thread(target=self._flush_loop, name="session-flusher", daemon=True)
+        self._flusher.start()
+        logger.info(f"SQLite session backend opened at {self.db_path} (pid {self._pid})")
+        return conn
+
+    def _check_data_version(self, conn: sqlite3.Connection) -> None:
+        """其他連線提交後 data_version 會改變，此時讓所有快取項目在下次讀取時重新驗證"""
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._generation += 1
+
+    def get_conversation(self, session_type: str, chat_id: str) -> Optional[Conversation]:
+        key = (session_type, chat_id)
+        with self._lock:
+            conn = self._connection()
+
+            # 尚未寫出的變更以本地為準
+            if key in self._dirty:
+                pending = self._dirty[key]
+                return pending[0] if pending is not None else None
+
+            self._check_data_version(conn)
+            cached = self._cache.get(key)
+            if cached is not None and cached[2] == self._generation:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+            if cached is not None:
+                row = conn.execute(
+                    "SELECT version FROM conversations WHERE session_type = ? AND chat_id = ?", key
+                ).fetchone()
+                if row is not None and row[0] == cached[0]:
+                    self._remember(key, cached[0], cached[1])
+                    return cached[1]
+
+            row = conn.execute(
+                "SELECT version, data FROM conversations WHERE session_type = ? AND chat_id = ?", key
+            ).fetchone()
+            if row is None:
+                self._cache.pop(key, None)
+                return None
+
+            conversation = Conversation.load(json.loads(row[1]))
+            self._remember(key, row[0], conversation)
+            return conversation
+
+    def save_conversation(self, session_type: str, chat_id: str, conversation: Conversation) -> None:
+        data = json.dumps(conversation.dump(), ensure_ascii=False)
+        with self._lock:
+            self._connection()
+            self._dirty[(session_type, chat_id)] = (conversation, data)
+
+    def delete_conversation(self, session_type: str, chat_id: str) -> None:
+        with self._lock:
+            self._connection()
+            self._dirty[(session_type, chat_id)] = None
+
+    def get_ai_status(self, chat_id: str) -> bool:
+        return self._get_flag('ai_status', chat_id)
+
+    def set_ai_status(self, chat_id: str, enabled: bool) -> None:
+        self._set_flag('ai_status', chat_id, enabled)
+
+    def get_debounce_status(self, chat_id: str) -> bool:
+        return self._get_flag('debounce_status', chat_id)
+
+    def set_debounce_status(self, chat_id: str, enabled: bool) -> None:
+        self._set_flag('debounce_status', chat_id, enabled)
+
+    def _get_flag(self, table: str, chat_id: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            self._check_data_version(conn)
+            cached = self._flags.get((table, chat_id))
+            if cached is not None and cached[1] == self._generation:
+                return cached[0]
+
+            row = conn.execute(f"SELECT enabled FROM {table} WHERE chat_id = ?", (chat_id,)).fetchone()
+            enabled = bool(row[0]) if row else False
+            self._flags[(table, chat_id)] = (enabled, self._generation)
+            return enabled
+
+    def _set_flag(self, table: str, chat_id: str, enabled: bool) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                f"INSERT INTO {table} (chat_id, enabled) VALUES (?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET enabled = excluded.enabled",
+                (chat_id, int(enabled))
+            )
+            self._flags[(table, chat_id)] = (enabled, self._generation)
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty or self._pid != os.getpid():
+                return
+            conn = self._conn
+            dirty, self._dirty = self._dirty, {}
+
+            try:
+                upserts = []
+                deletes = []
+                versions = {}
+                for key, pending in dirty.items():
+                    if pending is None:
+                        deletes.append(key)
+                    else:
+                        versions[key] = uuid.uuid4().hex
+                        upserts.append((*key, versions[key], pending[1]))
+
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO conversations (session_type, chat_id, version, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(session_type, chat_id) DO UPDATE SET version = excluded.version, data = excluded.data",
+                    upserts
+                )
+                conn.executemany("DELETE FROM conversations WHERE session_type = ? AND chat_id = ?", deletes)
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # 寫入失敗時放回待寫入清單，期間較新的變更優先
+                for key, pending in dirty.items():
+                    self._dirty.setdefault(key, pending)
+                logger.error(f"Failed to flush {len(dirty)} sessions to {self.db_path}: {e}")
+                return
+
+            for key, pending in dirty.items():
+                if pending is None:
+                    self._cache.pop(key, None)
+                else:
+                    self._remember(key, versions[key], pending[0])
+
+    def _remember(self, key: Tuple[str, str], version: str, conversation: Conversation) -> None:
+        self._cache[key] = (version, conversation, self._generation)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Session flusher error: {e}")
+
+
+def create_session_backend(backend: str, db_path: str = None, flush_interval: float = 0.2) -> SessionBackend:
+    """
+    依設定建立會話儲存後端
+    :param backend: 'memory' 或 'sqlite'
+    :param db_path: SQLite 資料庫路徑（sqlite 後端使用）
+    :param flush_interval: 批次寫入間隔（秒）
+    """
+    backend = (backend or 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteSessionBackend(db_path, flush_interval=flush_interval)
+    if backend != 'memory':
+        logger.warning(f"Unknown session backend '{backend}', falling back to memory")
+    return MemorySessionBackend()
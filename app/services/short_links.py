@@ -0,0 +1,165 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class ShortLinkCache:
+    """
+    縮網址的並行取得與長期快取
+
+    - 已縮過的網址直接從 SQLite 取得（重新啟動與多個 worker 之間共用）
+    - 其餘網址以有上限的執行緒池同時縮短，整批有總期限；期限內沒有完成的網址先使用原網址，
+      背景完成後仍會寫入快取，下次即可使用
+    - 同一個網址正在縮短時不會重複送出
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_workers: int = 4, deadline: float = 3.0):
+        """
+        :param db_path: SQLite 資料庫路徑
+        :param max_workers: 同時縮短的網址數上限
+        :param deadline: 每批縮短的總期限（秒）
+        """
+        self.db_path = db_path
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shorten")
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+        self.requested = 0
+        self.cached = 0
+        self.shortened = 0
+        self.failed = 0
+        self.deadline_fallbacks = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.db_path != ":memory:":
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS short_links (
+                long_url TEXT PRIMARY KEY,
+                short_url TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def shorten_all(self, urls: List[str], shorten: Callable[[str], str]) -> List[str]:
+        """
+        縮短多個網址
+        :param shorten: 縮短單一網址的函式，失敗時回傳原網址
+        :return: 與輸入順序相同的網址列表，沒有縮短的網址為原網址
+        """
+        unique = list(dict.fromkeys(url for url in urls if url))
+        with self._lock:
+            conn = self._connection()
+            known = dict(conn.execute(
+                f"SELECT long_url, short_url FROM short_links WHERE long_url IN ({','.join('?' * len(unique))})",
+                unique
+            ).fetchall()) if unique else {}
+            self.requested += len(unique)
+            self.cached += len(known)
+
+            futures = {}
+            for url in unique:
+                if url in known:
+                    continue
+                future = self._pending.get(url)
+                if future is None:
+                    future = self._executor.submit(self._shorten, url, shorten)
+                    self._pending[url] = future
+                futures[url] = future
+
+        if futures:
+            wait(futures.values(), timeout=self.deadline)
+            late = 0
+            for url, future in futures.items():
+                if future.done():
+                    known[url] = future.result()
+                else:
+                    late += 1
+            if late:
+                with self._lock:
+                    self.deadline_fallbacks += late
+                logger.warning(f"URL shortening deadline ({self.deadline:g}s) exceeded for {late} URLs, "
+                               f"using original URLs")
+
+        return [known.get(url, url) for url in urls]
+
+    def _shorten(self, url: str, shorten: Callable[[str], str]) -> str:
+        try:
+            try:
+                short_url = shorten(url)
+            except Exception as e:
+                logger.error(f"URL shortening failed: {e}")
+                short_url = None
+            if not short_url or short_url == url:
+                with self._lock:
+                    self.failed += 1
+                return url
+
+            with self._lock:
+                self.shortened += 1
+                try:
+                    self._connection().execute(
+                        "INSERT OR REPLACE INTO short_links (long_url, short_url, created_at) VALUES (?, ?, ?)",
+                        (url, short_url, time.time())
+                    )
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to store short link: {e}")
+            return short_url
+        finally:
+            with self._lock:
+                self._pending.pop(url, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM short_links").fetchone()[0]
+            return {
+                "entries": entries,
+                "requested": self.requested,
+                "cached": self.cached,
+                "shortened": self.shortened,
+                "failed": self.failed,
+                "deadline_fallbacks": self.deadline_fallbacks,
+                "hit_rate": round(self.cached / self.requested, 4) if self.requested else 0.0
+            }
+
+
+# 全域的縮網址快取，預設只保存在行程內
+short_links = ShortLinkCache()
+
+
+def init_short_links(db_path: str = None, max_workers: int = 4, deadline: float = 3.0) -> ShortLinkCache:
+    """
+    設定縮網址快取
+    :param db_path: SQLite 資料庫路徑，未指定時只保存在行程內
+    :param max_workers: 同時縮短的網址數上限
+    :param deadline: 每批縮短的總期限（秒）
+    """
+    global short_links
+    short_links = ShortLinkCache(db_path or ":memory:", max_workers, deadline)
+    return short_links
+
+
+def shorten_urls(urls: List[str], shorten: Callable[[str], str]) -> List[str]:
+    return short_links.shorten_all(urls, shorten)
@@ -0,0 +1,275 @@
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Sequence, Tuple, Union
+
+from app.services import groq_service
+from app.services.word_cache import normalize_word
+
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class ObjectSchema:
+    """
+    結構化回覆中單一物件的欄位定義
+
+    - fields：物件應有的欄位，缺少時以一次精簡的請求補齊，仍缺少則補空字串
+    - essential：補齊後仍缺少就捨棄整個物件的欄位
+    - key：辨識物件的欄位（例如單字本身），補齊請求回覆時以此對應
+    """
+
+    def __init__(self, fields: Sequence[str], essential: Sequence[str], key: str = "word"):
+        self.fields = list(fields)
+        self.essential = list(essential)
+        self.key = key
+
+    def normalize(self, item: Any) -> Union[dict, None]:
+        """整理成只含已知欄位的字串字典，缺少辨識欄位時返回 None"""
+        if not isinstance(item, dict):
+            return None
+        key = item.get(self.key)
+        if not isinstance(key, str) or not key.strip():
+            return None
+        data = {field: _as_text(item.get(field)) for field in self.fields}
+        data[self.key] = key.strip()
+        return data
+
+    def missing(self, data: dict) -> List[str]:
+        return [field for field in self.fields if not data.get(field)]
+
+    def is_complete(self, data: dict) -> bool:
+        return all(data.get(field) for field in self.essential)
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        return "、".join(str(v) for v in value if v)
+    return str(value).strip()
+
+
+def repair_json(text: Union[str, None]) -> Tuple[Any, bool]:
+    """
+    解析模型回覆的 JSON，格式有誤時在本地修復
+
+    依序嘗試：直接解析、去除 Markdown 程式碼區塊、略過前後多餘的文字、移除結尾逗號、
+    補上被截斷的括號（捨棄最後一個不完整的值），最後取出其中所有完整的物件
+    :return: (解析結果, 是否經過修復)，無法修復時結果為 None
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None, False
+
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+
+    candidate = _FENCE.sub("", text.strip())
+    starts = [i for i in (candidate.find("{"), candidate.find("[")) if i != -1]
+    if not starts:
+        return None, False
+    candidate = candidate[min(starts):]
+
+    decoder = json.JSONDecoder()
+    for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+        try:
+            return decoder.raw_decode(attempt)[0], True
+        except json.JSONDecodeError:
+            pass
+
+    closed = _close_truncated(_TRAILING_COMMA.sub(r"\1", candidate))
+    if closed is not None:
+        try:
+            return json.loads(closed), True
+        except json.JSONDecodeError:
+            pass
+
+    objects = _complete_objects(candidate)
+    return (objects, True) if objects else (None, False)
+
+
+def _close_truncated(text: str) -> Union[str, None]:
+    """被截斷的 JSON：退回到最後一個逗號（捨棄不完整的值），再依序補上未閉合的括號"""
+    stack = []
+    in_string = escaped = False
+    last_comma = None
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack:
+                return None
+            stack.pop()
+            if not stack:
+                return None
+        elif ch == ",":
+            last_comma = (i, list(stack))
+
+    if not stack or last_comma is None:
+        return None
+    end, still_open = last_comma
+    return text[:end] + "".join("}" if ch == "{" else "]" for ch in reversed(still_open))
+
+
+def _complete_objects(text: str) -> List[Any]:
+    """取出文字中所有完整的物件（由外而內，取到的物件內部不再重複取出）"""
+    decoder = json.JSONDecoder()
+    items = []
+    position = text.find("{")
+    while position != -1:
+        try:
+            item, end = decoder.raw_decode(text, position)
+        except json.JSONDecodeError:
+            position = text.find("{", position + 1)
+            continue
+        items.append(item)
+        position = text.find("{", end)
+    # 被截斷的包裝物件（例如 {"words": [...]）無法解析，會改取到其中完整的單字物件
+    return items
+
+
+def extract_items(data: Any, list_key: Union[str, None]) -> list:
+    """從解析結果取出物件列表：{list_key: [...]}、單一物件或陣列"""
+    if isinstance(data, dict):
+        if list_key and isinstance(data.get(list_key), list):
+            return data[list_key]
+        # 有些模型會使用別的鍵名包裝陣列
+        nested = next((value for value in data.values() if isinstance(value, list)), None)
+        return nested if nested is not None else [data]
+    if isinstance(data, list):
+        return data
+    return []
+
+
+class ParseStats:
+    """各模型結構化回覆的解析結果統計"""
+
+    OUTCOMES = ("parsed", "repaired", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, int]] = {}
+        self.incomplete_items = 0
+        self.completed_items = 0
+        self.dropped_items = 0
+
+    def record(self, model: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._models.setdefault(model, dict.fromkeys(self.OUTCOMES, 0))
+            counts[outcome] += 1
+
+    def record_items(self, incomplete: int = 0, completed: int = 0, dropped: int = 0) -> None:
+        with self._lock:
+            self.incomplete_items += incomplete
+            self.completed_items += completed
+            self.dropped_items += dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = {}
+            for model, counts in self._models.items():
+                total = sum(counts.values())
+                models[model] = dict(counts, responses=total,
+                                     failure_rate=round(counts["failed"] / total, 4) if total else 0.0)
+            return {
+                "models": models,
+                "incomplete_items": self.incomplete_items,
+                "completed_items": self.completed_items,
+                "dropped_items": self.dropped_items
+            }
+
+
+parse_stats = ParseStats()
+
+
+def generate_objects(chat_id: str, prompt: str, session_type: str, schema: ObjectSchema,
+                     list_key: str = None, shared: bool = False) -> List[dict]:
+    """
+    以 JSON 物件模式生成並驗證結構化內容
+
+    回覆格式有誤時先在本地修復；物件缺少欄位時只針對這些物件與欄位送出一次精簡的補齊請求，
+    仍缺少必要欄位的物件才捨棄
+    :param list_key: 回覆中物件列表的鍵名，單一物件的回覆為 None
+    :param shared: 不屬於單一聊天室的請求（同時進行的相同請求共用結果）
+    :return: 通過驗證的物件列表
+    """
+    reply, model = groq_service.generate_json(chat_id, prompt, session_type, shared)
+    if reply is None:
+        return []
+
+    data, repaired = repair_json(reply)
+    if data is None:
+        parse_stats.record(model, "failed")
+        logger.error(f"Unparseable {session_type} response from {model}: {reply[:200]}")
+        return []
+    parse_stats.record(model, "repaired" if repaired else "parsed")
+    if repaired:
+        logger.warning(f"Repaired malformed {session_type} response from {model}")
+
+    items = [item for item in map(schema.normalize, extract_items(data, list_key)) if item is not None]
+
+    incomplete = [item for item in items if schema.missing(item)]
+    if incomplete:
+        completed = _complete_missing_fields(chat_id, session_type, schema, incomplete, shared)
+        parse_stats.record_items(incomplete=len(incomplete), completed=completed)
+
+    valid = [item for item in items if schema.is_complete(item)]
+    if len(valid) < len(items):
+        parse_stats.record_items(dropped=len(items) - len(valid))
+        logger.warning(f"Dropped {len(items) - len(valid)} incomplete {session_type} items")
+    return valid
+
+
+def _complete_missing_fields(chat_id: str, session_type: str, schema: ObjectSchema, items: List[dict],
+                             shared: bool) -> int:
+    """
+    只請模型補齊缺少的欄位，結果直接寫回 items
+    :return: 補齊所有欄位的物件數
+    """
+    requests = [{schema.key: item[schema.key], "missing": schema.missing(item)} for item in items]
+    prompt = ("以下每個物件缺少 missing 列出的欄位，請補齊。"
+              f"以 JSON 物件 {{\"items\": [...]}} 回覆，每個元素只包含 {schema.key} 與補上的欄位：\n"
+              f"{json.dumps(requests, ensure_ascii=False)}")
+
+    reply, model = groq_service.generate_json(chat_id, prompt, session_type, shared)
+    data, repaired = repair_json(reply)
+    if data is None:
+        if reply is not None:
+            parse_stats.record(model, "failed")
+        return 0
+    parse_stats.record(model, "repaired" if repaired else "parsed")
+
+    fills = {}
+    for fill in extract_items(data, "items"):
+        if isinstance(fill, dict) and isinstance(fill.get(schema.key), str):
+            fills[normalize_word(fill[schema.key])] = fill
+
+    completed = 0
+    for item in items:
+        fill = fills.get(normalize_word(item[schema.key]))
+        if fill is None:
+            continue
+        for field in schema.missing(item):
+            item[field] = _as_text(fill.get(field))
+        if not schema.missing(item):
+            completed += 1
+    return completed
+
+
+def get_parse_stats() -> dict:
+    return parse_stats.stats()
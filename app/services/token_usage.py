@@ -0,0 +1,221 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 不屬於單一聊天室的共用請求（例如訂閱推播共用的生成結果）記在這個 ID 下
+SHARED_CHAT_ID = "*shared*"
+
+
+class TokenUsageTracker:
+    """
+    記錄每次 Groq 呼叫的 prompt / completion tokens，依 (日期, 聊天室, 會話類型, 模型) 累計
+
+    - 記錄時只更新記憶體中的計數器，由背景執行緒定期以單一交易寫入 SQLite
+    - 記憶體只保留上次寫出後的增量，與每個聊天室當日已寫出總量的快取
+    - 每日額度以「已寫出的總量 + 尚未寫出的增量」判斷，多個 worker 共用同一個資料庫時也能累計
+    - 已寫出總量的快取在其他 worker 寫入後（PRAGMA data_version 改變）失效，判斷額度時重新讀取
+
+    其他 worker 尚未寫出的增量看不到，因此額度最多可能超出「其他 worker 在一個寫入間隔內的用量」。
+    """
+
+    def __init__(self, db_path: str = ":memory:", flush_interval: float = 30.0, daily_budget: int = 0):
+        """
+        :param db_path: SQLite 資料庫路徑，預設為行程內的記憶體資料庫
+        :param flush_interval: 寫入間隔（秒）
+        :param daily_budget: 每個聊天室每日的 token 額度，0 表示不限制
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.daily_budget = daily_budget
+
+        # (day, chat_id, session_type, model) -> [requests, prompt_tokens, completion_tokens]
+        self._pending: Dict[Tuple[str, str, str, str], List[int]] = {}
+        # (day, chat_id) -> 尚未寫出的 tokens
+        self._pending_by_chat: Dict[Tuple[str, str], int] = {}
+        # (day, chat_id) -> 已寫出的 tokens（任何 worker 寫出後失效，下次判斷額度時重新讀取）
+        self._persisted_by_chat: Dict[Tuple[str, str], int] = {}
+        self._data_version = None
+
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pid = None
+
+        atexit.register(self.flush)
+
+    @staticmethod
+    def _today() -> str:
+        return time.strftime("%Y-%m-%d")
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立連線與背景執行緒）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.db_path != ":memory:":
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS token_usage (
+                day TEXT NOT NULL,
+                chat_id TEXT NOT NULL,
+                session_type TEXT NOT NULL,
+                model TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                PRIMARY KEY (day, chat_id, session_type, model)
+            )
+        """)
+
+        self._conn = conn
+        self._pid = os.getpid()
+        self._pending.clear()
+        self._pending_by_chat.clear()
+        self._persisted_by_chat.clear()
+        self._data_version = None
+        threading.Thread(target=self._flush_loop, name="token-usage-flusher", daemon=True).start()
+        return conn
+
+    def record(self, chat_id: str, session_type: str, model: str, usage) -> None:
+        """
+        累計一次呼叫的用量
+        :param usage: Groq 回應的 usage（含 prompt_tokens、completion_tokens），沒有時只累計請求數
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        day = self._today()
+
+        with self._lock:
+            self._connection()
+            counters = self._pending.get((day, chat_id, session_type, model))
+            if counters is None:
+                counters = self._pending[(day, chat_id, session_type, model)] = [0, 0, 0]
+            counters[0] += 1
+            counters[1] += prompt_tokens
+            counters[2] += completion_tokens
+            self._pending_by_chat[(day, chat_id)] = (
+                self._pending_by_chat.get((day, chat_id), 0) + prompt_tokens + completion_tokens
+            )
+
+    def used_today(self, chat_id: str) -> int:
+        """聊天室今日已使用的 tokens"""
+        key = (self._today(), chat_id)
+        with self._lock:
+            conn = self._connection()
+            # 其他連線提交後 data_version 會改變，快取的已寫出總量可能已過時
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._persisted_by_chat.clear()
+            persisted = self._persisted_by_chat.get(key)
+            if persisted is None:
+                row = conn.execute(
+                    "SELECT COALESCE(SUM(prompt_tokens + completion_tokens), 0) FROM token_usage "
+                    "WHERE day = ? AND chat_id = ?", key
+                ).fetchone()
+                persisted = self._persisted_by_chat[key] = row[0]
+            return persisted + self._pending_by_chat.get(key, 0)
+
+    def within_budget(self, chat_id: str) -> bool:
+        """呼叫前檢查聊天室今日是否仍有額度"""
+        if self.daily_budget <= 0:
+            return True
+        return self.used_today(chat_id) < self.daily_budget
+
+    def flush(self) -> None:
+        """將累計的增量寫入資料庫"""
+        with self._lock:
+            if not self._pending or self._pid != os.getpid():
+                return
+            conn = self._conn
+            pending, self._pending = self._pending, {}
+            pending_by_chat, self._pending_by_chat = self._pending_by_chat, {}
+
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO token_usage (day, chat_id, session_type, model, requests, prompt_tokens, "
+                    "completion_tokens) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(day, chat_id, session_type, model) DO UPDATE SET "
+                    "requests = requests + excluded.requests, "
+                    "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                    "completion_tokens = completion_tokens + excluded.completion_tokens",
+                    [(*key, *counters) for key, counters in pending.items()]
+                )
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # 寫入失敗時放回，下次再寫
+                for key, counters in pending.items():
+                    merged = self._pending.setdefault(key, [0, 0, 0])
+                    for i, value in enumerate(counters):
+                        merged[i] += value
+                for key, tokens in pending_by_chat.items():
+                    self._pending_by_chat[key] = self._pending_by_chat.get(key, 0) + tokens
+                logger.error(f"Failed to flush token usage to {self.db_path}: {e}")
+                return
+
+            # 本連線的提交不會改變 data_version，已寫出的總量在下次判斷額度時重新讀取
+            self._persisted_by_chat.clear()
+
+    def summary(self, days: int = 1, top: int = 10) -> dict:
+        """
+        最近幾天的用量彙總
+        :param days: 包含今天在內的天數
+        :param top: 列出用量最高的聊天室數量
+        """
+        since = time.strftime("%Y-%m-%d", time.localtime(time.time() - (days - 1) * 86400))
+        self.flush()
+        with self._lock:
+            conn = self._connection()
+
+            def grouped(column: Optional[str], limit: int = -1) -> list:
+                sums = "SUM(requests), SUM(prompt_tokens), SUM(completion_tokens)"
+                if column is None:
+                    return conn.execute(f"SELECT {sums} FROM token_usage WHERE day >= ?", (since,)).fetchall()
+                return conn.execute(
+                    f"SELECT {column}, {sums} FROM token_usage WHERE day >= ? GROUP BY {column} "
+                    f"ORDER BY SUM(prompt_tokens + completion_tokens) DESC LIMIT ?",
+                    (since, limit)
+                ).fetchall()
+
+            def as_dict(requests, prompt_tokens, completion_tokens) -> dict:
+                prompt_tokens = prompt_tokens or 0
+                completion_tokens = completion_tokens or 0
+                return {
+                    "requests": requests or 0,
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens
+                }
+
+            return {
+                "since": since,
+                "daily_budget": self.daily_budget,
+                "total": as_dict(*grouped(None)[0]),
+                "by_session_type": {row[0]: as_dict(*row[1:]) for row in grouped("session_type")},
+                "by_model": {row[0]: as_dict(*row[1:]) for row in grouped("model")},
+                "top_chats": [dict(chat_id=row[0], **as_dict(*row[1:])) for row in grouped("chat_id", top)]
+            }
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Token usage flusher error: {e}")
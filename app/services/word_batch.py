@@ -0,0 +1,117 @@
+import logging
+from typing import Callable, List, NamedTuple
+
+from app.services.headwords import has_headwords, pick_headwords
+from app.services.seen_words import filter_unseen, recent_words
+from app.services.structured_output import ObjectSchema, generate_objects
+from app.services.word_cache import lookup_words, normalize_word, resolve_words
+
+logger = logging.getLogger(__name__)
+
+# 批次生成後缺少的單字（格式錯誤、重複、已看過或數量不足）最多再補生成的次數
+MAX_REGENERATE_ATTEMPTS = 1
+
+
+class WordSource(NamedTuple):
+    """
+    單字學習內容的來源設定（英文、日文各一份）
+
+    - build_word_prompt(難度, 數量, 要避開的單字)：由模型選字的提示詞
+    - build_detail_prompt(單字)：只請模型補上指定單字詳細資料的提示詞
+    """
+    language: str
+    session_type: str
+    schema: ObjectSchema
+    build_word_prompt: Callable[[str, int, List[str]], str]
+    build_detail_prompt: Callable[[List[str]], str]
+
+
+def generate_word_batch(source: WordSource, chat_id: str, level: str, count: int, shared: bool = False,
+                        exclude: List[str] = None) -> List[dict]:
+    """
+    以單一請求生成多個不重複的單字
+
+    有附帶的單字清單時在本地選出使用者沒看過的單字，已保存詳細資料的單字不需呼叫模型，其餘只請模型補上詳細資料；
+    清單中沒看過的單字不足（或沒有清單）時由模型選字，請求不帶對話紀錄，只以精簡的提示詞附上使用者最近看過的單字，
+    生成後再以使用者的已看過單字索引過濾。
+    回覆中格式正確的新單字都會保留，缺少的數量（格式錯誤、重複、已看過或回覆不足）才再補生成
+    :param shared: 不屬於單一使用者的內容（單字池、訂閱推播），不依使用者看過的單字過濾
+    :param exclude: 額外要避開的單字
+    :return: 單字資料列表，數量可能少於 count
+    """
+    words = []
+    taken = {word.lower() for word in exclude or []}
+    hint = list(exclude or [])
+    use_headwords = has_headwords(source.language, level)
+    if not shared and not use_headwords:
+        hint.extend(recent_words(source.language, chat_id))
+
+    for attempt in range(MAX_REGENERATE_ATTEMPTS + 1):
+        missing = count - len(words)
+        if missing <= 0:
+            break
+
+        candidates = []
+        model_count = missing
+        if use_headwords:
+            accept = None if shared else (lambda batch: filter_unseen(source.language, chat_id, batch))
+            headwords = pick_headwords(source.language, level, missing, taken, accept)
+            candidates = describe_headwords(source, chat_id, level, headwords, shared)
+            model_count = missing - len(headwords)
+            if model_count > 0:
+                # 使用者已看過清單中大部分的單字，其餘改由模型選字
+                logger.info(f"{source.language} {level} word list exhausted for {chat_id}, "
+                            f"asking the model for {model_count} more")
+                use_headwords = False
+                if not shared:
+                    hint.extend(recent_words(source.language, chat_id))
+
+        if model_count > 0:
+            prompt = source.build_word_prompt(level, model_count, hint)
+            generated = generate_objects(chat_id, prompt, source.session_type, source.schema,
+                                         list_key="words", shared=shared)
+            # 已知的單字沿用保存的內容，新的單字保存起來
+            candidates.extend(resolve_words(source.language, level, generated))
+
+        unseen = [True] * len(candidates) if shared else filter_unseen(
+            source.language, chat_id, [word_data["word"] for word_data in candidates])
+
+        for word_data, is_new in zip(candidates, unseen):
+            key = word_data["word"].lower()
+            if key in taken:
+                continue
+            # 已看過的單字也加入提示，補生成時避開
+            taken.add(key)
+            hint.append(word_data["word"])
+            if not is_new:
+                continue
+            words.append(word_data)
+            if len(words) == count:
+                break
+
+        if len(words) < count:
+            logger.warning(f"{source.language} word batch attempt {attempt + 1}: {len(candidates)} items returned, "
+                           f"{len(words)}/{count} usable")
+
+    return words
+
+
+def describe_headwords(source: WordSource, chat_id: str, level: str, headwords: List[str],
+                       shared: bool = False) -> List[dict]:
+    """
+    取得清單單字的詳細資料：已保存的單字直接沿用，其餘以一次請求請模型補上
+    :return: 取得詳細資料的單字，依 headwords 的順序
+    """
+    details = lookup_words(source.language, level, headwords)
+
+    missing = {normalize_word(word): word for word in headwords if normalize_word(word) not in details}
+    if missing:
+        generated = generate_objects(chat_id, source.build_detail_prompt(list(missing.values())), source.session_type,
+                                     source.schema, list_key="words", shared=shared)
+        # 只保留清單中的單字，並沿用清單的寫法
+        generated = [dict(word_data, word=missing[normalize_word(word_data["word"])]) for word_data in generated
+                     if normalize_word(word_data["word"]) in missing]
+        for word_data in resolve_words(source.language, level, generated):
+            details[normalize_word(word_data["word"])] = word_data
+
+    return [details[key] for key in map(normalize_word, headwords) if key in details]
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_word(word: str) -> str:
+    """全形轉半形、轉小寫並合併空白，作為快取鍵"""
+    return " ".join(unicodedata.normalize("NFKC", word).strip().lower().split())
+
+
+class WordDetailCache:
+    """
+    已驗證的單字詳細資料（音標、解釋、例句）快取，以 (語言, 難度, 正規化單字) 為鍵
+
+    - 保存於 SQLite，重新啟動與多個 worker 之間共用
+    - 前面加一層行程內的 LRU，常見單字不需查詢資料庫
+    - 模型提出已知的單字時沿用保存的內容，同一個單字的資料保持一致
+    """
+
+    def __init__(self, db_path: str = ":memory:", lru_size: int = 1024):
+        """
+        :param db_path: SQLite 資料庫路徑
+        :param lru_size: 行程內 LRU 保留的單字數
+        """
+        self.db_path = db_path
+        self.lru_size = lru_size
+        self._lru: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+        self.lookups = 0
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.stored = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        if self.db_path != ":memory:":
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS word_details (
+                language TEXT NOT NULL,
+                level TEXT NOT NULL,
+                word TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (language, level, word)
+            )
+        """)
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _remember(self, key: Tuple[str, str, str], data: dict) -> None:
+        self._lru[key] = data
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, conn: sqlite3.Connection, key: Tuple[str, str, str]) -> Optional[dict]:
+        self.lookups += 1
+        data = self._lru.get(key)
+        if data is not None:
+            self._lru.move_to_end(key)
+            self.lru_hits += 1
+            return data
+
+        row = conn.execute(
+            "SELECT data FROM word_details WHERE language = ? AND level = ? AND word = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        self._remember(key, data)
+        self.db_hits += 1
+        return data
+
+    def get(self, language: str, level: str, word: str) -> Optional[dict]:
+        """查詢單字的詳細資料，沒有時返回 None"""
+        key = (language, level, normalize_word(word))
+        with self._lock:
+            data = self._lookup(self._connection(), key)
+        return dict(data) if data is not None else None
+
+    def get_many(self, language: str, level: str, words: List[str]) -> Dict[str, dict]:
+        """查詢多個單字的詳細資料，回傳 {正規化單字: 資料}，沒有保存的單字不在結果中"""
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            for word in words:
+                key = (language, level, normalize_word(word))
+                data = self._lookup(conn, key)
+                if data is not None:
+                    found[key[2]] = dict(data)
+        return found
+
+    def resolve(self, language: str, level: str, words: List[dict]) -> List[dict]:
+        """
+        以已保存的內容取代模型生成的單字資料，新的單字則保存起來
+        :param words: 已驗證的單字資料，需包含 word 欄位
+        :return: 與輸入順序相同的單字資料
+        """
+        resolved = []
+        new_rows = []
+        now = time.time()
+
+        with self._lock:
+            conn = self._connection()
+            for word_data in words:
+                key = (language, level, normalize_word(word_data["word"]))
+                cached = self._lookup(conn, key)
+                if cached is None:
+                    cached = dict(word_data)
+                    self._remember(key, cached)
+                    new_rows.append((*key, json.dumps(cached, ensure_ascii=False), now))
+                resolved.append(dict(cached))
+
+            if new_rows:
+                try:
+                    before = conn.total_changes
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO word_details (language, level, word, data, created_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        new_rows
+                    )
+                    self.stored += conn.total_changes - before
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to store {language} word details: {e}")
+
+        return resolved
+
+    def size(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT language, COUNT(*) FROM word_details GROUP BY language"
+            ).fetchall()
+        return dict(rows)
+
+    def stats(self) -> dict:
+        sizes = self.size()
+        with self._lock:
+            hits = self.lru_hits + self.db_hits
+            return {
+                "entries": sizes,
+                "lru_entries": len(self._lru),
+                "lookups": self.lookups,
+                "lru_hits": self.lru_hits,
+                "db_hits": self.db_hits,
+                "hit_rate": round(hits / self.lookups, 4) if self.lookups else 0.0,
+                "stored": self.stored
+            }
+
+
+# 全域的單字詳細資料快取，預設只保存在行程內
+word_cache = WordDetailCache()
+
+
+def init_word_cache(db_path: str = None, lru_size: int = 1024) -> WordDetailCache:
+    """
+    設定單字詳細資料快取
+    :param db_path: SQLite 資料庫路徑，未指定時只保存在行程內
+    :param lru_size: 行程內 LRU 保留的單字數
+    """
+    global word_cache
+    word_cache = WordDetailCache(db_path or ":memory:", lru_size)
+    return word_cache
+
+
+def lookup_words(language: str, level: str, words: List[str]) -> Dict[str, dict]:
+    return word_cache.get_many(language, level, words)
+
+
+def resolve_words(language: str, level: str, words: List[dict]) -> List[dict]:
+    return word_cache.resolve(language, level, words)
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.services.groq_async import llm_priority, PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+# 取用時需要過濾的話，先讀出所需數量幾倍的候選
+TAKE_CANDIDATE_FACTOR = 4
+
+
+class WordPool:
+    """
+    預先生成的單字池，依難度分開保存於 SQLite，重新啟動後仍保留
+
+    - 取用時直接從資料庫取出並刪除，同一主機的多個 worker 共用同一個池，不會重複發出同一筆
+    - 任一難度低於低水位時，背景執行緒以批次生成補到目標數量（以批次優先等級呼叫 LLM）
+    - 在 fork 前啟動的單字池，fork 出的 worker 在第一次存取時重新啟動自己的補充執行緒
+    """
+
+    def __init__(self, db_path: str, generate: Callable[[str, int], List[dict]], levels: Iterable[str],
+                 target_size: int = 30, low_water: int = 10, batch_size: int = 6, retry_interval: float = 60.0):
+        """
+        :param db_path: SQLite 資料庫路徑
+        :param generate: 生成單字的函式，接收 (難度, 數量)，回傳單字資料列表
+        :param levels: 難度列表
+        :param target_size: 每個難度補充到的數量
+        :param low_water: 低於此數量時開始補充
+        :param batch_size: 每次生成的單字數
+        :param retry_interval: 生成失敗後重試的間隔（秒）
+        """
+        self.db_path = db_path
+        self.levels = list(levels)
+        self.target_size = target_size
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self._generate = generate
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._conn = None
+        self._pid = None
+        self._worker = None
+        self._started = False
+
+        self.served = 0
+        self.missed = 0
+        self.generated = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前行程的連線（fork 後的 worker 會重新建立）"""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS word_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                level TEXT NOT NULL,
+                word TEXT NOT NULL,
+                data TEXT NOT NULL,
+                UNIQUE (level, word)
+            )
+        """)
+        self._conn = conn
+        self._pid = os.getpid()
+        # fork 後父行程的補充執行緒不存在於子行程
+        self._worker = None
+        if self._started:
+            self._wake = threading.Event()
+            self._ensure_worker()
+            self._wake.set()
+        return conn
+
+    def start(self) -> None:
+        """啟動背景補充執行緒，並立即檢查一次各難度的數量"""
+        with self._lock:
+            self._started = True
+            self._connection()
+            self._ensure_worker()
+        self._wake.set()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="word-pool-refill", daemon=True)
+            self._worker.start()
+
+    def take(self, level: str, count: int,
+             accept: Optional[Callable[[List[dict]], List[bool]]] = None) -> List[dict]:
+        """
+        取出最多 count 個單字（先進先出），數量不足時回傳現有的部分
+        :param accept: 過濾候選單字，回傳每個候選是否可用（例如排除使用者看過的單字）；不可用的單字留在池中
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, data FROM word_pool WHERE level = ? ORDER BY id LIMIT ?",
+                    (level, count if accept is None else count * TAKE_CANDIDATE_FACTOR)
+                ).fetchall()
+                if accept is not None:
+                    words = [json.loads(row[1]) for row in rows]
+                    rows = [row for row, ok in zip(rows, accept(words)) if ok][:count]
+                conn.executemany("DELETE FROM word_pool WHERE id = ?", [(row[0],) for row in rows])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            remaining = self._size(conn, level)
+            self.served += len(rows)
+            self.missed += count - len(rows)
+
+        if remaining < self.low_water:
+            self._wake.set()
+        return [json.loads(row[1]) for row in rows]
+
+    def put_back(self, level: str, words: List[dict]) -> int:
+        """歸還取出後沒有用到的單字（例如預取多出的部分），回傳實際加入的數量"""
+        return self._add(level, words) if words else 0
+
+    def size(self, level: str) -> int:
+        with self._lock:
+            return self._size(self._connection(), level)
+
+    @staticmethod
+    def _size(conn: sqlite3.Connection, level: str) -> int:
+        return conn.execute("SELECT COUNT(*) FROM word_pool WHERE level = ?", (level,)).fetchone()[0]
+
+    def _add(self, level: str, words: List[dict]) -> int:
+        """加入單字，已在池中的單字略過，回傳實際加入的數量"""
+        with self._lock:
+            conn = self._connection()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO word_pool (level, word, data) VALUES (?, ?, ?)",
+                [(level, word["word"].lower(), json.dumps(word, ensure_ascii=False)) for word in words]
+            )
+            return conn.total_changes - before
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while self._pid == pid:
+            self._wake.wait(self.retry_interval)
+            self._wake.clear()
+            for level in self.levels:
+                try:
+                    self._refill(level)
+                except Exception as e:
+                    logger.error(f"Failed to refill {level} word pool: {e}")
+
+    def _refill(self, level: str) -> None:
+        size = self.size(level)
+        if size >= self.low_water:
+            return
+
+        logger.info(f"Refilling {level} word pool from {size} to {self.target_size}")
+        while size < self.target_size:
+            # 補充是背景工作，排在使用者的即時請求之後
+            with llm_priority(PRIORITY_BATCH):
+                words = self._generate(level, min(self.batch_size, self.target_size - size))
+            added = self._add(level, words) if words else 0
+            self.generated += added
+            if added == 0:
+                # 生成失敗或全部重複，等下一輪再試
+                break
+            size = self.size(level)
+
+    def stats(self) -> Dict[str, object]:
+        requested = self.served + self.missed
+        return {
+            "sizes": {level: self.size(level) for level in self.levels},
+            "served": self.served,
+            "missed": self.missed,
+            "hit_rate": round(self.served / requested, 4) if requested else 0.0,
+            "generated": self.generated
+        }
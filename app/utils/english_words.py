@@ -1,13 +1,19 @@
-import json
 import logging
-from typing import Union
+from functools import partial
+from typing import List, Union
 
 from linebot.models import (
     FlexSendMessage, BubbleContainer, BoxComponent, TextComponent,
     ButtonComponent, URIAction, CarouselContainer, PostbackAction, SeparatorComponent, BubbleStyle, BlockStyle
 )
 
-from app.services.groq_service import chat_with_groq
+from app.models.subscription import SubscriptionContent
+from app.services.prefetch import MISS, start_prefetch, take_prefetched
+from app.services.review_deck import add_review_words
+from app.services.seen_words import filter_unseen, mark_seen
+from app.services.structured_output import ObjectSchema
+from app.services.word_batch import WordSource, generate_word_batch
+from app.services.word_pool import WordPool
 from app.utils.google_tts import generate_audio_url
 from app.utils.theme import COLOR_THEME
 
@@ -27,9 +33,58 @@ DIFFICULTY_NAMES = {
     '3': '高級'
 }
 
+# 各難度等級的選字說明
+DIFFICULTY_PROMPTS = {
+    'beginner': "請選擇適合初學者的基礎英文單字，常見於日常對話中的簡單詞彙（如CEFR A1-A2級別）",
+    'intermediate': "請選擇難度符合台灣常見的「三千單」詞彙等級（如全民英檢中級、CEFR B1-B2級）的單字，應為日常生活中常見且實用的詞彙",
+    'advanced': "請選擇較具挑戰性的高級英文單字，適合進階學習者（如CEFR C1-C2級別），包含學術或專業領域常用詞彙"
+}
+
+REQUIRED_FIELDS = ["word", "pronunciation", "part_of_speech", "definition_en",
+                   "definition_zh", "example_sentence", "example_translation"]
+
+# 單字物件的欄位：缺少的欄位會請模型補齊，仍缺少單字或中文解釋時捨棄
+WORD_SCHEMA = ObjectSchema(REQUIRED_FIELDS, essential=("word", "definition_zh"))
+
+LANGUAGE = "english"
+
+# 預先生成的單字池，未初始化時一律即時生成
+word_pool: Union[WordPool, None] = None
+
+# 單字池的生成請求不屬於任何聊天室
+POOL_CHAT_ID = "*word-pool*"
+# 訂閱推播共用的生成請求不屬於任何聊天室
+SUBSCRIPTION_CHAT_ID = "*subscription*"
+
+# 顯示數量選單時預取的單字數（數量選單的最大值），多出的單字歸還單字池
+PREFETCH_WORD_COUNT = 6
+# 預取仍在執行時，最多等待的秒數
+PREFETCH_WAIT_SECONDS = 10
+
+
+def init_word_pool(db_path: str, target_size: int = 30, low_water: int = 10) -> WordPool:
+    """
+    建立各難度的單字池並啟動背景補充
+    :param db_path: SQLite 資料庫路徑
+    :param target_size: 每個難度補充到的數量
+    :param low_water: 低於此數量時開始補充
+    """
+    global word_pool
+    word_pool = WordPool(db_path, _generate_pool_words, DIFFICULTY_LEVELS.values(),
+                         target_size=target_size, low_water=low_water)
+    word_pool.start()
+    return word_pool
+
+
+def _generate_pool_words(difficulty_level: str, count: int) -> List[dict]:
+    """單字池的補充：不帶任何聊天室的紀錄"""
+    return get_english_word_batch(POOL_CHAT_ID, difficulty_level, count, shared=True)
+
 
 def get_english_words(chat_id: str, difficulty_id: int, count: int):
-    """獲取指定難度和數量的英文單字"""
+    """
+    獲取指定難度和數量的英文單字
+    """
     difficulty_level = DIFFICULTY_LEVELS.get(str(difficulty_id))
     difficulty_name = DIFFICULTY_NAMES.get(str(difficulty_id), '英文單字')
 
@@ -39,131 +94,149 @@ def get_english_words(chat_id: str, difficulty_id: int, count: int):
     return fetch_english_words_flex(chat_id, difficulty_name, difficulty_level, count)
 
 
+def prefetch_english_words(chat_id: str, difficulty_id: str) -> None:
+    """顯示數量選單時，先在背景準備該難度的單字"""
+    difficulty_level = DIFFICULTY_LEVELS.get(str(difficulty_id))
+    if difficulty_level:
+        # 沒有被取用的預取（被新的預取取代或逾時）會把單字歸還單字池
+        start_prefetch(chat_id, (LANGUAGE, difficulty_level), collect_english_words,
+                       chat_id, difficulty_level, PREFETCH_WORD_COUNT,
+                       on_discard=partial(_return_to_pool, difficulty_level))
+
+
 def fetch_english_words_flex(chat_id: str, difficulty_name: str, difficulty_level: str, count: int):
     """獲取英文單字並轉換為 Flex Message"""
     try:
-        # 準備 bubbles 用於 carousel
-        bubbles = []
-
-        for i in range(count):
-            word_data = get_single_english_word(chat_id, difficulty_level)
-
-            if isinstance(word_data, dict):
-                # 創建單字的 bubble
-                bubble = create_word_bubble(word_data, difficulty_name)
-                bubbles.append(bubble)
-            else:
-                logger.warning(f"Failed to generate word {i + 1}: {word_data}")
-
-        if not bubbles:
-            return "抱歉，無法生成英文單字，請稍後再試。"
-
-        # 如果只有一個單字，直接返回 FlexSendMessage
-        if len(bubbles) == 1:
-            return FlexSendMessage(
-                alt_text=f"英文單字學習 - {difficulty_name}",
-                contents=bubbles[0]
-            )
+        words = _take_prefetched_words(chat_id, difficulty_level, count)
+        record_received_words(chat_id, difficulty_level, words)
+        return build_english_words_flex(words, difficulty_name)
 
-        # 多個單字使用 carousel
-        carousel = CarouselContainer(contents=bubbles)
+    except Exception as e:
+        logger.error(f"Failed to fetch English words: {e}")
+        return "無法取得英文單字內容"
 
-        flex_message = FlexSendMessage(
-            alt_text=f"英文單字學習 - {difficulty_name} ({count}個)",
-            contents=carousel
-        )
 
-        return flex_message
+def create_subscription_content(difficulty_id: str, count: int) -> SubscriptionContent:
+    """
+    訂閱推播的內容：同一時段相同 (難度, 數量) 的訂閱者共用一份，不帶任何使用者的學習紀錄
+    """
+    difficulty_level = DIFFICULTY_LEVELS.get(str(difficulty_id))
+    difficulty_name = DIFFICULTY_NAMES.get(str(difficulty_id), '英文單字')
+    if not difficulty_level:
+        return SubscriptionContent(f"找不到難度代碼：{difficulty_id}", [], "")
 
+    try:
+        words = collect_english_words(SUBSCRIPTION_CHAT_ID, difficulty_level, count, shared=True)
+        return SubscriptionContent(build_english_words_flex(words, difficulty_name), words, difficulty_level)
     except Exception as e:
-        logger.error(f"Failed to fetch English words: {e}")
-        return "無法取得英文單字內容"
+        logger.error(f"Failed to create English subscription content: {e}")
+        return SubscriptionContent("無法取得英文單字內容", [], difficulty_level)
 
 
-def get_single_english_word(chat_id: str, difficulty_level: str) -> Union[dict, str]:
+def collect_english_words(chat_id: str, difficulty_level: str, count: int, shared: bool = False) -> List[dict]:
     """
-    獲取單個英文單字
+    取得指定數量的單字：先從預先生成的單字池取用，池中不足的部分才即時生成（一次請求生成所有缺少的單字）
+    :param shared: 不屬於單一使用者的內容（訂閱推播），不依使用者看過的單字過濾
     """
-    # 根據難度等級調整 prompt
-    difficulty_prompts = {
-        'beginner': "請選擇適合初學者的基礎英文單字，常見於日常對話中的簡單詞彙（如CEFR A1-A2級別）",
-        'intermediate': "請選擇難度符合台灣常見的「三千單」詞彙等級（如全民英檢中級、CEFR B1-B2級）的單字，應為日常生活中常見且實用的詞彙",
-        'advanced': "請選擇較具挑戰性的高級英文單字，適合進階學習者（如CEFR C1-C2級別），包含學術或專業領域常用詞彙"
-    }
-
-    prompt = f"""請提供一個英文單字的學習內容，包含以下欄位：
-
-    1. 單字 (word)
-    2. 發音（使用台灣常見的 KK 音標）(pronunciation)
-    3. 詞性 (part_of_speech)
-    4. 英文解釋 (definition_en)
-    5. 中文解釋 (definition_zh)
-    6. 例句 (example_sentence)
-    7. 例句翻譯 (example_translation)
-
-    {difficulty_prompts.get(difficulty_level, difficulty_prompts['intermediate'])}
-
-    請以 **純 JSON 格式** 回覆，**不要添加多餘說明或文字**，並請確認所有資訊準確無誤。
-
-    以下為格式範例：
-    {{
-      "word": "negotiate",
-      "pronunciation": "/nɪˈɡoʊʃiˌeɪt/",
-      "part_of_speech": "verb",
-      "definition_en": "to discuss something formally in order to reach an agreement",
-      "definition_zh": "協商、談判",
-      "example_sentence": "We need to negotiate a better deal with the supplier.",
-      "example_translation": "我們需要與供應商協商更好的條件。"
-    }}
+    # 使用者看過的單字不再出現
+    accept = None if shared else (
+        lambda candidates: filter_unseen(LANGUAGE, chat_id, [word["word"] for word in candidates]))
+
+    words = word_pool.take(difficulty_level, count, accept) if word_pool is not None else []
+    if len(words) < count:
+        taken = {word["word"].lower() for word in words}
+        live_words = get_english_word_batch(chat_id, difficulty_level, count - len(words), shared,
+                                            exclude=sorted(taken))
+        words.extend(word for word in live_words if word["word"].lower() not in taken)
+    if len(words) < count:
+        logger.warning(f"Generated {len(words)}/{count} English words for {chat_id}")
+    return words
+
+
+def _take_prefetched_words(chat_id: str, difficulty_level: str, count: int) -> List[dict]:
+    """優先使用數量選單時預取的單字，沒有預取結果時即時取得"""
+    prefetched = take_prefetched(chat_id, (LANGUAGE, difficulty_level), PREFETCH_WAIT_SECONDS)
+    if prefetched is MISS:
+        return collect_english_words(chat_id, difficulty_level, count)
+
+    words, leftover = prefetched[:count], prefetched[count:]
+    _return_to_pool(difficulty_level, leftover)
+    if len(words) < count:
+        taken = {word["word"].lower() for word in words}
+        live_words = get_english_word_batch(chat_id, difficulty_level, count - len(words), exclude=sorted(taken))
+        words.extend(word for word in live_words if word["word"].lower() not in taken)
+    return words
+
+
+def _return_to_pool(difficulty_level: str, words: List[dict]) -> None:
+    """預取後沒有用到的單字歸還單字池"""
+    if words and word_pool is not None:
+        word_pool.put_back(difficulty_level, words)
+
+
+def record_received_words(chat_id: str, difficulty_level: str, words: List[dict]) -> None:
+    """記錄使用者收到的單字：之後不再出現，並加入使用者的複習卡片組"""
+    mark_seen(LANGUAGE, chat_id, [word["word"] for word in words])
+    add_review_words(chat_id, LANGUAGE, difficulty_level, words)
+
+
+def build_english_words_flex(words: List[dict], difficulty_name: str) -> Union[FlexSendMessage, str]:
+    """將單字轉換為 Flex Message，一個單字為單一 bubble，多個單字使用 carousel"""
+    # 準備 bubbles 用於 carousel
+    bubbles = [create_word_bubble(word_data, difficulty_name) for word_data in words]
+
+    if not bubbles:
+        return "抱歉，無法生成英文單字，請稍後再試。"
+
+    # 如果只有一個單字，直接返回 FlexSendMessage
+    if len(bubbles) == 1:
+        return FlexSendMessage(
+            alt_text=f"英文單字學習 - {difficulty_name}",
+            contents=bubbles[0]
+        )
+
+    # 多個單字使用 carousel
+    carousel = CarouselContainer(contents=bubbles)
+
+    flex_message = FlexSendMessage(
+        alt_text=f"英文單字學習 - {difficulty_name} ({len(bubbles)}個)",
+        contents=carousel
+    )
+
+    return flex_message
+
+
+def get_english_word_batch(chat_id: str, difficulty_level: str, count: int, shared: bool = False,
+                           exclude: List[str] = None) -> List[dict]:
+    """
+    以單一請求生成多個不重複的英文單字（選字與補生成的流程見 generate_word_batch）
+    :param exclude: 額外要避開的單字
+    :return: 單字資料列表，數量可能少於 count
     """
+    return generate_word_batch(WORD_SOURCE, chat_id, difficulty_level, count, shared, exclude)
 
-    # 使用 'english' 會話類型，與一般聊天和日文學習分離
-    response = chat_with_groq(chat_id, prompt, session_type="english")
 
-    try:
-        if isinstance(response, str):
-            logger.info(f"Response is a string: {response}")
-            try:
-                word_data = json.loads(response)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'(\{.*\})', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    word_data = json.loads(json_str)
-                else:
-                    raise ValueError("Unable to extract JSON format from the string response")
-        elif hasattr(response, 'text'):
-            response_text = response.text
-            logger.info(f"Response has text attribute: {response_text}")
-            try:
-                word_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'(\{.*\})', response_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    word_data = json.loads(json_str)
-                else:
-                    raise ValueError("Unable to extract JSON format from the response text")
-        elif hasattr(response, 'json'):
-            word_data = response.json()
-        else:
-            raise TypeError(f"Unsupported response type: {type(response)}")
+def _build_detail_prompt(words: List[str]) -> str:
+    """只請模型補上指定單字的詳細資料，不需要描述難度"""
+    return (f"請提供以下英文單字的詳細資料：{', '.join(words)}。\n"
+            "以 JSON 物件 {\"words\": [...]} 回覆，不要其他文字。每個元素包含 word（與上面相同）、"
+            "pronunciation（台灣常見的 KK 音標）、part_of_speech、definition_en、definition_zh、example_sentence、"
+            "example_translation（繁體中文）。")
 
-    except Exception as e:
-        logger.error(f"Failed to parse response as JSON: {str(e)}")
-        return "抱歉，獲取英文單字時發生錯誤，請通知維護人員，謝謝。"
 
-    required_fields = ["word", "pronunciation", "part_of_speech", "definition_en",
-                       "definition_zh", "example_sentence", "example_translation"]
+def _build_batch_prompt(difficulty_level: str, count: int, exclude: List[str] = None) -> str:
+    """精簡的批次單字提示詞，只附上要避開的單字"""
+    prompt = (f"請提供 {count} 個不同的英文單字。"
+              f"{DIFFICULTY_PROMPTS.get(difficulty_level, DIFFICULTY_PROMPTS['intermediate'])}。\n"
+              "以 JSON 物件 {\"words\": [...]} 回覆，不要其他文字。每個元素包含 word、pronunciation（台灣常見的 KK 音標）、"
+              "part_of_speech、definition_en、definition_zh、example_sentence、example_translation（繁體中文）。")
+    if exclude:
+        prompt += f"\n不要使用以下單字：{', '.join(exclude)}"
+    return prompt
 
-    for field in required_fields:
-        if field not in word_data:
-            word_data[field] = ""
-            logger.warning(f"Missing '{field}' field in word data. Set to empty string.")
 
-    return word_data
+# 使用 'english' 會話類型，與一般聊天和日文學習分離
+WORD_SOURCE = WordSource(LANGUAGE, "english", WORD_SCHEMA, _build_batch_prompt, _build_detail_prompt)
 
 
 def create_word_bubble(word_data: dict, difficulty_name: str):
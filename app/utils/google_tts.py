@@ -1,9 +1,14 @@
 from urllib.parse import quote
 
+from app.services import audio_cache
+
 
 # 產生 Google TTS 音訊連結
-def generate_audio_url(text):
+def generate_audio_url(text, lang="en"):
     if not text:
         return ""
+    # 有設定對外網址時連到本地的語音快取，同一段文字只合成一次
+    if audio_cache.audio_cache is not None:
+        return audio_cache.audio_cache.url_for(text, lang)
     encoded_text = quote(text)
-    return f"https://translate.google.com/translate_tts?ie=UTF-8&tl=en&client=tw-ob&q={encoded_text}"
+    return f"https://translate.google.com/translate_tts?ie=UTF-8&tl={lang}&client=tw-ob&q={encoded_text}"
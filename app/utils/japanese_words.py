@@ -1,15 +1,47 @@
-import json
 import logging
+from typing import List
 
 from linebot.models import FlexSendMessage, BubbleContainer, BoxComponent, TextComponent, ButtonComponent, URIAction, \
-    BubbleStyle, BlockStyle
+    BubbleStyle, BlockStyle, CarouselContainer
 
-from app.services.groq_service import chat_with_groq
+from app.models.subscription import SubscriptionContent
+from app.services.review_deck import add_review_words
+from app.services.seen_words import mark_seen
+from app.services.structured_output import ObjectSchema
+from app.services.word_batch import WordSource, generate_word_batch
 from app.utils.google_tts import generate_audio_url
 from app.utils.theme import COLOR_THEME
 
 logger = logging.getLogger(__name__)
 
+LANGUAGE = "japanese"
+
+# 日文單字難度（日文檢定級數）
+JAPANESE_LEVELS = {
+    '1': 'N5-N4',
+    '2': 'N4-N3',
+    '3': 'N2-N1'
+}
+
+# 難度名稱
+JAPANESE_LEVEL_NAMES = {
+    '1': '初級',
+    '2': '中級',
+    '3': '高級'
+}
+
+# 功能選單中「日文單字」使用的難度
+LEVEL = JAPANESE_LEVELS['2']
+
+REQUIRED_FIELDS = ["word", "hiragana", "romaji", "part_of_speech", "definition_ja",
+                   "definition_zh", "example_sentence", "example_translation"]
+
+# 單字物件的欄位：缺少的欄位會請模型補齊，仍缺少單字或中文解釋時捨棄
+WORD_SCHEMA = ObjectSchema(REQUIRED_FIELDS, essential=("word", "definition_zh"))
+
+# 訂閱推播共用的生成請求不屬於任何聊天室
+SUBSCRIPTION_CHAT_ID = "*subscription*"
+
 
 def get_japanese_word(chat_id: str):
     """
@@ -17,101 +49,98 @@ def get_japanese_word(chat_id: str):
     功能：獲取一個日常生活中常用的日文單字或表達方式，並提供完整的學習資訊
     返回：包含單字、假名、羅馬音、詞性、日文解釋、中文意思、例句及翻譯的完整學習內容
     """
-    prompt = """請提供一個日文單字的學習內容，包含以下欄位：
-
-    1. 單字 (word) - 漢字形式（如果有的話）
-    2. 假名 (hiragana) - 平假名讀音
-    3. 羅馬音 (romaji) - 羅馬字拼音
-    4. 詞性 (part_of_speech)
-    5. 日文解釋 (definition_ja)
-    6. 中文解釋 (definition_zh)
-    7. 例句 (example_sentence)
-    8. 例句翻譯 (example_translation)
-
-    請選擇難度符合日文檢定 N4-N3 級的單字，應為日常生活中常見且實用的詞彙，能夠提升口說與書寫能力，適用於一般對話或正式場合。
-
-    請以 **純 JSON 格式** 回覆，**不要添加多餘說明或文字**，並請確認所有資訊準確無誤。
-
-    以下為格式範例：
-    {
-      "word": "約束",
-      "hiragana": "やくそく",
-      "romaji": "yakusoku",
-      "part_of_speech": "名詞",
-      "definition_ja": "前もって決めた事柄を守ること",
-      "definition_zh": "約定、承諾",
-      "example_sentence": "友達と映画を見る約束をしました。",
-      "example_translation": "我和朋友約定要一起看電影。"
-    }
-    """
+    words = get_japanese_word_batch(chat_id, LEVEL, 1)
+    if not words:
+        return "抱歉，獲取日文單字時發生錯誤，請通知維護人員，謝謝。"
 
-    # 使用 'japanese' 會話類型，與一般聊天和英文學習分離
-    response = chat_with_groq(chat_id, prompt, session_type="japanese")
+    record_received_words(chat_id, LEVEL, words)
+    return build_japanese_words_flex(words)
 
-    try:
-        if isinstance(response, str):
-            logger.info(f"Response is a string: {response}")
-            try:
-                word_data = json.loads(response)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'(\{.*\})', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    word_data = json.loads(json_str)
-                else:
-                    raise ValueError("Unable to extract JSON format from the string response")
-        elif hasattr(response, 'text'):
-            response_text = response.text
-            logger.info(f"Response has text attribute: {response_text}")
-            try:
-                word_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                import re
-                json_match = re.search(r'(\{.*\})', response_text, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    word_data = json.loads(json_str)
-                else:
-                    raise ValueError("Unable to extract JSON format from the response text")
-        elif hasattr(response, 'json'):
-            word_data = response.json()
-        else:
-            raise TypeError(f"Unsupported response type: {type(response)}")
 
+def create_subscription_content(level_id: str, count: int) -> SubscriptionContent:
+    """
+    訂閱推播的內容：同一時段相同 (難度, 數量) 的訂閱者共用一份，不帶任何使用者的學習紀錄
+    """
+    level = JAPANESE_LEVELS.get(str(level_id))
+    if not level:
+        return SubscriptionContent(f"找不到難度代碼：{level_id}", [], "")
+
+    try:
+        words = get_japanese_word_batch(SUBSCRIPTION_CHAT_ID, level, count, shared=True)
     except Exception as e:
-        logger.error(f"Failed to parse response as JSON: {str(e)}")
-        return "抱歉，獲取日文單字時發生錯誤，請通知維護人員，謝謝。"
+        logger.error(f"Failed to create Japanese subscription content: {e}")
+        words = []
+    if not words:
+        return SubscriptionContent("抱歉，獲取日文單字時發生錯誤，請通知維護人員，謝謝。", [], level)
+    return SubscriptionContent(build_japanese_words_flex(words), words, level)
+
+
+def get_japanese_word_batch(chat_id: str, level: str, count: int, shared: bool = False) -> List[dict]:
+    """
+    以單一請求生成多個不重複的日文單字（選字與補生成的流程見 generate_word_batch）
+    :param shared: 不屬於單一使用者的內容（訂閱推播），不依使用者看過的單字過濾
+    :return: 單字資料列表，數量可能少於 count
+    """
+    return generate_word_batch(WORD_SOURCE, chat_id, level, count, shared)
+
+
+def record_received_words(chat_id: str, level: str, words: List[dict]) -> None:
+    """記錄使用者收到的單字：之後不再出現，並加入使用者的複習卡片組"""
+    mark_seen(LANGUAGE, chat_id, [word_data["word"] for word_data in words])
+    add_review_words(chat_id, LANGUAGE, level, words)
 
-    required_fields = ["word", "hiragana", "romaji", "part_of_speech", "definition_ja",
-                       "definition_zh", "example_sentence", "example_translation"]
 
-    for field in required_fields:
-        if field not in word_data:
-            word_data[field] = ""
-            logger.warning(f"Missing '{field}' field in word data. Set to empty string.")
+def build_japanese_words_flex(words: List[dict]) -> FlexSendMessage:
+    """將單字轉換為 Flex Message，一個單字為單一 bubble，多個單字使用 carousel"""
+    if len(words) == 1:
+        return FlexSendMessage(
+            alt_text=f"日文單字：{words[0]['word']}",
+            contents=create_japanese_flex_bubble(words[0])
+        )
 
-    flex_bubble = create_japanese_flex_bubble(word_data)
     return FlexSendMessage(
-        alt_text=f"日文單字：{word_data['word']}",
-        contents=flex_bubble
+        alt_text=f"日文單字學習 ({len(words)}個)",
+        contents=CarouselContainer(contents=[create_japanese_flex_bubble(word_data) for word_data in words])
     )
 
 
+def _build_detail_prompt(words: List[str]) -> str:
+    """只請模型補上指定單字的詳細資料，不需要描述難度"""
+    return (f"請提供以下日文單字的詳細資料：{'、'.join(words)}。\n"
+            "以 JSON 物件 {\"words\": [...]} 回覆，不要其他文字。每個元素包含 word（與上面相同）、"
+            "hiragana、romaji、part_of_speech、definition_ja、definition_zh、example_sentence、"
+            "example_translation（繁體中文）。")
+
+
+def _build_word_prompt(level: str, count: int, exclude: List[str]) -> str:
+    """精簡的單字提示詞，只附上要避開的單字"""
+    prompt = (f"請提供 {count} 個不同的日文單字，難度為日文檢定 {level} 級、日常生活中常見且實用的單字或表達方式。\n"
+              "以 JSON 物件 {\"words\": [...]} 回覆，不要其他文字。每個元素包含 word（漢字，沒有則用假名）、"
+              "hiragana、romaji、part_of_speech、definition_ja、definition_zh、example_sentence、"
+              "example_translation（繁體中文）。")
+    if exclude:
+        prompt += f"\n不要使用以下單字：{'、'.join(exclude)}"
+    return prompt
+
+
+# 使用 'japanese' 會話類型，與一般聊天和英文學習分離
+WORD_SOURCE = WordSource(LANGUAGE, "japanese", WORD_SCHEMA, _build_word_prompt, _build_detail_prompt)
+
+
 def create_japanese_flex_bubble(word_data):
     """
     使用 LINE SDK 的原生物件建立日文 Flex 訊息
     """
     # 生成單字發音連結（日文）
     try:
-        word_audio_url = generate_audio_url(word_data["word"])
+        word_audio_url = generate_audio_url(word_data["word"], "ja")
     except Exception as e:
         logger.error(f"Error occurred while generating Japanese word pronunciation URL: {str(e)}")
         word_audio_url = ""
 
     # 生成例句發音連結（日文）
     try:
-        example_audio_url = generate_audio_url(word_data["example_sentence"])
+        example_audio_url = generate_audio_url(word_data["example_sentence"], "ja")
     except Exception as e:
         logger.error(f"Error occurred while generating Japanese example sentence pronunciation URL: {str(e)}")
         example_audio_url = ""
@@ -66,7 +66,9 @@ def get_menu():
         create_button("熱門電影", "movie", COLOR_THEME['info'], emoji="🎬", display_text="功能選單：熱門電影"),
         create_button("日文單字", "japanese", COLOR_THEME['primary'], emoji="🇯🇵", display_text="功能選單：日文單字"),
         create_button("英文單字", "english", COLOR_THEME['info'], emoji="🇺🇸", display_text="功能選單：英文單字"),
-        create_button("英文訂閱", "english_subscribe", COLOR_THEME['primary'], emoji="📅", display_text="功能選單：英文訂閱"),
+        create_button("單字複習", "review", COLOR_THEME['primary'], emoji="🔁", display_text="功能選單：單字複習"),
+        create_button("英文訂閱", "english_subscribe", COLOR_THEME['info'], emoji="📅", display_text="功能選單：英文訂閱"),
+        create_button("日文訂閱", "japanese_subscribe", COLOR_THEME['primary'], emoji="🗓️", display_text="功能選單：日文訂閱"),
         create_button("用藥管理", "medication_menu", COLOR_THEME['info'], emoji="💊", display_text="功能選單：用藥管理"),
         create_button("其他提醒", "other_reminder_menu", COLOR_THEME['primary'], emoji="⏰", display_text="功能選單：其他提醒"),
         create_button("推播額度", "check_push_quota", COLOR_THEME['info'], emoji="📊", display_text="功能選單：推播額度"),
@@ -12,10 +12,16 @@ from linebot.models import (
     SeparatorComponent, BubbleStyle, BlockStyle
 )
 
+from app.services.feed_cache import StaleWhileRevalidateCache
+from app.services.prefetch import MISS, skip_prefetch, start_prefetch, take_prefetched
+from app.services.short_links import shorten_urls
 from app.utils.theme import COLOR_THEME
 
 logger = logging.getLogger(__name__)
 
+# 預取仍在執行時，最多等待的秒數
+PREFETCH_WAIT_SECONDS = 10
+
 # 主題列表
 TOPICS = {
     '1': 'https://news.google.com/topics/CAAqJQgKIh9DQkFTRVFvSUwyMHZNRFptTXpJU0JYcG9MVlJYS0FBUAE?hl=zh-TW&gl=TW&ceid=TW%3Azh-Hant',
@@ -39,8 +45,27 @@ TOPIC_NAMES = {
 }
 
 
-def get_news(topic_id, count):
-    """獲取指定主題和數量的新聞"""
+def _fetch_topic_links(topic_id):
+    return fetch_news_links(TOPICS[topic_id])
+
+
+# 各主題解析後的新聞列表：新鮮期內直接使用，過期後先用舊列表並在背景更新
+news_feeds = StaleWhileRevalidateCache(_fetch_topic_links, name="news-feed")
+
+
+def init_news_feeds(fresh_ttl: float = 300, stale_ttl: float = 3600) -> StaleWhileRevalidateCache:
+    """
+    設定新聞列表快取
+    :param fresh_ttl: 新鮮期（秒）
+    :param stale_ttl: 可用期（秒），期間內先使用舊列表
+    """
+    global news_feeds
+    news_feeds = StaleWhileRevalidateCache(_fetch_topic_links, fresh_ttl, stale_ttl, name="news-feed")
+    return news_feeds
+
+
+def get_news(topic_id, count, chat_id=None):
+    """獲取指定主題和數量的新聞，有數量選單時預取的新聞列表則直接使用"""
     topic_id = str(topic_id).strip()
     topic_url = TOPICS.get(topic_id)
     topic_name = TOPIC_NAMES.get(topic_id, '新聞')
@@ -48,84 +73,110 @@ def get_news(topic_id, count):
     if not topic_url:
         return TextSendMessage(text=f"找不到主題代碼：{topic_id}")
 
-    return fetch_google_news_flex(topic_name, topic_url, count)
+    news_links = take_prefetched(chat_id, ('news', topic_id), PREFETCH_WAIT_SECONDS) if chat_id else MISS
+    if news_links is MISS:
+        return fetch_google_news_flex(topic_name, topic_id, count)
+    return build_news_flex(topic_name, news_links, count)
+
+
+def prefetch_news(chat_id, topic_id):
+    """顯示新聞數量選單時，先在背景取得該主題的新聞列表（快取中已有可用的列表時不需要）"""
+    topic_id = str(topic_id).strip()
+    if topic_id not in TOPICS:
+        return
+    if news_feeds.contains(topic_id):
+        # 最後一步直接使用快取，不計為預取未命中
+        skip_prefetch(chat_id, ('news', topic_id))
+    else:
+        start_prefetch(chat_id, ('news', topic_id), news_feeds.get, topic_id)
+
+
+def fetch_news_links(topic_url):
+    """取得主題頁面上的新聞標題與連結"""
+    response = requests.get(topic_url, timeout=10)
+    response.raise_for_status()
 
+    soup = BeautifulSoup(response.text, 'html.parser')
+    return [(link.text.strip(), link.get('href', '')) for link in soup.find_all('a', class_='gPFEn')]
 
-def fetch_google_news_flex(topic_name, topic_url, count):
-    """從 Google News 獲取新聞並轉換為 Flex Message"""
+
+def fetch_google_news_flex(topic_name, topic_id, count):
+    """從 Google News 獲取新聞（優先使用快取的新聞列表）並轉換為 Flex Message"""
     try:
-        response = requests.get(topic_url, timeout=10)
-        response.raise_for_status()
+        news_links = news_feeds.get(topic_id)
+    except Exception as e:
+        logger.error(f"獲取新聞失敗: {e}")
+        return TextSendMessage(text="抱歉，獲取新聞時發生錯誤，請稍後再試。")
+
+    return build_news_flex(topic_name, news_links, count)
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        news_links = soup.find_all('a', class_='gPFEn')
 
+def build_news_flex(topic_name, news_links, count):
+    """隨機選出新聞並轉換為 Flex Message"""
+    try:
+        news_links = list(news_links)
         random.shuffle(news_links)
 
+        selected = [(title, unquote(urljoin('https://news.google.com/', href)))
+                    for title, href in news_links[:count] if href]
+        # 同時縮短所有網址，已縮過的網址直接使用快取，超過期限的網址使用原網址
+        short_urls = shorten_urls([full_url for _, full_url in selected], shorten_url)
+
         # 準備 bubbles 用於 carousel
         bubbles = []
-        for i, link in enumerate(news_links):
-            if i >= count:
-                break
-
-            title = link.text.strip()
-            href = link.get('href', '')
-            if href:
-                full_url = unquote(urljoin('https://news.google.com/', href))
-                short_url = shorten_url(full_url)
-
-                # 為每條新聞創建一個 bubble
-                header_text = TextComponent(
-                    text=topic_name,
-                    weight="bold",
-                    color=COLOR_THEME['text_primary'],
-                    size="sm"
-                )
-                header_box = BoxComponent(
-                    layout="vertical",
-                    contents=[header_text],
-                    background_color=COLOR_THEME['card']
-                )
+        for (title, _), short_url in zip(selected, short_urls):
+            # 為每條新聞創建一個 bubble
+            header_text = TextComponent(
+                text=topic_name,
+                weight="bold",
+                color=COLOR_THEME['text_primary'],
+                size="sm"
+            )
+            header_box = BoxComponent(
+                layout="vertical",
+                contents=[header_text],
+                background_color=COLOR_THEME['card']
+            )
 
-                body_text = TextComponent(
-                    text=title,
-                    weight="bold",
-                    wrap=True,
-                    size="md",
-                    color=COLOR_THEME['text_primary']
-                )
-                body_box = BoxComponent(
-                    layout="vertical",
-                    contents=[body_text],
-                    spacing="sm",
-                    padding_all="md",
-                    background_color=COLOR_THEME['card']
-                )
+            body_text = TextComponent(
+                text=title,
+                weight="bold",
+                wrap=True,
+                size="md",
+                color=COLOR_THEME['text_primary']
+            )
+            body_box = BoxComponent(
+                layout="vertical",
+                contents=[body_text],
+                spacing="sm",
+                padding_all="md",
+                background_color=COLOR_THEME['card']
+            )
 
-                button = ButtonComponent(
-                    action=URIAction(label="閱讀全文", uri=short_url),
-                    style="primary",
-                    color=COLOR_THEME['primary'],
-                    margin="sm",
-                    height="sm"
-                )
-                footer_box = BoxComponent(
-                    layout="vertical",
-                    contents=[button],
-                    padding_all="lg",
-                    background_color=COLOR_THEME['card']
-                )
+            button = ButtonComponent(
+                action=URIAction(label="閱讀全文", uri=short_url),
+                style="primary",
+                color=COLOR_THEME['primary'],
+                margin="sm",
+                height="sm"
+            )
+            footer_box = BoxComponent(
+                layout="vertical",
+                contents=[button],
+                padding_all="lg",
+                background_color=COLOR_THEME['card']
+            )
 
-                bubble = BubbleContainer(
-                    header=header_box,
-                    body=body_box,
-                    footer=footer_box,
-                    styles=BubbleStyle(
-                        body=BlockStyle(background_color=COLOR_THEME['card']),
-                        footer=BlockStyle(background_color=COLOR_THEME['card'])
-                    )
+            bubble = BubbleContainer(
+                header=header_box,
+                body=body_box,
+                footer=footer_box,
+                styles=BubbleStyle(
+                    body=BlockStyle(background_color=COLOR_THEME['card']),
+                    footer=BlockStyle(background_color=COLOR_THEME['card'])
                 )
-                bubbles.append(bubble)
+            )
+            bubbles.append(bubble)
 
         # 將所有 bubble 放入 carousel 容器
         carousel = CarouselContainer(contents=bubbles)
@@ -137,12 +188,12 @@ def fetch_google_news_flex(topic_name, topic_url, count):
 
 
 def shorten_url(long_url):
-    """縮短 URL"""
+    """縮短 URL，失敗時回傳原網址"""
     api_url = "https://tinyurl.com/api-create.php"
     params = {"url": long_url}
 
     try:
-        response = requests.get(api_url, params=params, timeout=5, verify=False)
+        response = requests.get(api_url, params=params, timeout=5)
         response.raise_for_status()
         return response.text
     except requests.RequestException as e:
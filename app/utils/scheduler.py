@@ -9,24 +9,30 @@ from linebot.models import FlexSendMessage, BubbleContainer, BoxComponent, TextC
     PostbackAction, SeparatorComponent
 
 from app.config import Config
-from app.utils.english_subscribe import SUBSCRIPTION_TIMES as ENGLISH_TIMES, subscription_manager
-from app.utils.english_words import get_english_words
+from app.services.groq_async import llm_priority, PRIORITY_BATCH
+from app.utils import english_words, japanese_words
 from app.utils.medication import common_times, get_medications_by_time
 from app.utils.other_reminder import other_reminder_common_times, get_other_reminders_by_time
 from app.utils.theme import COLOR_THEME
+from app.utils.word_subscribe import SUBSCRIPTION_LANGUAGES, SUBSCRIPTION_TIMES, subscription_manager
 
 logger = logging.getLogger(__name__)
 
+# 各語言訂閱推播的 (生成共用內容, 記錄訂閱者收到的單字)
+SUBSCRIPTION_CONTENT = {
+    'english': (english_words.create_subscription_content, english_words.record_received_words),
+    'japanese': (japanese_words.create_subscription_content, japanese_words.record_received_words)
+}
+
 
 def init_scheduler():
     """初始化排程器"""
     tz = os.environ.get('TZ', 'UTC')
     scheduler = BackgroundScheduler(timezone=tz)
 
-    # 英文訂閱排程
-    _setup_subscription_schedule(scheduler, ENGLISH_TIMES, 'english')
-
-    # TODO 日文訂閱排程
+    # 英文與日文訂閱排程
+    for language in SUBSCRIPTION_LANGUAGES:
+        _setup_subscription_schedule(scheduler, SUBSCRIPTION_TIMES, language)
 
     # 用藥管理排程
     _setup_medication_schedule(scheduler)
@@ -63,75 +69,73 @@ def send_subscription_notification(time_id, language):
     logger.info(f"Executing {language} {time_id} subscription notification - {current_time}")
 
     try:
-        # 根據語言分發不同的通知邏輯
-        if language == 'english':
-            send_english_notification(time_id)
-        elif language == 'japanese':
-            send_japanese_notification(time_id)
-        else:
-            logger.warning(f"Unknown language type: {language}")
+        # 訂閱推播是批次工作，LLM 請求排在使用者的即時請求之後，且只使用部分名額
+        with llm_priority(PRIORITY_BATCH):
+            if language in SUBSCRIPTION_CONTENT:
+                send_word_notification(time_id, language)
+            else:
+                logger.warning(f"Unknown language type: {language}")
     except Exception as e:
         logger.error(f"Error in send_subscription_notification for {language} {time_id}: {e}")
 
 
-def send_english_notification(time_id):
-    """發送英文訂閱通知"""
+def send_word_notification(time_id, language):
+    """
+    發送單字訂閱通知
+
+    同一時段相同 (難度, 數量) 的訂閱者共用同一份內容：每種設定只生成一次，再推播給所有符合的訂閱者，
+    LLM 呼叫次數取決於不同設定的數量，而不是訂閱人數
+    """
     try:
-        time_str = ENGLISH_TIMES.get(time_id)
+        time_str = SUBSCRIPTION_TIMES.get(time_id)
         if not time_str:
             logger.error(f"Invalid time_id: {time_id}")
             return
 
-        # 使用 subscription_manager 取得該時段的所有訂閱
-        subscriptions = subscription_manager.get_subscriptions_by_time(time_str)
+        # 使用 subscription_manager 取得該時段此語言的所有訂閱
+        subscriptions = subscription_manager.get_subscriptions_by_time(time_str, language)
 
         if not subscriptions:
-            logger.info(f"No subscriptions found for time slot: {time_str}")
+            logger.info(f"No {language} subscriptions found for time slot: {time_str}")
             return
 
-        logger.info(f"Found {len(subscriptions)} subscriptions for time slot: {time_str}")
-
-        # 對每個訂閱者發送通知
-        success_count = 0
+        # 依 (難度, 數量) 分組
+        groups = {}
         for subscription in subscriptions:
-            try:
-                logger.info(f"Processing subscription for user: {subscription.user_id}")
-                logger.info(f"Difficulty ID: {subscription.difficulty_id}")
-                logger.info(f"Difficulty Name: {subscription.difficulty_name}")
-                logger.info(f"Word Count: {subscription.count}")
-
-                # 獲取英文單字內容
-                english_content = get_english_words(
-                    chat_id=subscription.user_id,
-                    difficulty_id=subscription.difficulty_id,
-                    count=subscription.count
-                )
+            groups.setdefault((subscription.difficulty_id, subscription.count), []).append(subscription)
+
+        logger.info(f"Found {len(subscriptions)} {language} subscriptions in {len(groups)} configurations "
+                    f"for time slot: {time_str}")
 
-                if english_content:
-                    # 發送 LINE 訊息
-                    send_line_message_push(
-                        Config.LINE_CHANNEL_ACCESS_TOKEN,
-                        subscription.user_id,
-                        english_content
-                    )
-                    success_count += 1
-                    logger.info(f"Successfully sent notification to user: {subscription.user_id}")
-                else:
-                    logger.warning(f"No content generated for user: {subscription.user_id}")
+        create_content, record_received_words = SUBSCRIPTION_CONTENT[language]
 
+        # 對每種設定生成一次內容，再發送給該設定的所有訂閱者
+        success_count = 0
+        for (difficulty_id, count), members in groups.items():
+            try:
+                content = create_content(difficulty_id, count)
             except Exception as e:
-                logger.error(f"Error sending notification to user {subscription.user_id}: {e}")
+                logger.error(f"Error creating {language} content for difficulty {difficulty_id}, count {count}: {e}")
                 continue
 
-        logger.info(f"English notification batch completed. Success: {success_count}/{len(subscriptions)}")
+            if not content.words:
+                logger.warning(f"No {language} content generated for difficulty {difficulty_id}, count {count}")
+                continue
 
-    except Exception as e:
-        logger.error(f"Error in send_english_notification: {e}")
+            for subscription in members:
+                try:
+                    if send_line_message_push(Config.LINE_CHANNEL_ACCESS_TOKEN, subscription.user_id, content.message):
+                        record_received_words(subscription.user_id, content.level, content.words)
+                        success_count += 1
+                        logger.info(f"Successfully sent {language} notification to user: {subscription.user_id}")
+                except Exception as e:
+                    logger.error(f"Error sending {language} notification to user {subscription.user_id}: {e}")
+                    continue
 
+        logger.info(f"{language.title()} notification batch completed. Success: {success_count}/{len(subscriptions)}")
 
-def send_japanese_notification(time_id):
-    """TODO 發送日文訂閱通知"""
-    logger.info(f"Japanese subscription notification triggered for {time_id}")
+    except Exception as e:
+        logger.error(f"Error in send_word_notification for {language}: {e}")
 
 
 def send_line_message_push(channel_token, user_id, message):
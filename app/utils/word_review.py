@@ -0,0 +1,153 @@
+import logging
+from typing import List, Union
+
+from linebot.models import (
+    FlexSendMessage, BubbleContainer, BoxComponent, TextComponent,
+    ButtonComponent, PostbackAction, SeparatorComponent, BubbleStyle, BlockStyle, TextSendMessage
+)
+
+from app.services import review_deck
+from app.services.review_deck import QUALITY_AGAIN, QUALITY_HARD, QUALITY_GOOD, QUALITY_EASY, QUALITY_MIN, \
+    QUALITY_MAX
+from app.utils.english_words import create_word_bubble
+from app.utils.japanese_words import create_japanese_flex_bubble
+from app.utils.theme import COLOR_THEME
+
+logger = logging.getLogger(__name__)
+
+LANGUAGE_NAMES = {
+    "english": "英文",
+    "japanese": "日文"
+}
+
+# 複習結果按鈕：(文字, SM-2 分數, 顏色)
+GRADE_BUTTONS = [
+    ("忘記了", QUALITY_AGAIN, COLOR_THEME['error']),
+    ("有點難", QUALITY_HARD, COLOR_THEME['warning']),
+    ("記得", QUALITY_GOOD, COLOR_THEME['primary']),
+    ("很簡單", QUALITY_EASY, COLOR_THEME['success'])
+]
+
+
+def get_review_card(chat_id: str) -> Union[FlexSendMessage, TextSendMessage]:
+    """
+    顯示最早到期的複習卡片正面（只有單字），全部由本地保存的內容產生，不呼叫 LLM
+    """
+    card = review_deck.review_store.next_card(chat_id)
+    if card is None:
+        summary = review_deck.review_store.summary(chat_id)
+        if summary["total"] == 0:
+            return TextSendMessage(text="還沒有可以複習的單字，先到英文單字或日文單字學幾個新單字吧！")
+        return TextSendMessage(text=f"今天的單字都複習完了！目前共有 {summary['total']} 個單字在複習排程中。")
+
+    cid, language, level, word_data = card
+    due = review_deck.review_store.summary(chat_id)["due"]
+
+    body_box = BoxComponent(
+        layout="vertical",
+        spacing="md",
+        contents=[
+            TextComponent(
+                text=f"{LANGUAGE_NAMES.get(language, '')}單字複習",
+                size="sm",
+                color=COLOR_THEME['text_secondary']
+            ),
+            TextComponent(
+                text=word_data["word"],
+                weight="bold",
+                size="xxl",
+                align="center",
+                color=COLOR_THEME['text_primary'],
+                wrap=True
+            ),
+            SeparatorComponent(margin="lg", color=COLOR_THEME['separator']),
+            TextComponent(
+                text=f"想一想這個單字的意思，今天還有 {due} 個單字要複習",
+                size="sm",
+                color=COLOR_THEME['text_hint'],
+                wrap=True
+            )
+        ],
+        padding_all="lg",
+        background_color=COLOR_THEME['card']
+    )
+
+    footer_box = BoxComponent(
+        layout="vertical",
+        contents=[
+            ButtonComponent(
+                action=PostbackAction(
+                    label="顯示答案",
+                    data=f"action=review_show&card={cid}",
+                    display_text=f"單字複習：顯示 {word_data['word']} 的答案"
+                ),
+                style="primary",
+                color=COLOR_THEME['primary'],
+                height="sm"
+            )
+        ],
+        padding_all="lg",
+        background_color=COLOR_THEME['card']
+    )
+
+    bubble = BubbleContainer(
+        body=body_box,
+        footer=footer_box,
+        styles=BubbleStyle(
+            body=BlockStyle(background_color=COLOR_THEME['card']),
+            footer=BlockStyle(background_color=COLOR_THEME['card'])
+        )
+    )
+    return FlexSendMessage(alt_text=f"單字複習：{word_data['word']}", contents=bubble)
+
+
+def get_review_answer(chat_id: str, cid: int) -> Union[FlexSendMessage, TextSendMessage]:
+    """顯示複習卡片背面（完整的單字內容）與複習結果按鈕"""
+    entry = review_deck.review_store.get_entry(cid)
+    if entry is None:
+        return TextSendMessage(text="找不到這個單字，請重新開始複習。")
+
+    language, level, word_data = entry
+    if language == "japanese":
+        bubble = create_japanese_flex_bubble(word_data)
+    else:
+        bubble = create_word_bubble(word_data, f"單字複習・{level}")
+
+    grade_row = BoxComponent(
+        layout="horizontal",
+        spacing="xs",
+        margin="md",
+        contents=[
+            ButtonComponent(
+                action=PostbackAction(
+                    label=label,
+                    data=f"action=review_grade&card={cid}&quality={quality}",
+                    display_text=f"單字複習：{word_data['word']} {label}"
+                ),
+                style="primary",
+                color=color,
+                flex=1,
+                height="sm"
+            )
+            for label, quality, color in GRADE_BUTTONS
+        ]
+    )
+    bubble.footer.contents.append(grade_row)
+    return FlexSendMessage(alt_text=f"單字複習：{word_data['word']}", contents=bubble)
+
+
+def handle_review_grade(chat_id: str, cid: int, quality: int) -> List:
+    """記錄複習結果並接著顯示下一張到期的卡片"""
+    # 分數來自 postback 資料，超出範圍會讓難易度無限制地增減
+    if not QUALITY_MIN <= quality <= QUALITY_MAX:
+        logger.warning(f"Invalid review quality {quality} from {chat_id}")
+        return [TextSendMessage(text="無效的複習結果，請重新選擇。")]
+
+    interval = review_deck.review_store.grade(chat_id, cid, quality)
+    if interval is None:
+        return [TextSendMessage(text="找不到這個單字，請重新開始複習。")]
+
+    return [
+        TextSendMessage(text=f"下次複習：{interval} 天後"),
+        get_review_card(chat_id)
+    ]
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Union
 
 from linebot.models import (
     ButtonComponent, PostbackAction,
@@ -9,6 +9,7 @@ from linebot.models import FlexSendMessage, BubbleContainer, BoxComponent, TextC
 
 from app.models.subscription import Subscription, SubscriptionManager
 from app.utils.english_words import DIFFICULTY_NAMES
+from app.utils.japanese_words import JAPANESE_LEVEL_NAMES
 from app.utils.theme import (
     COLOR_THEME
 )
@@ -24,11 +25,17 @@ SUBSCRIPTION_TIMES = {
     '5': '21:00'
 }
 
+# 可訂閱的語言：顯示名稱、postback 前綴與難度名稱
+SUBSCRIPTION_LANGUAGES = {
+    'english': {'name': '英文', 'prefix': 'english_subscribe', 'levels': DIFFICULTY_NAMES},
+    'japanese': {'name': '日文', 'prefix': 'japanese_subscribe', 'levels': JAPANESE_LEVEL_NAMES}
+}
+
 # 建立訂閱管理器實例
 subscription_manager = SubscriptionManager()
 
 
-def save_subscription(user_id: str, difficulty_id: str, count: int, time_id: str) -> bool:
+def save_subscription(user_id: str, difficulty_id: str, count: int, time_id: str, language: str = 'english') -> bool:
     """
     儲存單一時段的訂閱設定
 
@@ -37,6 +44,7 @@ def save_subscription(user_id: str, difficulty_id: str, count: int, time_id: str
         difficulty_id: 難度ID
         count: 單字數量
         time_id: 時段ID
+        language: 訂閱的語言
 
     Returns:
         bool: 儲存是否成功
@@ -46,36 +54,38 @@ def save_subscription(user_id: str, difficulty_id: str, count: int, time_id: str
         subscription = Subscription(
             user_id=user_id,
             difficulty_id=difficulty_id,
-            difficulty_name=DIFFICULTY_NAMES.get(difficulty_id, '未知難度'),
+            difficulty_name=SUBSCRIPTION_LANGUAGES[language]['levels'].get(difficulty_id, '未知難度'),
             count=count,
-            time=time
+            time=time,
+            language=language
         )
         subscription_manager.add_subscription(subscription)
-        logger.info(f"Successfully saved subscription for user {user_id} - time slot: {time}")
+        logger.info(f"Successfully saved {language} subscription for user {user_id} - time slot: {time}")
         return True
     except Exception as e:
         logger.error(f"Failed to save subscription - user: {user_id}, time_id: {time_id}, error: {e}")
         return False
 
 
-def get_user_subscriptions(user_id: str) -> List[Subscription]:
-    """獲取使用者的訂閱設定"""
-    return subscription_manager.get_user_subscriptions(user_id)
+def get_user_subscriptions(user_id: str, language: str = None) -> List[Subscription]:
+    """獲取使用者的訂閱設定，指定語言時只取該語言的訂閱"""
+    return subscription_manager.get_user_subscriptions(user_id, language)
 
 
-def cancel_user_subscriptions(user_id: str) -> bool:
+def cancel_user_subscriptions(user_id: str, language: str = None) -> bool:
     """
     取消使用者的所有訂閱
 
     Args:
         user_id: 使用者ID
+        language: 只取消該語言的訂閱，未指定時取消全部
 
     Returns:
         bool: 取消是否成功
     """
     try:
-        subscription_manager.remove_user_subscriptions(user_id)
-        logger.info(f"Successfully canceled all subscriptions for user {user_id}")
+        subscription_manager.remove_user_subscriptions(user_id, language)
+        logger.info(f"Successfully canceled {language or 'all'} subscriptions for user {user_id}")
         return True
     except Exception as e:
         logger.error(f"Failed to cancel subscriptions - user: {user_id}, error: {e}")
@@ -99,22 +109,23 @@ def parse_subscription_data(data_string: str) -> Tuple[str, int, str]:
     return difficulty_id, count, time_id
 
 
-def handle_subscription_time(data: dict) -> Tuple[str, int, str]:
+def handle_subscription_time(data: dict, language: str = 'english') -> Tuple[str, int, str]:
     """處理訂閱時段選擇"""
-    data_string = data['english_subscribe_time'][0]
+    data_string = data[f"{SUBSCRIPTION_LANGUAGES[language]['prefix']}_time"][0]
     difficulty_id, count, time_id = parse_subscription_data(data_string)
     return difficulty_id, count, time_id
 
 
-def handle_subscription_save(data: Dict, user_id: str) -> FlexSendMessage:
+def handle_subscription_save(data: Dict, user_id: str, language: str = 'english') -> FlexSendMessage:
     """處理訂閱儲存"""
+    options = SUBSCRIPTION_LANGUAGES[language]
     try:
-        data_string = data['english_subscribe_save'][0]
+        data_string = data[f"{options['prefix']}_save"][0]
         difficulty_id, count, time_id = parse_subscription_data(data_string)
 
-        if save_subscription(user_id, difficulty_id, count, time_id):
+        if save_subscription(user_id, difficulty_id, count, time_id, language):
             time_name = SUBSCRIPTION_TIMES.get(time_id, '未知時段')
-            difficulty_name = DIFFICULTY_NAMES.get(difficulty_id, '未知難度')
+            difficulty_name = options['levels'].get(difficulty_id, '未知難度')
 
             # 成功訂閱的 Flex Message
             success_bubble = BubbleContainer(
@@ -165,7 +176,7 @@ def handle_subscription_save(data: Dict, user_id: str) -> FlexSendMessage:
                         ),
                         SeparatorComponent(margin="lg", color=COLOR_THEME['separator']),
                         TextComponent(
-                            text="每日準時為您推送英文單字！",
+                            text=f"每日準時為您推送{options['name']}單字！",
                             size="sm",
                             color=COLOR_THEME['text_secondary'],
                             align="center",
@@ -246,9 +257,9 @@ def handle_subscription_save(data: Dict, user_id: str) -> FlexSendMessage:
         return FlexSendMessage(alt_text="系統錯誤", contents=error_bubble)
 
 
-def handle_subscription_view(user_id: str) -> FlexSendMessage:
+def handle_subscription_view(user_id: str, language: str = 'english') -> FlexSendMessage:
     """處理訂閱查詢"""
-    subscriptions = get_user_subscriptions(user_id)
+    subscriptions = get_user_subscriptions(user_id, language)
 
     if not subscriptions:
         # 沒有訂閱的 Flex Message
@@ -272,7 +283,7 @@ def handle_subscription_view(user_id: str) -> FlexSendMessage:
                         margin="lg"
                     ),
                     TextComponent(
-                        text="點選「設定訂閱」開始您的英文學習之旅！",
+                        text=f"點選「設定訂閱」開始您的{SUBSCRIPTION_LANGUAGES[language]['name']}學習之旅！",
                         size="sm",
                         color=COLOR_THEME['text_hint'],
                         align="center",
@@ -357,18 +368,19 @@ def handle_subscription_view(user_id: str) -> FlexSendMessage:
     return FlexSendMessage(alt_text="訂閱查詢", contents=bubble)
 
 
-def handle_subscription_cancel(user_id: str) -> FlexSendMessage:
+def handle_subscription_cancel(user_id: str, language: str = 'english') -> FlexSendMessage:
     """
     處理訂閱取消
 
     Args:
         user_id: 使用者ID
+        language: 取消該語言的訂閱
 
     Returns:
         FlexSendMessage: 取消結果訊息
     """
     # 檢查是否有訂閱
-    subscriptions = get_user_subscriptions(user_id)
+    subscriptions = get_user_subscriptions(user_id, language)
 
     if not subscriptions:
         # 沒有訂閱可取消的 Flex Message
@@ -409,7 +421,7 @@ def handle_subscription_cancel(user_id: str) -> FlexSendMessage:
         return FlexSendMessage(alt_text="取消訂閱", contents=no_subscription_bubble)
 
     # 取消訂閱
-    if cancel_user_subscriptions(user_id):
+    if cancel_user_subscriptions(user_id, language):
         # 成功取消訂閱的 Flex Message
         success_bubble = BubbleContainer(
             body=BoxComponent(
@@ -436,7 +448,7 @@ def handle_subscription_cancel(user_id: str) -> FlexSendMessage:
                         spacing="sm",
                         contents=[
                             TextComponent(
-                                text="所有英文單字推送已停止",
+                                text=f"所有{SUBSCRIPTION_LANGUAGES[language]['name']}單字推送已停止",
                                 size="sm",
                                 color=COLOR_THEME['text_hint'],
                                 align="center"
@@ -541,14 +553,15 @@ def create_menu_bubble(title: str, subtitle: str, buttons: List[ButtonComponent]
     )
 
 
-def get_subscription_menu() -> FlexSendMessage:
-    """生成英文訂閱選單"""
+def get_subscription_menu(language: str = 'english') -> FlexSendMessage:
+    """生成訂閱選單"""
+    name, prefix = SUBSCRIPTION_LANGUAGES[language]['name'], SUBSCRIPTION_LANGUAGES[language]['prefix']
     buttons = [
         ButtonComponent(
             action=PostbackAction(
                 label="設定訂閱",
-                data="action=english_subscribe_setup",
-                display_text="英文訂閱：開始設定訂閱"
+                data=f"action={prefix}_setup",
+                display_text=f"{name}訂閱：開始設定訂閱"
             ),
             style="primary",
             color=COLOR_THEME['primary'],
@@ -558,8 +571,8 @@ def get_subscription_menu() -> FlexSendMessage:
         ButtonComponent(
             action=PostbackAction(
                 label="查閱訂閱",
-                data="action=english_subscribe_view",
-                display_text="英文訂閱：查看我的訂閱"
+                data=f"action={prefix}_view",
+                display_text=f"{name}訂閱：查看我的訂閱"
             ),
             style="primary",
             color=COLOR_THEME['info'],
@@ -569,8 +582,8 @@ def get_subscription_menu() -> FlexSendMessage:
         ButtonComponent(
             action=PostbackAction(
                 label="取消訂閱",
-                data="action=english_subscribe_cancel",
-                display_text="英文訂閱：取消所有訂閱"
+                data=f"action={prefix}_cancel",
+                display_text=f"{name}訂閱：取消所有訂閱"
             ),
             style="secondary",
             color=COLOR_THEME['error'],
@@ -579,13 +592,14 @@ def get_subscription_menu() -> FlexSendMessage:
         )
     ]
 
-    bubble = create_menu_bubble("英文單字訂閱", "請選擇訂閱選項", buttons)
-    return FlexSendMessage(alt_text="英文訂閱選單", contents=bubble)
+    bubble = create_menu_bubble(f"{name}單字訂閱", "請選擇訂閱選項", buttons)
+    return FlexSendMessage(alt_text=f"{name}訂閱選單", contents=bubble)
 
 
-def get_difficulty_menu() -> FlexSendMessage:
+def get_difficulty_menu(language: str = 'english') -> FlexSendMessage:
     """生成訂閱難度選單（宮格形式）"""
-    difficulty_items = list(DIFFICULTY_NAMES.items())
+    options = SUBSCRIPTION_LANGUAGES[language]
+    difficulty_items = list(options['levels'].items())
     grid_rows = []
 
     for i in range(0, len(difficulty_items), 3):
@@ -597,8 +611,8 @@ def get_difficulty_menu() -> FlexSendMessage:
                 button = ButtonComponent(
                     action=PostbackAction(
                         label=level_name,
-                        data=f"english_subscribe_difficulty={level_id}",
-                        display_text=f"英文訂閱難度：{level_name}"
+                        data=f"{options['prefix']}_difficulty={level_id}",
+                        display_text=f"{options['name']}訂閱難度：{level_name}"
                     ),
                     style="primary",
                     color=COLOR_THEME['primary'] if index % 2 == 0 else COLOR_THEME['info'],
@@ -624,9 +638,10 @@ def get_difficulty_menu() -> FlexSendMessage:
     )
 
 
-def get_count_menu(difficulty_id: str) -> FlexSendMessage:
+def get_count_menu(difficulty_id: str, language: str = 'english') -> FlexSendMessage:
     """生成訂閱數量選單（6 宮格佈局）"""
-    difficulty_name = DIFFICULTY_NAMES.get(difficulty_id, "英文單字")
+    options = SUBSCRIPTION_LANGUAGES[language]
+    difficulty_name = options['levels'].get(difficulty_id, f"{options['name']}單字")
 
     grid_rows = []
     for row in range(2):  # 2 行
@@ -636,8 +651,8 @@ def get_count_menu(difficulty_id: str) -> FlexSendMessage:
             button = ButtonComponent(
                 action=PostbackAction(
                     label=f"{count}",
-                    data=f"english_subscribe_count={difficulty_id}/{count}",
-                    display_text=f"英文訂閱：{difficulty_name}，每天學習 {count} 個單字"
+                    data=f"{options['prefix']}_count={difficulty_id}/{count}",
+                    display_text=f"{options['name']}訂閱：{difficulty_name}，每天學習 {count} 個單字"
                 ),
                 style="primary",
                 color=COLOR_THEME['primary'] if count % 2 == 1 else COLOR_THEME['info'],
@@ -697,15 +712,16 @@ def get_count_menu(difficulty_id: str) -> FlexSendMessage:
     )
 
 
-def get_time_menu(difficulty_id: str, count: int) -> FlexSendMessage:
+def get_time_menu(difficulty_id: str, count: int, language: str = 'english') -> FlexSendMessage:
     """生成訂閱時間選單"""
+    options = SUBSCRIPTION_LANGUAGES[language]
     buttons = []
     for i, (time_id, time_name) in enumerate(SUBSCRIPTION_TIMES.items()):
         button = ButtonComponent(
             action=PostbackAction(
                 label=f"{time_name}",
-                data=f"english_subscribe_time={difficulty_id}/{count}/{time_id}",
-                display_text=f"英文訂閱：設定接收時間 {time_name}"
+                data=f"{options['prefix']}_time={difficulty_id}/{count}/{time_id}",
+                display_text=f"{options['name']}訂閱：設定接收時間 {time_name}"
             ),
             style="primary",
             color=COLOR_THEME['primary'] if i % 2 == 0 else COLOR_THEME['info'],
@@ -718,9 +734,11 @@ def get_time_menu(difficulty_id: str, count: int) -> FlexSendMessage:
     return FlexSendMessage(alt_text="訂閱時間選單", contents=bubble)
 
 
-def get_subscription_confirm(difficulty_id: str, count: int, selected_time: str) -> FlexSendMessage:
+def get_subscription_confirm(difficulty_id: str, count: int, selected_time: str,
+                             language: str = 'english') -> FlexSendMessage:
     """生成訂閱確認訊息"""
-    difficulty_name = DIFFICULTY_NAMES.get(difficulty_id, "未知難度")
+    options = SUBSCRIPTION_LANGUAGES[language]
+    difficulty_name = options['levels'].get(difficulty_id, "未知難度")
     time_name = SUBSCRIPTION_TIMES.get(selected_time, "未知時段")
 
     title = TextComponent(
@@ -789,11 +807,11 @@ def get_subscription_confirm(difficulty_id: str, count: int, selected_time: str)
         background_color=COLOR_THEME['card']
     )
 
-    display_text = f"英文訂閱：確認訂閱 {difficulty_name}，每天{count}個單字，{time_name} 發送"
+    display_text = f"{options['name']}訂閱：確認訂閱 {difficulty_name}，每天{count}個單字，{time_name} 發送"
     confirm_button = ButtonComponent(
         action=PostbackAction(
             label="確認",
-            data=f"english_subscribe_save={difficulty_id}/{count}/{selected_time}",
+            data=f"{options['prefix']}_save={difficulty_id}/{count}/{selected_time}",
             display_text=display_text
         ),
         style="primary",
@@ -820,3 +838,37 @@ def get_subscription_confirm(difficulty_id: str, count: int, selected_time: str)
     )
 
     return FlexSendMessage(alt_text="訂閱確認", contents=bubble)
+
+
+def get_subscription_language(action: str, data: Dict) -> Union[str, None]:
+    """判斷 postback 是否屬於單字訂閱流程，是的話返回訂閱的語言"""
+    for language, options in SUBSCRIPTION_LANGUAGES.items():
+        prefix = options['prefix']
+        if action.startswith(prefix) or any(key.startswith(f"{prefix}_") for key in data):
+            return language
+    return None
+
+
+def handle_subscription_postback(chat_id: str, language: str, action: str, data: Dict):
+    """處理單字訂閱流程的 postback：選單、難度、數量、時段、確認、查詢與取消"""
+    prefix = SUBSCRIPTION_LANGUAGES[language]['prefix']
+
+    if action == prefix:
+        return get_subscription_menu(language)
+    if action == f"{prefix}_setup":
+        return get_difficulty_menu(language)
+    if action == f"{prefix}_view":
+        return handle_subscription_view(chat_id, language)
+    if action == f"{prefix}_cancel":
+        return handle_subscription_cancel(chat_id, language)
+    if f"{prefix}_difficulty" in data:
+        return get_count_menu(data[f"{prefix}_difficulty"][0], language)
+    if f"{prefix}_count" in data:
+        difficulty_id, count = data[f"{prefix}_count"][0].split('/')
+        return get_time_menu(difficulty_id, int(count), language)
+    if f"{prefix}_time" in data:
+        difficulty_id, count, selected_time = handle_subscription_time(data, language)
+        return get_subscription_confirm(difficulty_id, count, selected_time, language)
+    if f"{prefix}_save" in data:
+        return handle_subscription_save(data, chat_id, language)
+    return None
@@ -0,0 +1,71 @@
+"""
+單字發音的延遲：每次點選都重新合成（直接連到 TTS）與經由 /audio/<雜湊> 本地快取的比較
+
+以本地 TTS 模擬伺服器作為上游，透過 Flask 測試用戶端請求語音端點。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_audio_cache [requests] [latency_ms]
+"""
+import logging
+import statistics
+import sys
+import tempfile
+import time
+
+import requests
+from flask import Flask
+
+from app.api import main_blueprint
+from app.services import audio_cache
+from benchmarks.tts_standin import start_tts_standin
+
+WORDS = ["negotiate", "abundant", "conclude", "diverse", "emerge", "fragile"]
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    logging.disable(logging.CRITICAL)
+    upstream = start_tts_standin(latency_ms)
+    app = Flask(__name__)
+    app.register_blueprint(main_blueprint)
+    client = app.test_client()
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = audio_cache.init_audio_cache(directory, 50 * 1024 * 1024, "https://bot.example",
+                                                 upstream_url=upstream.base_url)
+            direct, cached = [], []
+            for i in range(total):
+                word = WORDS[i % len(WORDS)]
+
+                start = time.perf_counter()
+                requests.get(upstream.base_url, params={"tl": "en", "q": word}, timeout=10).raise_for_status()
+                direct.append((time.perf_counter() - start) * 1000)
+
+                path = cache.url_for(word, "en").replace(cache.public_base_url, "")
+                start = time.perf_counter()
+                assert client.get(path).status_code == 200
+                cached.append((time.perf_counter() - start) * 1000)
+
+            ranged = client.get(path, headers={"Range": "bytes=0-99"})
+            etag = client.get(path).headers["ETag"]
+            revalidated = client.get(path, headers={"If-None-Match": etag})
+
+            print(f"requests={total} words={len(WORDS)} upstream latency={latency_ms:g} ms")
+            print(f"{'direct':<8} median {statistics.median(direct):>7.1f} ms  p95 {_p95(direct):>7.1f} ms")
+            print(f"{'cached':<8} median {statistics.median(cached):>7.1f} ms  p95 {_p95(cached):>7.1f} ms")
+            print(f"range -> {ranged.status_code} ({len(ranged.data)} bytes), "
+                  f"if-none-match -> {revalidated.status_code}")
+            print(f"upstream syntheses with cache: {cache.stats()['fetched']} (direct: {total})")
+    finally:
+        upstream.shutdown()
+
+
+def _p95(values: list) -> float:
+    return sorted(values)[int(len(values) * 0.95) - 1]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+對話紀錄記憶體用量比較：舊版 list[dict] 與 Conversation 精簡表示
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_conversation_memory [sessions] [turns]
+"""
+import gc
+import sys
+import tracemalloc
+
+from app.services.conversation_store import Conversation, ROLE_USER, ROLE_ASSISTANT
+from app.services.groq_service import SYSTEM_PROMPTS
+
+LEVEL_HINTS = ['初學者', '中級', '高級']
+
+# 模擬英文單字學習的提示詞，每次呼叫都重新組字串（與實際程式相同）
+PROMPT_TEMPLATE = """請提供一個英文單字的學習內容，包含以下欄位：
+
+    1. 單字 (word)
+    2. 發音（使用台灣常見的 KK 音標）(pronunciation)
+    3. 詞性 (part_of_speech)
+    4. 英文解釋 (definition_en)
+    5. 中文解釋 (definition_zh)
+    6. 例句 (example_sentence)
+    7. 例句翻譯 (example_translation)
+
+    請選擇適合{level}學習者的英文單字。
+
+    請以 **純 JSON 格式** 回覆，**不要添加多餘說明或文字**，並請確認所有資訊準確無誤。
+    """
+
+
+def build_prompt(i: int) -> str:
+    return PROMPT_TEMPLATE.format(level=LEVEL_HINTS[i % len(LEVEL_HINTS)])
+
+
+def build_answer(session: int, turn: int) -> str:
+    return f'{{"word": "word{session}_{turn}", "definition_zh": "範例解釋 {turn}"}}'
+
+
+def build_legacy(sessions: int, turns: int) -> dict:
+    store = {}
+    for s in range(sessions):
+        history = [{"role": "system", "content": SYSTEM_PROMPTS['english']}]
+        for t in range(turns):
+            history.append({"role": "user", "content": build_prompt(s)})
+            history.append({"role": "assistant", "content": build_answer(s, t)})
+        store[f"U{s:032d}"] = history
+    return store
+
+
+def build_compact(sessions: int, turns: int) -> dict:
+    store = {}
+    for s in range(sessions):
+        conversation = Conversation(SYSTEM_PROMPTS['english'])
+        for t in range(turns):
+            conversation.append(ROLE_USER, build_prompt(s), intern=True)
+            conversation.append(ROLE_ASSISTANT, build_answer(s, t))
+        store[f"U{s:032d}"] = conversation
+    return store
+
+
+def measure(builder, sessions: int, turns: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    store = builder(sessions, turns)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    gc.collect()
+    return current
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    legacy = measure(build_legacy, sessions, turns)
+    compact = measure(build_compact, sessions, turns)
+
+    print(f"sessions={sessions} turns={turns}")
+    print(f"legacy  list[dict] : {legacy / 1024 / 1024:8.1f} MiB ({legacy / sessions:7.0f} B/session)")
+    print(f"compact Conversation: {compact / 1024 / 1024:8.1f} MiB ({compact / sessions:7.0f} B/session)")
+    print(f"reduction           : {1 - compact / legacy:8.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+備用模型鏈的端對端延遲：在本地 Groq 模擬伺服器上量測聊天、英文單字與日文單字在不同故障情境下的延遲
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_fallback_latency [iterations] [scenario ...]
+
+例如：
+    python -m benchmarks.bench_fallback_latency 5 healthy primary_down first_five_rate_limited
+    GROQ_MAX_RETRIES=0 python -m benchmarks.bench_fallback_latency 3 primary_timeout
+"""
+import logging
+import math
+import os
+import statistics
+import sys
+import time
+
+from app.services import groq_service, seen_words
+from app.services.groq_async import AsyncGroqClient
+from app.utils.english_words import get_english_word_batch
+from app.utils.japanese_words import get_japanese_word
+from benchmarks.groq_standin import SCENARIOS, start_standin
+
+DEFAULT_SCENARIOS = ["healthy", "primary_down", "first_five_rate_limited", "primary_malformed", "flaky"]
+
+
+def chat_once(i: int):
+    # 每次使用新的聊天室與不同的問題，不受對話紀錄與回覆快取影響
+    chat_id = f"bench-chat-{i}"
+    groq_service.session_backend.set_ai_status(chat_id, True)
+    return groq_service.chat_with_groq(chat_id, f"請詳細解釋第 {i} 個關於時間管理的建議")
+
+
+def english_once(i: int):
+    words = get_english_word_batch(f"bench-english-{i}", "intermediate", 1)
+    return words[0] if words else None
+
+
+def japanese_once(i: int):
+    return get_japanese_word(f"bench-japanese-{i}")
+
+
+def is_failure(feature: str, result) -> bool:
+    """聊天失敗時回覆固定訊息；單字功能成功時回傳 dict 或 Flex Message，失敗時回傳錯誤字串"""
+    if feature == "chat":
+        return result is None or result == groq_service.FAILURE_REPLY
+    return result is None or isinstance(result, str)
+
+
+FEATURES = [("chat", chat_once), ("english", english_once), ("japanese", japanese_once)]
+
+
+def run_scenario(scenario: str, iterations: int, max_retries: int) -> None:
+    server = start_standin(scenario)
+    groq_service.groq_client = AsyncGroqClient(api_key="standin", base_url=server.base_url, max_retries=max_retries,
+                                               model_concurrency=groq_service.MODEL_CONCURRENCY_LIMITS)
+    # 各情境使用相同的聊天室 ID，清空已看過的單字，避免前一個情境看過的單字觸發重新生成
+    seen_words.init_seen_word_index()
+    try:
+        print(f"\n== {scenario} (iterations={iterations}, max_retries={max_retries})")
+        for name, fn in FEATURES:
+            server.reset_stats()
+            latencies = []
+            failures = 0
+            for i in range(iterations):
+                start = time.perf_counter()
+                result = fn(i)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if is_failure(name, result):
+                    failures += 1
+
+            upstream = sum(sum(counts.values()) for counts in server.requests.values())
+            p95 = sorted(latencies)[math.ceil(len(latencies) * 0.95) - 1]
+            print(f"{name:<9} p50={statistics.median(latencies):8.0f} ms  p95={p95:8.0f} ms  "
+                  f"max={max(latencies):8.0f} ms  failures={failures}/{iterations}  "
+                  f"upstream calls/request={upstream / iterations:.1f}")
+    finally:
+        server.shutdown()
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scenarios = sys.argv[2:] or DEFAULT_SCENARIOS
+    max_retries = int(os.getenv("GROQ_MAX_RETRIES", 2))
+
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}; available: {', '.join(SCENARIOS)}")
+        sys.exit(1)
+
+    # 故障情境會產生大量錯誤日誌，只輸出量測結果
+    logging.disable(logging.CRITICAL)
+
+    # 回覆快取會讓重複的聊天問題不經過模型，量測時關閉
+    groq_service.CACHED_SESSION_TYPES = ()
+    for scenario in scenarios:
+        run_scenario(scenario, iterations, max_retries)
+
+
+if __name__ == '__main__':
+    main()
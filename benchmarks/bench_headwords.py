@@ -0,0 +1,80 @@
+"""
+英文單字批次生成：由模型選字與從附帶單字清單選字（詳細資料快取冷 / 熱）的延遲與提示詞長度比較
+
+在本地 Groq 模擬伺服器的 realistic 情境下執行，延遲包含固定往返時間與依輸出長度增加的生成時間。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_headwords [iterations] [scenario]
+"""
+import logging
+import statistics
+import sys
+import tempfile
+import time
+
+from app.services import groq_service, headwords, seen_words, word_batch, word_cache
+from app.services.groq_async import AsyncGroqClient
+from app.utils import english_words
+from benchmarks.groq_standin import ENGLISH_WORD, start_standin
+
+COUNT = 5
+
+
+def measure(label: str, iterations: int) -> tuple:
+    prompts = []
+    original = word_batch.generate_objects
+
+    def recording(chat_id, prompt, *args, **kwargs):
+        prompts.append(len(prompt))
+        return original(chat_id, prompt, *args, **kwargs)
+
+    word_batch.generate_objects = recording
+    latencies = []
+    generated = 0
+    try:
+        for i in range(iterations):
+            # 每次使用新的聊天室，最近看過的單字數量一致
+            start = time.perf_counter()
+            generated += len(english_words.get_english_word_batch(f"bench-{label}-{i}", "intermediate", COUNT))
+            latencies.append((time.perf_counter() - start) * 1000)
+    finally:
+        word_batch.generate_objects = original
+    prompt_chars = statistics.mean(prompts) if prompts else 0
+    return statistics.median(latencies), len(prompts) / iterations, prompt_chars, generated / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scenario = sys.argv[2] if len(sys.argv) > 2 else "realistic"
+
+    logging.disable(logging.CRITICAL)
+    server = start_standin(scenario)
+    groq_service.groq_client = AsyncGroqClient(api_key="standin", base_url=server.base_url)
+
+    print(f"scenario={scenario} iterations={iterations} count={COUNT}")
+    print(f"{'selection':<18} {'latency':>10} {'llm calls':>10} {'prompt chars':>13} {'words':>6}")
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for label in ("model", "headwords-cold", "headwords-warm"):
+                seen_words.init_seen_word_index()
+                if label == "model":
+                    headwords.headword_library = None
+                    word_cache.init_word_cache()
+                else:
+                    headwords.init_headwords(directory)
+                if label == "headwords-cold":
+                    word_cache.init_word_cache()
+                elif label == "headwords-warm":
+                    # 先讓整份清單的詳細資料進入快取
+                    library = headwords.headword_library.get(english_words.LANGUAGE, "intermediate")
+                    word_cache.resolve_words(english_words.LANGUAGE, "intermediate",
+                                             [dict(ENGLISH_WORD, word=library[i]) for i in range(len(library))])
+
+                latency, calls, prompt_chars, words = measure(label, iterations)
+                print(f"{label:<18} {latency:>7.0f} ms {calls:>10.1f} {prompt_chars:>13.0f} {words:>6.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+新聞縮網址的延遲：逐一縮短（舊做法）、並行縮短（冷快取）與快取命中的比較
+
+以固定延遲的模擬縮網址函式代替 tinyurl，另外以部分網址特別慢的情況檢查總期限。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_short_links [articles] [latency_ms]
+"""
+import logging
+import sys
+import time
+
+from app.services.short_links import ShortLinkCache
+
+
+def make_shortener(latency_ms: float, slow_every: int = 0, slow_ms: float = 0):
+    calls = []
+
+    def shorten(url: str) -> str:
+        calls.append(url)
+        slow = slow_every and len(calls) % slow_every == 0
+        time.sleep((slow_ms if slow else latency_ms) / 1000)
+        return f"https://tinyurl.example/{abs(hash(url)) % 10 ** 8}"
+
+    return shorten, calls
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    articles = int(sys.argv[1]) if len(sys.argv) > 1 else 9
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 400
+
+    logging.disable(logging.CRITICAL)
+    urls = [f"https://news.example/articles/{i}" for i in range(articles)]
+    print(f"articles={articles} shortener latency={latency_ms:g} ms")
+
+    shorten, _ = make_shortener(latency_ms)
+    print(f"{'sequential':<22} {timed(lambda: [shorten(url) for url in urls]):>8.0f} ms")
+
+    cache = ShortLinkCache(max_workers=4, deadline=3.0)
+    shorten, calls = make_shortener(latency_ms)
+    print(f"{'concurrent (cold)':<22} {timed(lambda: cache.shorten_all(urls, shorten)):>8.0f} ms")
+    print(f"{'cached':<22} {timed(lambda: cache.shorten_all(urls, shorten)):>8.0f} ms  "
+          f"({len(calls)} shortener calls in total)")
+
+    # 每 3 個網址有一個需要 10 秒，整批仍在期限內回覆
+    cache = ShortLinkCache(max_workers=4, deadline=1.0)
+    shorten, _ = make_shortener(latency_ms, slow_every=3, slow_ms=10000)
+    results = []
+    elapsed = timed(lambda: results.extend(cache.shorten_all(urls, shorten)))
+    print(f"{'slow upstream, 1s cap':<22} {elapsed:>8.0f} ms  "
+          f"({sum(short != url for short, url in zip(results, urls))}/{articles} shortened, rest use original URL)")
+
+
+if __name__ == '__main__':
+    main()
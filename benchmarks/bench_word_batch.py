@@ -0,0 +1,60 @@
+"""
+多個英文單字的生成延遲：逐一請求（舊做法）與單一請求批次生成的比較
+
+在本地 Groq 模擬伺服器的 realistic 情境下執行，延遲包含固定往返時間與依輸出長度增加的生成時間。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.bench_word_batch [iterations] [scenario]
+"""
+import logging
+import statistics
+import sys
+import time
+
+from app.services import groq_service
+from app.services.groq_async import AsyncGroqClient
+from app.utils.english_words import get_english_word_batch
+from benchmarks.groq_standin import start_standin
+
+
+def sequential(chat_id: str, count: int) -> int:
+    return sum(len(get_english_word_batch(chat_id, "intermediate", 1)) for _ in range(count))
+
+
+def batched(chat_id: str, count: int) -> int:
+    return len(get_english_word_batch(chat_id, "intermediate", count))
+
+
+def measure(fn, count: int, iterations: int) -> tuple:
+    latencies = []
+    generated = 0
+    for i in range(iterations):
+        # 每次使用新的聊天室，對話紀錄長度一致
+        start = time.perf_counter()
+        generated += fn(f"bench-{fn.__name__}-{count}-{i}", count)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies), generated / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    scenario = sys.argv[2] if len(sys.argv) > 2 else "realistic"
+
+    logging.disable(logging.CRITICAL)
+    server = start_standin(scenario)
+    groq_service.groq_client = AsyncGroqClient(api_key="standin", base_url=server.base_url)
+
+    print(f"scenario={scenario} iterations={iterations}")
+    print(f"{'count':>5} {'sequential':>14} {'batched':>14} {'speedup':>8}")
+    try:
+        for count in range(1, 7):
+            sequential_ms, _ = measure(sequential, count, iterations)
+            batched_ms, words = measure(batched, count, iterations)
+            print(f"{count:>5} {sequential_ms:>11.0f} ms {batched_ms:>11.0f} ms {sequential_ms / batched_ms:>7.1f}x"
+                  f"  ({words:.1f} words)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""
+本地 Groq（OpenAI 相容）模擬伺服器，可依模型設定延遲分布、429、5xx、逾時與損壞的 JSON
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.groq_standin [scenario] [port]
+
+應用程式設定 GROQ_BASE_URL=http://127.0.0.1:<port> 即可改連到此伺服器。
+"""
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+PRIMARY_MODEL = "llama-3.3-70b-versatile"
+
+# 依序嘗試的前幾個模型（主要模型 + 備用模型列表的前段）
+FIRST_FIVE_MODELS = [
+    PRIMARY_MODEL,
+    "compound-beta",
+    "meta-llama/llama-4-scout-17b-16e-instruct",
+    "gemma2-9b-it",
+    "llama-guard-3-8b",
+]
+
+ENGLISH_WORD = {
+    "word": "negotiate",
+    "pronunciation": "/nɪˈɡoʊʃiˌeɪt/",
+    "part_of_speech": "verb",
+    "definition_en": "to discuss something formally in order to reach an agreement",
+    "definition_zh": "協商、談判",
+    "example_sentence": "We need to negotiate a better deal with the supplier.",
+    "example_translation": "我們需要與供應商協商更好的條件。"
+}
+
+# 批次請求時輪流使用的單字，讓陣列中的單字不重複
+BATCH_WORDS = ["negotiate", "abundant", "conclude", "diverse", "emerge", "fragile", "generous", "hesitate",
+               "inspire", "justify", "maintain", "obtain"]
+
+JAPANESE_WORD = {
+    "word": "約束",
+    "hiragana": "やくそく",
+    "romaji": "yakusoku",
+    "part_of_speech": "名詞",
+    "definition_ja": "前もって決めた事柄を守ること",
+    "definition_zh": "約定、承諾",
+    "example_sentence": "友達と映画を見る約束をしました。",
+    "example_translation": "我和朋友約定要一起看電影。"
+}
+
+# 日文批次請求時輪流使用的單字
+JAPANESE_BATCH_WORDS = ["約束", "準備", "経験", "相談", "習慣", "景色", "興味", "機会"]
+
+
+@dataclass
+class ModelBehavior:
+    """單一模型的模擬行為"""
+    latency_ms: float = 200          # 平均延遲
+    jitter_ms: float = 50            # 延遲標準差
+    status: Optional[int] = None     # 固定回傳的錯誤狀態碼（例如 429、503）
+    error_rate: float = 0.0          # 隨機回傳 error_status 的機率
+    error_status: int = 500
+    retry_after: Optional[float] = None  # 429 回應附帶的 retry-after 秒數
+    hang_s: float = 0.0              # 回應前額外等待的秒數（模擬逾時）
+    ms_per_output_token: float = 0.0  # 每個輸出 token 的生成時間，回覆越長延遲越高
+    malformed_rate: float = 0.0      # 回傳損壞 JSON 的機率
+
+
+SCENARIOS: Dict[str, Dict[str, ModelBehavior]] = {
+    "healthy": {
+        "*": ModelBehavior(),
+    },
+    "primary_down": {
+        PRIMARY_MODEL: ModelBehavior(latency_ms=20, jitter_ms=5, status=503),
+        "*": ModelBehavior(),
+    },
+    "first_five_rate_limited": {
+        **{model: ModelBehavior(latency_ms=20, jitter_ms=5, status=429, retry_after=1) for model in FIRST_FIVE_MODELS},
+        "*": ModelBehavior(),
+    },
+    "primary_timeout": {
+        PRIMARY_MODEL: ModelBehavior(hang_s=15),
+        "*": ModelBehavior(),
+    },
+    "primary_malformed": {
+        PRIMARY_MODEL: ModelBehavior(malformed_rate=1.0),
+        "*": ModelBehavior(),
+    },
+    "realistic": {
+        "*": ModelBehavior(latency_ms=250, jitter_ms=50, ms_per_output_token=3.5),
+    },
+    "flaky": {
+        "*": ModelBehavior(latency_ms=400, jitter_ms=300, error_rate=0.3, error_status=502),
+    },
+}
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, scenario: Dict[str, ModelBehavior], seed: int = 0):
+        super().__init__(address, _Handler)
+        self.scenario = scenario
+        self.random = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        # model -> {狀態碼: 次數}
+        self.requests: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def behavior(self, model: str) -> ModelBehavior:
+        return self.scenario.get(model) or self.scenario.get("*") or ModelBehavior()
+
+    def record(self, model: str, outcome: str) -> None:
+        with self.lock:
+            counts = self.requests.setdefault(model, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def reset_stats(self) -> None:
+        with self.lock:
+            self.requests = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        server: StandinServer = self.server
+        model = body.get("model", "")
+        behavior = server.behavior(model)
+        with server.lock:
+            roll = server.random.random()
+            delay = max(server.random.gauss(behavior.latency_ms, behavior.jitter_ms), 0) / 1000
+
+        time.sleep(delay + behavior.hang_s)
+
+        status = behavior.status
+        if status is None and roll < behavior.error_rate:
+            status = behavior.error_status
+        if status is not None:
+            server.record(model, str(status))
+            headers = {}
+            if status == 429 and behavior.retry_after is not None:
+                headers["retry-after"] = str(behavior.retry_after)
+            self._send_json(status, {"error": {"message": f"Stand-in error {status}", "type": "standin"}}, headers)
+            return
+
+        if roll < behavior.malformed_rate:
+            server.record(model, "malformed")
+            self._send_raw(200, b'{"id": "chatcmpl-standin", "choices": [{"message": {"content": "')
+            return
+
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = _reply_for(body.get("messages", []), json_mode)
+        completion_tokens = len(content) // 4
+        time.sleep(completion_tokens * behavior.ms_per_output_token / 1000)
+
+        server.record(model, "200")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        self._send_json(200, {
+            "id": f"chatcmpl-standin-{next(server.ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None) -> None:
+        self._send_raw(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), headers)
+
+    def _send_raw(self, status: int, data: bytes, headers: dict = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _reply_for(messages: list, json_mode: bool = False) -> str:
+    """依最後一則使用者訊息的內容回傳對應格式的回覆，JSON 物件模式下陣列會包在物件中"""
+    prompt = next((str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), "")
+    listed = re.search(r"以下(英文|日文)單字的詳細資料：(.+?)。", prompt)
+    if listed:
+        template = ENGLISH_WORD if listed.group(1) == "英文" else JAPANESE_WORD
+        words = [dict(template, word=word.strip()) for word in re.split(r"[,、]", listed.group(2)) if word.strip()]
+        return json.dumps({"words": words} if json_mode else words, ensure_ascii=False)
+    batch = re.search(r"(\d+) 個不同的日文單字", prompt)
+    if batch:
+        return _batch_reply(JAPANESE_WORD, JAPANESE_BATCH_WORDS, int(batch.group(1)), json_mode)
+    if "日文單字" in prompt:
+        return json.dumps(JAPANESE_WORD, ensure_ascii=False)
+    batch = re.search(r"(\d+) 個(?:與先前回覆)?不同的英文單字", prompt)
+    if batch:
+        return _batch_reply(ENGLISH_WORD, BATCH_WORDS, int(batch.group(1)), json_mode)
+    if "英文單字" in prompt:
+        return json.dumps(ENGLISH_WORD, ensure_ascii=False)
+    return "這是模擬伺服器的回覆。"
+
+
+def _batch_reply(template: dict, vocabulary: list, count: int, json_mode: bool) -> str:
+    """從隨機位置輪流取用單字，讓同一個回覆中的單字不重複"""
+    start = random.randrange(len(vocabulary))
+    words = [dict(template, word=vocabulary[(start + i) % len(vocabulary)]) for i in range(count)]
+    return json.dumps({"words": words} if json_mode else words, ensure_ascii=False)
+
+
+def start_standin(scenario: str = "healthy", host: str = "127.0.0.1", port: int = 0) -> StandinServer:
+    """在背景執行緒啟動模擬伺服器，port 為 0 時自動選擇可用的埠"""
+    server = StandinServer((host, port), SCENARIOS[scenario])
+    threading.Thread(target=server.serve_forever, name="groq-standin", daemon=True).start()
+    return server
+
+
+def main():
+    scenario = sys.argv[1] if len(sys.argv) > 1 else "healthy"
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    if scenario not in SCENARIOS:
+        print(f"Unknown scenario '{scenario}', available: {', '.join(SCENARIOS)}")
+        sys.exit(1)
+
+    server = StandinServer(("127.0.0.1", port), SCENARIOS[scenario])
+    print(f"Groq stand-in ({scenario}) listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+本地 TTS 模擬伺服器，介面與 Google Translate TTS 相同（GET /translate_tts?tl=<語言>&q=<文字>）
+
+回傳依文字決定、長度與文字成正比的假 MP3 內容，並模擬合成延遲。
+
+執行方式（於專案根目錄）：
+    python -m benchmarks.tts_standin [latency_ms] [port]
+
+應用程式設定 TTS_UPSTREAM_URL=http://127.0.0.1:<port>/translate_tts 即可改連到此伺服器。
+"""
+import hashlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 假音訊每個字元的位元組數（約略等於 32 kbps 的 MP3）
+BYTES_PER_CHAR = 600
+
+
+class TtsStandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms: float = 300):
+        super().__init__(address, _Handler)
+        self.latency_ms = latency_ms
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/translate_tts"
+
+
+def fake_audio(text: str, lang: str) -> bytes:
+    """依文字產生固定的假 MP3 內容（ID3 標頭 + 重複的雜湊）"""
+    seed = hashlib.sha256(f"{lang}\n{text}".encode("utf-8")).digest()
+    size = max(len(text), 1) * BYTES_PER_CHAR
+    return b"ID3\x04\x00\x00\x00\x00\x00\x00" + (seed * (size // len(seed) + 1))[:size]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        text = params.get("q", [""])[0]
+        if url.path.rstrip("/") != "/translate_tts" or not text:
+            self._send(404, b"not found", "text/plain")
+            return
+
+        server: TtsStandinServer = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency_ms / 1000)
+        self._send(200, fake_audio(text, params.get("tl", ["en"])[0]), "audio/mpeg")
+
+    def _send(self, status: int, data: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tts_standin(latency_ms: float = 300, host: str = "127.0.0.1", port: int = 0) -> TtsStandinServer:
+    """在背景執行緒啟動模擬伺服器，port 為 0 時自動選擇可用的埠"""
+    server = TtsStandinServer((host, port), latency_ms)
+    threading.Thread(target=server.serve_forever, name="tts-standin", daemon=True).start()
+    return server
+
+
+def main():
+    latency_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 300
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8766
+
+    server = TtsStandinServer(("127.0.0.1", port), latency_ms)
+    print(f"TTS stand-in listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
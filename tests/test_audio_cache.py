@@ -0,0 +1,158 @@
+import os
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from app.api import main_blueprint
+from app.services import audio_cache
+from app.services.audio_cache import AudioCache, audio_key
+
+
+class FakeUpstream:
+    """以文字長度決定音訊大小的 TTS，記錄合成次數"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, lang):
+        self.calls.append(text)
+        return text.encode("utf-8") * 10
+
+
+@pytest.fixture
+def upstream():
+    return FakeUpstream()
+
+
+@pytest.fixture
+def cache(tmp_path, upstream):
+    return AudioCache(str(tmp_path / "audio"), max_bytes=100, upstream=upstream, public_base_url="https://bot")
+
+
+@pytest.fixture
+def client(cache, monkeypatch):
+    monkeypatch.setattr(audio_cache, "audio_cache", cache)
+    app = Flask(__name__)
+    app.register_blueprint(main_blueprint)
+    return app.test_client()
+
+
+def path_of(url):
+    return url.replace("https://bot", "")
+
+
+def registered(cache, key):
+    return cache._connection().execute("SELECT 1 FROM audio_texts WHERE hash = ?", (key,)).fetchone() is not None
+
+
+def test_audio_is_fetched_once_and_served_from_disk(cache, client, upstream):
+    url = cache.url_for("apple", "en")
+
+    assert client.get(path_of(url)).data == b"apple" * 10
+    assert client.get(path_of(url)).data == b"apple" * 10
+    assert upstream.calls == ["apple"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_file_over_limit_is_served_but_not_cached(cache, client, upstream):
+    url = cache.url_for("extraordinarily", "en")
+
+    response = client.get(path_of(url))
+
+    assert response.status_code == 200
+    assert response.data == b"extraordinarily" * 10
+    stats = cache.stats()
+    assert stats["files"] == 0
+    assert stats["oversized"] == 1
+    assert not os.path.exists(cache._path(audio_key("extraordinarily", "en")))
+
+
+def test_eviction_removes_file_and_registration(cache, client, upstream):
+    first = cache.url_for("apple", "en")
+    client.get(path_of(first))
+    second = cache.url_for("bridge", "en")
+    client.get(path_of(second))
+
+    key = audio_key("apple", "en")
+    assert cache.stats()["evicted"] == 1
+    assert not os.path.exists(cache._path(key))
+    assert not registered(cache, key)
+    assert client.get(path_of(first)).status_code == 404
+
+    # 重新產生連結時再登記
+    assert client.get(path_of(cache.url_for("apple", "en"))).status_code == 200
+
+
+def test_file_evicted_before_sending_is_fetched_again(cache, client, upstream, monkeypatch):
+    url = cache.url_for("apple", "en")
+    client.get(path_of(url))
+    key = audio_key("apple", "en")
+
+    # 模擬取得路徑後檔案被其他 worker 刪除
+    get_audio = cache.get_audio
+
+    def evicted_once(audio_hash):
+        audio = get_audio(audio_hash)
+        if isinstance(audio, str) and os.path.exists(audio) and len(upstream.calls) == 1:
+            os.remove(audio)
+        return audio
+
+    monkeypatch.setattr(cache, "get_audio", evicted_once)
+
+    response = client.get(path_of(url))
+
+    assert response.status_code == 200
+    assert response.data == b"apple" * 10
+    assert upstream.calls == ["apple", "apple"]
+    assert os.path.exists(cache._path(key))
+
+
+def test_unregistered_hash_is_not_found(client):
+    assert client.get("/audio/" + "0" * 32).status_code == 404
+
+
+def test_unfetched_registrations_expire(cache, client, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr("app.services.audio_cache.time.time", lambda: now[0])
+    stale = cache.url_for("apple", "en")
+    fetched = cache.url_for("bridge", "en")
+    assert client.get(path_of(fetched)).status_code == 200
+
+    now[0] += cache.link_ttl + audio_cache.PRUNE_INTERVAL
+    cache.url_for("candle", "en")
+
+    assert not registered(cache, audio_key("apple", "en"))
+    assert registered(cache, audio_key("bridge", "en"))
+    assert registered(cache, audio_key("candle", "en"))
+    assert cache.stats()["pruned"] == 1
+    assert client.get(path_of(stale)).status_code == 404
+
+
+def test_rendering_a_link_again_extends_its_registration(cache, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr("app.services.audio_cache.time.time", lambda: now[0])
+    cache.url_for("apple", "en")
+
+    now[0] += cache.link_ttl * 0.75
+    cache.url_for("apple", "en")
+    now[0] += cache.link_ttl * 0.75 + audio_cache.PRUNE_INTERVAL
+    cache.url_for("candle", "en")
+
+    assert registered(cache, audio_key("apple", "en"))
+
+
+def test_existing_table_without_registration_time_is_migrated(tmp_path, upstream):
+    directory = tmp_path / "audio"
+    directory.mkdir()
+    conn = sqlite3.connect(str(directory / "audio.db"))
+    conn.execute("CREATE TABLE audio_texts (hash TEXT PRIMARY KEY, lang TEXT NOT NULL, text TEXT NOT NULL)")
+    conn.execute("INSERT INTO audio_texts VALUES (?, 'en', 'apple')", (audio_key("apple", "en"),))
+    conn.commit()
+    conn.close()
+
+    cache = AudioCache(str(directory), max_bytes=100, upstream=upstream)
+    cache.url_for("bridge", "en")
+
+    assert registered(cache, audio_key("apple", "en"))
+    assert cache.get_audio(audio_key("apple", "en")) is not None
@@ -0,0 +1,38 @@
+import os
+import threading
+
+from app.services.chat_debouncer import ChatDebouncer
+from app.services.session_backend import SQLiteSessionBackend
+
+
+def test_group_bursts_are_merged_per_user():
+    flushed = []
+    done = threading.Event()
+
+    def on_flush(*args):
+        flushed.append(args)
+        if len(flushed) == 2:
+            done.set()
+
+    debouncer = ChatDebouncer(50, on_flush)
+    debouncer.submit("group", "hi", "t1", "alice")
+    debouncer.submit("group", "what time is it?", "t2", "bob")
+    debouncer.submit("group", "how are you", "t3", "alice")
+
+    assert done.wait(2)
+    assert sorted(flushed) == [
+        ("group", "hi\nhow are you", "t3", 2),
+        ("group", "what time is it?", "t2", 1)
+    ]
+
+
+def test_debounce_opt_in_is_shared_between_workers(tmp_path):
+    db_path = os.path.join(tmp_path, "sessions.db")
+    worker_a = SQLiteSessionBackend(db_path)
+    worker_b = SQLiteSessionBackend(db_path)
+
+    assert worker_b.get_debounce_status("chat") is False
+    worker_a.set_debounce_status("chat", True)
+
+    assert worker_b.get_debounce_status("chat") is True
+    assert worker_b.get_ai_status("chat") is False
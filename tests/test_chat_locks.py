@@ -0,0 +1,72 @@
+import threading
+
+from app.services.chat_locks import ChatLockManager
+
+
+def test_unrelated_chats_do_not_wait_for_each_other():
+    locks = ChatLockManager()
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold_chat_a():
+        with locks.hold(("chat", "A")):
+            entered.set()
+            release.wait(5)
+
+    worker = threading.Thread(target=hold_chat_a)
+    worker.start()
+    assert entered.wait(5)
+
+    acquired = threading.Event()
+
+    def hold_chat_b():
+        with locks.hold(("chat", "B")):
+            acquired.set()
+
+    other = threading.Thread(target=hold_chat_b)
+    other.start()
+    assert acquired.wait(1), "chat B waited for chat A's lock"
+
+    release.set()
+    worker.join()
+    other.join()
+    assert locks.stats()["contended"] == 0
+
+
+def test_same_chat_is_serialized():
+    locks = ChatLockManager()
+    order = []
+    entered = threading.Event()
+    release = threading.Event()
+
+    def first():
+        with locks.hold(("chat", "A")):
+            entered.set()
+            release.wait(5)
+            order.append("first")
+
+    def second():
+        with locks.hold(("chat", "A")):
+            order.append("second")
+
+    t1 = threading.Thread(target=first)
+    t1.start()
+    assert entered.wait(5)
+    t2 = threading.Thread(target=second)
+    t2.start()
+    t2.join(0.2)
+    assert order == []
+
+    release.set()
+    t1.join()
+    t2.join()
+    assert order == ["first", "second"]
+    assert locks.stats()["contended"] == 1
+
+
+def test_locks_are_removed_when_released():
+    locks = ChatLockManager()
+    with locks.hold(("chat", "A")):
+        with locks.hold(("chat", "A")):
+            assert len(locks) == 1
+    assert len(locks) == 0
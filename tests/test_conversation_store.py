@@ -0,0 +1,126 @@
+from app.services.conversation_store import (
+    Conversation, ROLE_USER, ROLE_ASSISTANT, TRUNCATION_MARK, estimate_tokens, truncate_to_tokens
+)
+
+SYSTEM_PROMPT = "你是測試用的助手。"
+
+
+def make_conversation(capacity: int = 20) -> Conversation:
+    return Conversation(SYSTEM_PROMPT, capacity=capacity)
+
+
+def roles(conversation: Conversation) -> list:
+    return [role for role, _ in conversation.iter_messages()]
+
+
+def test_ring_buffer_overwrites_oldest_when_full():
+    conversation = make_conversation(capacity=4)
+    evicted = [conversation.append(ROLE_USER if i % 2 == 0 else ROLE_ASSISTANT, f"m{i}") for i in range(6)]
+
+    assert evicted[:4] == [None] * 4
+    assert evicted[4:] == [(ROLE_USER, "m0"), (ROLE_ASSISTANT, "m1")]
+    assert [content for _, content in conversation.iter_messages()] == ["m2", "m3", "m4", "m5"]
+    assert conversation.tokens == sum(estimate_tokens(f"m{i}") for i in range(2, 6))
+
+
+def test_ring_buffer_regrows_after_being_emptied():
+    conversation = make_conversation(capacity=4)
+    conversation.append(ROLE_ASSISTANT, "only reply")
+    assert conversation.trim_to_budget(10_000) == [(ROLE_ASSISTANT, "only reply")]
+    assert len(conversation) == 0 and conversation.tokens == 0
+
+    conversation.append(ROLE_USER, "again")
+    assert list(conversation.iter_messages()) == [(ROLE_USER, "again")]
+
+
+def test_dump_and_load_round_trip_keeps_templates():
+    conversation = make_conversation(capacity=4)
+    conversation.append(ROLE_USER, "template prompt", intern=True)
+    conversation.append(ROLE_ASSISTANT, "reply")
+    conversation.set_summary("之前聊過天氣")
+
+    restored = Conversation.load(conversation.dump())
+
+    assert list(restored.iter_messages()) == list(conversation.iter_messages())
+    assert restored.summary == "之前聊過天氣"
+    assert restored.total_tokens == conversation.total_tokens
+
+
+def test_trim_removes_oldest_turns_in_pairs():
+    conversation = make_conversation()
+    for i in range(3):
+        conversation.append(ROLE_USER, "q" * 400)
+        conversation.append(ROLE_ASSISTANT, "a" * 400)
+    conversation.append(ROLE_USER, "latest question")
+
+    budget = conversation.system_tokens + estimate_tokens("latest question") + 2 * estimate_tokens("q" * 400) + 10
+    evicted = conversation.trim_to_budget(budget)
+
+    assert [role for role, _ in evicted] == [ROLE_USER, ROLE_ASSISTANT] * 2
+    assert roles(conversation) == [ROLE_USER, ROLE_ASSISTANT, ROLE_USER]
+    assert conversation.total_tokens <= budget
+
+
+def test_trim_keeps_newest_turn_when_it_alone_exceeds_budget():
+    conversation = make_conversation()
+    conversation.append(ROLE_USER, "x" * 8000)
+    conversation.append(ROLE_ASSISTANT, "y" * 8000)
+
+    assert conversation.trim_to_budget(3000) == []
+
+    messages = list(conversation.iter_messages())
+    assert [role for role, _ in messages] == [ROLE_USER, ROLE_ASSISTANT]
+    assert all(content.endswith(TRUNCATION_MARK) for _, content in messages)
+    assert conversation.total_tokens <= 3000
+
+
+def test_trim_after_long_reply_drops_history_but_keeps_latest_turn():
+    conversation = make_conversation()
+    conversation.append(ROLE_USER, "hello")
+    conversation.append(ROLE_ASSISTANT, "hi")
+    conversation.append(ROLE_USER, "write me an essay")
+    conversation.append(ROLE_ASSISTANT, "z" * 12000)
+
+    evicted = conversation.trim_to_budget(2000)
+
+    assert evicted == [(ROLE_USER, "hello"), (ROLE_ASSISTANT, "hi")]
+    messages = list(conversation.iter_messages())
+    assert messages[0] == (ROLE_USER, "write me an essay")
+    assert messages[1][0] == ROLE_ASSISTANT and messages[1][1].endswith(TRUNCATION_MARK)
+    assert conversation.total_tokens <= 2000
+
+
+def test_trim_keeps_new_user_message_alone():
+    conversation = make_conversation()
+    conversation.append(ROLE_USER, "old question")
+    conversation.append(ROLE_ASSISTANT, "old answer")
+    conversation.append(ROLE_USER, "新問題" * 3000)
+
+    evicted = conversation.trim_to_budget(1000)
+
+    assert evicted == [(ROLE_USER, "old question"), (ROLE_ASSISTANT, "old answer")]
+    assert roles(conversation) == [ROLE_USER]
+    assert conversation.total_tokens <= 1000
+
+
+def test_to_messages_with_smaller_budget_does_not_modify_history():
+    conversation = make_conversation()
+    for i in range(4):
+        conversation.append(ROLE_USER, f"question {i} " + "q" * 200)
+        conversation.append(ROLE_ASSISTANT, f"answer {i} " + "a" * 200)
+    conversation.append(ROLE_USER, "latest")
+
+    messages = conversation.to_messages(conversation.system_tokens + 150)
+
+    assert messages[0]["role"] == "system"
+    assert messages[1]["role"] == "user"
+    assert messages[-1] == {"role": "user", "content": "latest"}
+    assert len(conversation) == 9
+
+
+def test_truncate_to_tokens():
+    assert truncate_to_tokens("short", 100) == "short"
+
+    truncated = truncate_to_tokens("中文" * 100, 50)
+    assert truncated.endswith(TRUNCATION_MARK)
+    assert estimate_tokens(truncated) <= 50
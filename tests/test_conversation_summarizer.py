@@ -0,0 +1,140 @@
+import threading
+import time
+
+from app.services.conversation_store import ROLE_ASSISTANT, ROLE_USER, SUMMARY_PREFIX, Conversation
+from app.services.conversation_summarizer import MAX_TURN_CHARS, ConversationSummarizer
+
+
+class Store:
+    """記憶體中的對話紀錄，記錄寫回的次數"""
+
+    def __init__(self):
+        self.conversations = {}
+        self.saves = 0
+
+    def load(self, session_type, chat_id):
+        return self.conversations.get((session_type, chat_id))
+
+    def save(self, session_type, chat_id, conversation):
+        self.conversations[(session_type, chat_id)] = conversation
+        self.saves += 1
+
+
+class Summarize:
+    """記錄每次摘要請求；設定 gate 時等到放行才回覆"""
+
+    def __init__(self, reply="使用者想學日文", gate=None):
+        self.calls = []
+        self.reply = reply
+        self.gate = gate
+        self.started = threading.Event()
+
+    def __call__(self, session_type, chat_id, previous, turns):
+        self.calls.append((chat_id, previous, list(turns)))
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait(5)
+        if isinstance(self.reply, Exception):
+            raise self.reply
+        return self.reply
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def conversation(*texts):
+    conv = Conversation("system", capacity=10)
+    for text in texts:
+        conv.append(ROLE_USER, text)
+    return conv
+
+
+def test_evicted_turns_become_summary_sent_with_requests():
+    store, summarize = Store(), Summarize()
+    store.save("chat", "A", conversation("最新的問題"))
+    summarizer = ConversationSummarizer(summarize, store.load, store.save)
+
+    summarizer.submit("chat", "A", [(ROLE_USER, "我想學日文"), (ROLE_ASSISTANT, "好的")])
+
+    wait_for(lambda: store.load("chat", "A").summary is not None)
+    assert summarize.calls == [("A", None, [(ROLE_USER, "我想學日文"), (ROLE_ASSISTANT, "好的")])]
+    messages = store.load("chat", "A").to_messages()
+    assert any(SUMMARY_PREFIX in message["content"] and "使用者想學日文" in message["content"]
+               for message in messages)
+
+
+def test_batches_submitted_while_busy_are_merged():
+    store, gate = Store(), threading.Event()
+    summarize = Summarize(gate=gate)
+    store.save("chat", "A", conversation("hi"))
+    summarizer = ConversationSummarizer(summarize, store.load, store.save)
+
+    summarizer.submit("chat", "A", [(ROLE_USER, "one")])
+    summarize.started.wait(5)
+    summarizer.submit("chat", "A", [(ROLE_USER, "two")])
+    summarizer.submit("chat", "A", [(ROLE_USER, "three")])
+    gate.set()
+
+    wait_for(lambda: len(summarize.calls) == 2 and store.saves == 3)
+    assert summarize.calls[1][1:] == ("使用者想學日文", [(ROLE_USER, "two"), (ROLE_USER, "three")])
+
+
+def test_summary_is_written_to_the_latest_conversation():
+    store, gate = Store(), threading.Event()
+    summarize = Summarize(gate=gate)
+    store.save("chat", "A", conversation("old"))
+    summarizer = ConversationSummarizer(summarize, store.load, store.save)
+
+    summarizer.submit("chat", "A", [(ROLE_USER, "evicted")])
+    summarize.started.wait(5)
+    # 摘要期間使用者又傳了訊息
+    store.save("chat", "A", conversation("old", "new"))
+    gate.set()
+
+    wait_for(lambda: store.load("chat", "A").summary is not None)
+    assert [content for _, content in store.load("chat", "A").iter_messages()] == ["old", "new"]
+
+
+def test_failed_summaries_leave_conversation_unchanged_and_worker_alive():
+    store = Store()
+    summarize = Summarize(reply=RuntimeError("model down"))
+    store.save("chat", "A", conversation("hi"))
+    store.save("chat", "B", conversation("hi"))
+    summarizer = ConversationSummarizer(summarize, store.load, store.save)
+
+    summarizer.submit("chat", "A", [(ROLE_USER, "x" * (MAX_TURN_CHARS * 2))])
+    wait_for(lambda: len(summarize.calls) == 1)
+    summarize.reply = None
+    summarizer.submit("chat", "B", [(ROLE_USER, "y")])
+    wait_for(lambda: len(summarize.calls) == 2)
+
+    assert len(summarize.calls[0][2][0][1]) == MAX_TURN_CHARS
+    assert store.load("chat", "A").summary is None
+    assert store.load("chat", "B").summary is None
+    assert store.saves == 2
+
+
+def test_write_back_holds_the_chat_lock():
+    store, summarize = Store(), Summarize()
+    store.save("chat", "A", conversation("hi"))
+    held = []
+
+    class Hold:
+        def __init__(self, session_type, chat_id):
+            self.key = (session_type, chat_id)
+
+        def __enter__(self):
+            held.append(self.key)
+
+        def __exit__(self, *exc):
+            return False
+
+    summarizer = ConversationSummarizer(summarize, store.load, store.save, hold=Hold)
+    summarizer.submit("chat", "A", [(ROLE_USER, "evicted")])
+
+    wait_for(lambda: store.load("chat", "A").summary is not None)
+    assert held == [("chat", "A")]
@@ -0,0 +1,115 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import feed_cache
+from app.services.feed_cache import StaleWhileRevalidateCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Fetch:
+    """回傳第幾次取得的內容；設定 gate 時等到放行才回傳"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = None
+        self.error = None
+
+    def __call__(self, key):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return f"{key}-{self.calls}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(feed_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+@pytest.fixture
+def fetch():
+    return Fetch()
+
+
+@pytest.fixture
+def cache(clock, fetch):
+    return StaleWhileRevalidateCache(fetch, fresh_ttl=60, stale_ttl=600)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_fresh_entries_are_served_without_fetching(cache, clock, fetch):
+    assert cache.get("tw") == "tw-1"
+    clock.now += 59
+
+    assert cache.get("tw") == "tw-1"
+    assert fetch.calls == 1
+    assert cache.stats()["fresh_hits"] == 1
+
+
+def test_stale_entry_is_returned_while_one_refresh_runs(cache, clock, fetch):
+    cache.get("tw")
+    clock.now += 120
+    fetch.gate = threading.Event()
+
+    # 背景更新尚未完成時，所有請求都立即拿到舊內容，且只觸發一次更新
+    assert [cache.get("tw") for _ in range(3)] == ["tw-1"] * 3
+    wait_for(lambda: fetch.calls == 2)
+    fetch.gate.set()
+    wait_for(lambda: cache.stats()["refreshes"] == 1)
+
+    assert cache.get("tw") == "tw-2"
+    assert fetch.calls == 2
+    assert cache.stats()["stale_hits"] == 3
+
+
+def test_failed_refresh_keeps_the_stale_entry(cache, clock, fetch):
+    cache.get("tw")
+    clock.now += 120
+    fetch.error = RuntimeError("feed down")
+
+    assert cache.get("tw") == "tw-1"
+    wait_for(lambda: cache.stats()["refresh_errors"] == 1)
+    assert cache.contains("tw")
+
+    # 超過可用期後不再使用舊內容，同步取得失敗時拋出例外
+    clock.now += 600
+    assert not cache.contains("tw")
+    with pytest.raises(RuntimeError):
+        cache.get("tw")
+
+
+def test_concurrent_misses_fetch_once(cache, fetch):
+    fetch.gate = threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("tw"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+
+    wait_for(lambda: cache._flight.coalesced == 3)
+    fetch.gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["tw-1"] * 4
+    assert fetch.calls == 1
+    assert cache.stats()["misses"] == 4
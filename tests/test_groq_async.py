@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.groq_async import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, AsyncGroqClient, ModelBusyError, _PriorityGate
+)
+from benchmarks.groq_standin import ModelBehavior, StandinServer
+
+
+async def settle():
+    # 讓已分配到名額的等待者先執行
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_interactive_waiters_are_served_before_batch():
+    async def scenario():
+        gate = _PriorityGate(limit=2, batch_limit=2)
+        await gate.acquire(PRIORITY_INTERACTIVE, 1)
+        await gate.acquire(PRIORITY_INTERACTIVE, 1)
+        order = []
+
+        async def wait(name, priority):
+            await gate.acquire(priority, 1)
+            order.append(name)
+
+        tasks = [asyncio.ensure_future(wait(name, priority)) for name, priority in
+                 [("batch-1", PRIORITY_BATCH), ("batch-2", PRIORITY_BATCH),
+                  ("interactive-1", PRIORITY_INTERACTIVE), ("interactive-2", PRIORITY_INTERACTIVE)]]
+        await settle()
+        assert gate.waiting() == {PRIORITY_INTERACTIVE: 2, PRIORITY_BATCH: 2}
+
+        # 每釋出一個名額只放行一個等待者，即時請求優先，同等級依到達順序
+        for _ in range(4):
+            gate.release(PRIORITY_INTERACTIVE)
+            await settle()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive-1", "interactive-2", "batch-1", "batch-2"]
+
+
+def test_batch_requests_leave_slots_for_interactive():
+    async def scenario():
+        gate = _PriorityGate(limit=3, batch_limit=1)
+        await gate.acquire(PRIORITY_BATCH, 1)
+
+        # 還有空的名額，但批次請求已達上限
+        with pytest.raises(asyncio.TimeoutError):
+            await gate.acquire(PRIORITY_BATCH, 0.05)
+        assert (gate.active, gate.active_batch) == (1, 1)
+
+        await gate.acquire(PRIORITY_INTERACTIVE, 1)
+        await gate.acquire(PRIORITY_INTERACTIVE, 1)
+        assert gate.active == 3
+
+        # 批次名額釋出後，排隊中的批次請求才能取得
+        waiter = asyncio.ensure_future(gate.acquire(PRIORITY_BATCH, 1))
+        await settle()
+        assert not waiter.done()
+        gate.release(PRIORITY_BATCH)
+        await waiter
+        return gate.active, gate.active_batch
+
+    assert asyncio.run(scenario()) == (3, 1)
+
+
+def test_timed_out_waiter_does_not_hold_a_slot():
+    async def scenario():
+        gate = _PriorityGate(limit=1, batch_limit=1)
+        await gate.acquire(PRIORITY_INTERACTIVE, 1)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await gate.acquire(PRIORITY_INTERACTIVE, 0.05)
+        assert gate.waiting() == {}
+
+        gate.release(PRIORITY_INTERACTIVE)
+        assert gate.active == 0
+        await gate.acquire(PRIORITY_INTERACTIVE, 1)
+        return gate.active
+
+    assert asyncio.run(scenario()) == 1
+
+
+
+@pytest.fixture
+def standin():
+    # 固定延遲，方便觀察同時請求數
+    server = StandinServer(("127.0.0.1", 0), {"*": ModelBehavior(latency_ms=200, jitter_ms=0)})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+def test_gates_use_per_model_limits_and_batch_share():
+    client = AsyncGroqClient("key", default_concurrency=4, model_concurrency={"small": 1, "big": 10},
+                             batch_share=0.3)
+
+    assert (client._gate("big").limit, client._gate("big").batch_limit) == (10, 3)
+    assert (client._gate("other").limit, client._gate("other").batch_limit) == (4, 1)
+    # 名額很少時批次請求仍至少有一個
+    assert (client._gate("small").limit, client._gate("small").batch_limit) == (1, 1)
+    assert client._gate("big") is client._gate("big")
+
+
+def test_concurrent_requests_are_capped_per_model(standin):
+    client = AsyncGroqClient("standin", base_url=standin.base_url, model_concurrency={"small": 2, "big": 6})
+    messages = [{"role": "user", "content": "hi"}]
+
+    futures = [client.submit_chat_completion(model, messages=messages) for model in ["small"] * 6 + ["big"] * 6]
+    peak = {}
+    while not all(future.done() for future in futures):
+        for model, active in client.in_flight().items():
+            peak[model] = max(peak.get(model, 0), active)
+        time.sleep(0.005)
+
+    assert all(future.result().choices[0].message.content for future in futures)
+    assert peak == {"small": 2, "big": 6}
+    assert standin.requests == {"small": {"200": 6}, "big": {"200": 6}}
+    assert client.queue_stats()["interactive"]["acquired"] == 12
+
+
+def test_request_waiting_past_queue_timeout_raises_model_busy(standin):
+    client = AsyncGroqClient("standin", base_url=standin.base_url, model_concurrency={"small": 1},
+                             queue_timeout=0.05)
+    messages = [{"role": "user", "content": "hi"}]
+
+    first = client.submit_chat_completion("small", messages=messages)
+    second = client.submit_chat_completion("small", messages=messages)
+
+    assert first.result().choices[0].message.content
+    with pytest.raises(ModelBusyError):
+        second.result()
+    assert client.queue_stats()["interactive"]["timeouts"] == 1
+    assert client.in_flight() == {}
@@ -0,0 +1,73 @@
+import json
+
+import httpx
+import pytest
+
+from app.services import groq_service
+from app.services.groq_async import AsyncGroqClient
+from benchmarks.groq_standin import FIRST_FIVE_MODELS, PRIMARY_MODEL, start_standin
+
+
+@pytest.fixture
+def standin():
+    servers = []
+
+    def start(scenario):
+        server = start_standin(scenario)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def post(server, body, path="/openai/v1/chat/completions"):
+    return httpx.post(server.base_url + path, json=body, timeout=5)
+
+
+def test_rate_limited_models_return_429_with_retry_after(standin):
+    server = standin("first_five_rate_limited")
+
+    limited = post(server, {"model": FIRST_FIVE_MODELS[-1], "messages": []})
+    healthy = post(server, {"model": "qwen-qwq-32b", "messages": [{"role": "user", "content": "hi"}]})
+
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "1"
+    assert healthy.status_code == 200
+    assert healthy.json()["choices"][0]["message"]["content"]
+    assert server.requests == {FIRST_FIVE_MODELS[-1]: {"429": 1}, "qwen-qwq-32b": {"200": 1}}
+
+
+def test_malformed_scenario_returns_truncated_json(standin):
+    server = standin("primary_malformed")
+
+    response = post(server, {"model": PRIMARY_MODEL, "messages": []})
+
+    assert response.status_code == 200
+    with pytest.raises(json.JSONDecodeError):
+        response.json()
+    assert post(server, {"model": "unknown"}, path="/v1/models").status_code == 404
+
+
+def test_listed_words_are_returned_in_json_object_mode(standin):
+    server = standin("healthy")
+    prompt = "請提供以下英文單字的詳細資料：bridge, candle。"
+
+    response = post(server, {"model": PRIMARY_MODEL, "response_format": {"type": "json_object"},
+                             "messages": [{"role": "user", "content": prompt}]})
+
+    words = json.loads(response.json()["choices"][0]["message"]["content"])["words"]
+    assert [word["word"] for word in words] == ["bridge", "candle"]
+
+
+def test_fallback_chain_skips_the_primary_model_when_it_is_down(standin, monkeypatch):
+    server = standin("primary_down")
+    client = AsyncGroqClient(api_key="standin", base_url=server.base_url, max_retries=0)
+    monkeypatch.setattr(groq_service, "groq_client", client)
+
+    reply, model = groq_service.generate_json("user", "請給我 1 個不同的英文單字", "english", shared=True)
+
+    assert model == groq_service.FALLBACK_MODELS[0]
+    assert json.loads(reply)["words"][0]["word"]
+    assert server.requests == {PRIMARY_MODEL: {"503": 1}, model: {"200": 1}}
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import groq_service
+from app.services.conversation_store import estimate_tokens
+from app.services.model_router import ChatModelRouter
+from app.services.response_cache import NearDuplicateCache
+from app.services.session_backend import MemorySessionBackend
+
+
+@pytest.fixture
+def router():
+    return ChatModelRouter("fast-model", 300)
+
+
+def test_greetings_and_short_messages_go_to_fast_model(router):
+    assert router.classify("謝謝！") == "greeting"
+    assert router.classify("Thank you.") == "greeting"
+    assert router.classify("😀👍") == "symbols"
+    assert router.classify("今天好累") == "short"
+
+
+def test_substantive_messages_stay_on_default_model(router):
+    assert router.classify("為什麼天空是藍色的") is None
+    assert router.classify("explain recursion") is None
+    assert router.classify("これは何ですか") is None
+    assert router.classify("看一下 https://example.com") is None
+    assert router.classify("這個東西到底是什麼意思呢") is None
+
+
+def test_deep_conversation_routes_short_follow_ups_to_default(router):
+    assert router.classify("今天好累", history_size=10) is None
+    # 問候道謝不受對話深度影響
+    assert router.classify("謝謝", history_size=10) == "greeting"
+
+
+def test_route_returns_model_and_reply_limit(router):
+    assert router.route("謝謝", 0, "big-model", 2000) == ("fast", "fast-model", 300, "greeting")
+    assert router.route("為什麼", 0, "big-model", 2000) == ("default", "big-model", 2000, "substantive")
+
+    router.observe("fast", 0.1)
+    router.observe("fast", 0.3)
+    assert router.stats()["routes"]["fast"] == {"requests": 2, "avg_latency_ms": 200.0}
+
+
+class RecordingGroqClient:
+    """記錄每次請求的模型與訊息，回覆固定長度的內容"""
+
+    def __init__(self):
+        self.requests = []
+
+    def chat_completion(self, messages, model, **kwargs):
+        self.requests.append((model, messages))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="好的。" * 100))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=10))
+
+
+@pytest.fixture
+def chat_service(monkeypatch):
+    client = RecordingGroqClient()
+    backend = MemorySessionBackend()
+    backend.set_ai_status("chat", True)
+    monkeypatch.setattr(groq_service, "groq_client", client)
+    monkeypatch.setattr(groq_service, "session_backend", backend)
+    monkeypatch.setattr(groq_service, "response_cache", NearDuplicateCache())
+    monkeypatch.setattr(groq_service.conversation_summarizer, "submit", lambda *args: None)
+    return client, backend
+
+
+def request_tokens(messages):
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def test_fast_route_does_not_trim_stored_history(chat_service):
+    client, backend = chat_service
+    fast_budget = groq_service.get_history_budget(groq_service.FAST_CHAT_MODEL,
+                                                  groq_service.FAST_MAX_COMPLETION_TOKENS)
+    default_budget = groq_service.get_history_budget(groq_service.DEFAULT_CHAT_MODEL)
+    assert fast_budget < default_budget
+
+    # 累積超過快速模型預算、但在大模型預算內的對話
+    turn = 0
+    while backend.get_conversation("chat", "chat") is None or \
+            backend.get_conversation("chat", "chat").total_tokens < fast_budget + 500:
+        groq_service.chat_with_groq("chat", f"請解釋第 {turn} 個問題為什麼會這樣" + "，細節" * 20)
+        turn += 1
+    stored = len(backend.get_conversation("chat", "chat"))
+
+    groq_service.chat_with_groq("chat", "謝謝")
+
+    model, messages = client.requests[-1]
+    assert model == groq_service.FAST_CHAT_MODEL
+    assert request_tokens(messages) <= fast_budget
+    # 對話紀錄只增加這一輪，沒有被修剪到快速模型的預算
+    assert len(backend.get_conversation("chat", "chat")) == stored + 2
+
+    groq_service.chat_with_groq("chat", "那為什麼第一個問題會這樣")
+    model, messages = client.requests[-1]
+    assert model == groq_service.DEFAULT_CHAT_MODEL
+    assert request_tokens(messages) > fast_budget
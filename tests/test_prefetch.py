@@ -0,0 +1,87 @@
+import threading
+
+from app.services.prefetch import MISS, Prefetcher
+
+
+def make_words(*words):
+    return [{"word": word} for word in words]
+
+
+def wait_until_done(prefetcher, chat_id):
+    """等待聊天室目前的預取完成"""
+    prefetcher._slots[chat_id].future.result(timeout=5)
+
+
+def test_take_returns_prefetched_result():
+    prefetcher = Prefetcher(ttl=60)
+    prefetcher.start("chat", "key", make_words, "apple")
+
+    assert prefetcher.take("chat", "key", timeout=5) == [{"word": "apple"}]
+    assert prefetcher.stats()["hits"] == 1
+
+
+def test_replaced_prefetch_returns_result_to_on_discard():
+    prefetcher = Prefetcher(ttl=60)
+    returned = []
+    prefetcher.start("chat", ("english", "beginner"), make_words, "apple", "bridge", on_discard=returned.append)
+    wait_until_done(prefetcher, "chat")
+
+    prefetcher.start("chat", ("english", "advanced"), make_words, "candle", on_discard=returned.append)
+
+    assert returned == [make_words("apple", "bridge")]
+    stats = prefetcher.stats()
+    assert stats["wasted"] == 1
+    assert stats["recycled"] == 1
+
+
+def test_expired_prefetch_returns_result_to_on_discard():
+    prefetcher = Prefetcher(ttl=60)
+    returned = []
+    prefetcher.start("chat", "key", make_words, "apple", on_discard=returned.append)
+    wait_until_done(prefetcher, "chat")
+    prefetcher._slots["chat"].expires_at = 0
+
+    assert prefetcher.take("chat", "key") is MISS
+    assert returned == [make_words("apple")]
+
+
+def test_running_prefetch_is_returned_after_it_finishes():
+    prefetcher = Prefetcher(ttl=60)
+    release = threading.Event()
+    returned = []
+
+    def slow_words():
+        release.wait(5)
+        return make_words("apple")
+
+    prefetcher.start("chat", "key", slow_words, on_discard=returned.append)
+    assert prefetcher.take("chat", "key", timeout=0.01) is MISS
+    assert returned == []
+
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+    assert returned == [make_words("apple")]
+
+
+def test_taken_prefetch_is_not_returned():
+    prefetcher = Prefetcher(ttl=60)
+    returned = []
+    prefetcher.start("chat", "key", make_words, "apple", on_discard=returned.append)
+
+    assert prefetcher.take("chat", "key", timeout=5) == make_words("apple")
+    prefetcher.start("chat", "other", make_words, "bridge")
+    assert returned == []
+
+
+def test_skipped_prefetch_is_not_counted_as_miss():
+    prefetcher = Prefetcher(ttl=60)
+    prefetcher.skip("chat", ("news", "1"))
+
+    assert prefetcher.take("chat", ("news", "1")) is MISS
+    stats = prefetcher.stats()
+    assert stats["skipped"] == 1
+    assert stats["misses"] == 0
+    assert stats["wasted"] == 0
+    # 沒有預取也沒有略過記錄時仍計為未命中
+    assert prefetcher.take("chat", ("news", "1")) is MISS
+    assert prefetcher.stats()["misses"] == 1
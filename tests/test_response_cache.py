@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import groq_service
+from app.services.response_cache import NearDuplicateCache
+from app.services.session_backend import MemorySessionBackend
+
+
+def test_exact_and_formatting_variants_hit():
+    cache = NearDuplicateCache()
+    cache.put("chat", "How do I reset my password?", "reply")
+
+    assert cache.get("chat", "how do i reset my password") == "reply"
+    assert cache.get("chat", "ＨＯＷ do I reset my password！") == "reply"
+
+
+def test_near_duplicate_with_extra_word_hits():
+    cache = NearDuplicateCache()
+    question = "what are some good places to visit in the mountains during a long summer holiday"
+    cache.put("chat", question, "reply")
+
+    assert cache.get("chat", question + " please") == "reply"
+
+
+def test_single_word_difference_misses():
+    cache = NearDuplicateCache()
+    cache.put("chat", "what is the capital of australia", "Canberra")
+
+    assert cache.get("chat", "what is the capital of austria") is None
+
+
+def test_different_numbers_miss():
+    cache = NearDuplicateCache()
+    cache.put("chat", "我的手機號碼是0912345678，請幫我記下來", "好的，0912345678 已記下")
+
+    assert cache.get("chat", "我的手機號碼是0912345679，請幫我記下來") is None
+    assert cache.get("chat", "我的手機號碼是０９１２３４５６７８，請幫我記下來") == "好的，0912345678 已記下"
+
+
+def test_different_named_tokens_miss():
+    cache = NearDuplicateCache()
+    cache.put("chat", "Tell me about the history of Taipei and its old streets", "reply")
+
+    assert cache.get("chat", "Tell me about the history of Tainan and its old streets") is None
+
+
+def test_partitions_do_not_share_entries():
+    cache = NearDuplicateCache()
+    cache.put(("chat", "A"), "how do i reset my password", "reply")
+
+    assert cache.get(("chat", "B"), "how do i reset my password") is None
+
+
+def test_expired_entries_are_removed(monkeypatch):
+    cache = NearDuplicateCache(ttl=10)
+    now = [1000.0]
+    monkeypatch.setattr("app.services.response_cache.time.monotonic", lambda: now[0])
+    cache.put("chat", "how do i reset my password", "reply")
+
+    now[0] += 11
+    assert cache.get("chat", "how do i reset my password") is None
+    assert cache.stats()["entries"] == 0
+
+
+class FakeGroqClient:
+    def __init__(self):
+        self.prompts = []
+
+    def chat_completion(self, messages, model, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        reply = f"reply {len(self.prompts)}: {messages[-1]['content']}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=10))
+
+
+@pytest.fixture
+def chat_service(monkeypatch):
+    client = FakeGroqClient()
+    backend = MemorySessionBackend()
+    monkeypatch.setattr(groq_service, "groq_client", client)
+    monkeypatch.setattr(groq_service, "session_backend", backend)
+    monkeypatch.setattr(groq_service, "response_cache", NearDuplicateCache())
+    for chat_id in ("A", "B"):
+        backend.set_ai_status(chat_id, True)
+    return client
+
+
+def test_first_turn_reply_is_not_shared_between_chats(chat_service):
+    message = "我的手機號碼是0912345678，請幫我記下來"
+    first = groq_service.chat_with_groq("A", message)
+    second = groq_service.chat_with_groq("B", message)
+
+    assert "reply 1" in first
+    assert "reply 2" in second
+    assert len(chat_service.prompts) == 2
+
+
+def test_greeting_reply_is_shared_between_chats(chat_service):
+    first = groq_service.chat_with_groq("A", "你好")
+    second = groq_service.chat_with_groq("B", "你好！")
+
+    assert first == second
+    assert len(chat_service.prompts) == 1
@@ -0,0 +1,151 @@
+import pytest
+
+from app.services import review_deck
+from app.services.review_deck import (
+    FIRST_REVIEW_DELAY, INITIAL_EASE, MIN_EASE, QUALITY_AGAIN, QUALITY_EASY, QUALITY_GOOD, QUALITY_HARD,
+    ReviewStore, _Deck, card_id
+)
+from app.utils import word_review
+
+DAY = 700000
+
+
+@pytest.fixture
+def day(monkeypatch):
+    """可調整的「今天」"""
+    current = [DAY]
+    monkeypatch.setattr(review_deck, "today", lambda: current[0])
+    return current
+
+
+def new_card(deck=None):
+    deck = deck or _Deck()
+    deck.add(card_id("english", f"word{len(deck)}"), DAY)
+    return deck, len(deck) - 1
+
+
+def test_good_answers_follow_sm2_intervals():
+    deck, position = new_card()
+
+    intervals = [deck.schedule(position, QUALITY_GOOD, DAY) for _ in range(4)]
+
+    assert intervals == [1, 6, 15, 38]
+    assert deck.ease[position] == INITIAL_EASE
+    assert deck.due[position] == DAY + 38
+
+
+def test_answer_quality_adjusts_ease():
+    deck, easy = new_card()
+    deck, hard = new_card(deck)
+
+    deck.schedule(easy, QUALITY_EASY, DAY)
+    deck.schedule(hard, QUALITY_HARD, DAY)
+
+    assert deck.ease[easy] == INITIAL_EASE + 10
+    assert deck.ease[hard] == INITIAL_EASE - 14
+
+
+def test_lapse_resets_repetitions_and_ease_has_a_floor():
+    deck, position = new_card()
+    for _ in range(3):
+        deck.schedule(position, QUALITY_GOOD, DAY)
+
+    assert deck.schedule(position, QUALITY_AGAIN, DAY) == 1
+    assert deck.reps[position] == 0
+    assert deck.schedule(position, QUALITY_GOOD, DAY) == 1
+    assert deck.schedule(position, QUALITY_GOOD, DAY) == 6
+
+    for _ in range(10):
+        deck.schedule(position, QUALITY_AGAIN, DAY)
+    assert deck.ease[position] == MIN_EASE
+
+
+def test_peek_due_returns_earliest_card_and_skips_stale_heap_entries():
+    deck, first = new_card()
+    deck, second = new_card(deck)
+
+    assert deck.peek_due(DAY) == first
+    deck.schedule(first, QUALITY_GOOD, DAY)
+    assert deck.peek_due(DAY) == second
+    deck.schedule(second, QUALITY_GOOD, DAY)
+    assert deck.peek_due(DAY) is None
+    assert deck.peek_due(DAY + 1) in (first, second)
+
+
+def test_heap_is_rebuilt_when_stale_entries_pile_up():
+    deck, position = new_card()
+    for _ in range(100):
+        deck.schedule(position, QUALITY_AGAIN, DAY)
+
+    assert len(deck.heap) <= review_deck.HEAP_REBUILD_FACTOR * len(deck) + 16
+    assert deck.peek_due(DAY + 1) == position
+
+
+def test_store_schedules_received_words(day):
+    store = ReviewStore()
+    words = [{"word": "apple", "definition_zh": "蘋果"}, {"word": "bridge", "definition_zh": "橋"}]
+
+    assert store.add_words("chat", "english", "beginner", words) == 2
+    assert store.add_words("chat", "english", "beginner", words[:1]) == 0
+    assert store.next_card("chat") is None
+
+    day[0] += FIRST_REVIEW_DELAY
+    assert store.summary("chat") == {"total": 2, "due": 2}
+    cid, language, level, data = store.next_card("chat")
+    assert (language, level) == ("english", "beginner")
+    assert store.grade("chat", cid, QUALITY_GOOD) == 1
+    assert store.summary("chat")["due"] == 1
+    assert store.grade("chat", 12345, QUALITY_GOOD) is None
+
+
+def test_store_reloads_deck_updated_by_another_worker(tmp_path, day):
+    db_path = str(tmp_path / "review.db")
+    first, second = ReviewStore(db_path), ReviewStore(db_path)
+    first.add_words("chat", "english", "beginner", [{"word": "apple"}])
+    day[0] += FIRST_REVIEW_DELAY
+
+    cid = second.next_card("chat")[0]
+    first.grade("chat", cid, QUALITY_GOOD)
+
+    assert second.summary("chat") == {"total": 1, "due": 0}
+
+
+def test_invalid_quality_is_rejected(day):
+    store = ReviewStore()
+    store.add_words("chat", "english", "beginner", [{"word": "apple"}])
+    day[0] += FIRST_REVIEW_DELAY
+    cid = store.next_card("chat")[0]
+
+    for quality in (-1, 6, 8):
+        with pytest.raises(ValueError):
+            store.grade("chat", cid, quality)
+    assert store.summary("chat")["due"] == 1
+
+
+def test_due_count_is_kept_up_to_date_without_rescanning():
+    deck = _Deck()
+    for i in range(5):
+        deck.add(card_id("english", f"word{i}"), DAY)
+    assert deck.count_due(DAY) == 5
+
+    deck.schedule(0, QUALITY_GOOD, DAY)
+    deck.schedule(1, QUALITY_AGAIN, DAY)
+    deck.add(card_id("english", "late"), DAY + 3)
+    deck.add(card_id("english", "early"), DAY - 1)
+    deck.reschedule(2, DAY + review_deck.MAX_INTERVAL)
+
+    assert deck.count_due(DAY) == 3 == sum(1 for due in deck.due if due <= DAY)
+    assert deck.count_due(DAY + 1) == 5
+
+
+def test_review_grade_postback_with_invalid_quality_is_not_recorded(day, monkeypatch):
+    store = ReviewStore()
+    monkeypatch.setattr(review_deck, "review_store", store)
+    store.add_words("chat", "english", "beginner", [{"word": "apple"}])
+    day[0] += FIRST_REVIEW_DELAY
+    cid = store.next_card("chat")[0]
+
+    (reply,) = word_review.handle_review_grade("chat", cid, 8)
+
+    assert "無效" in reply.text
+    assert store.stats()["reviews"] == 0
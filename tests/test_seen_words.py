@@ -0,0 +1,75 @@
+import os
+
+from app.services import seen_words
+from app.services.seen_words import EXACT_LIMIT, KIND_BLOOM, KIND_EXACT, SeenWordIndex, _UserWords, word_id
+
+
+def fill(user: _UserWords, start: int, stop: int) -> None:
+    for i in range(start, stop):
+        user.add(word_id(f"word{i}"), f"word{i}")
+
+
+def test_exact_set_until_limit():
+    user = _UserWords()
+    fill(user, 0, EXACT_LIMIT)
+
+    assert user.kind == KIND_EXACT
+    assert user.count == EXACT_LIMIT
+    assert user.contains(word_id("WORD1 "))
+    assert not user.contains(word_id("never seen"))
+
+
+def test_conversion_to_bloom_shrinks_storage_without_false_negatives():
+    user = _UserWords()
+    fill(user, 0, EXACT_LIMIT)
+    exact_size = user.size
+    fill(user, EXACT_LIMIT, EXACT_LIMIT + 1)
+
+    assert user.kind == KIND_BLOOM
+    assert user.size < exact_size
+    assert all(user.contains(word_id(f"word{i}")) for i in range(EXACT_LIMIT + 1))
+
+
+def test_bloom_grows_in_layers_and_keeps_false_positive_rate_low():
+    user = _UserWords()
+    fill(user, 0, 10000)
+
+    assert len(user.layers) > 1
+    assert user.size < 10000 * 8 / 2
+    assert all(user.contains(word_id(f"word{i}")) for i in range(10000))
+    false_positives = sum(user.contains(word_id(f"unseen{i}")) for i in range(20000))
+    assert false_positives / 20000 < 0.005
+
+
+def test_conversion_waits_while_exact_set_is_smaller(monkeypatch):
+    monkeypatch.setattr(seen_words, "BLOOM_FP_RATE", 1e-30)
+    user = _UserWords()
+    fill(user, 0, EXACT_LIMIT + 10)
+
+    assert user.kind == KIND_EXACT
+
+
+def test_dump_and_load_round_trip():
+    user = _UserWords()
+    fill(user, 0, 5000)
+
+    restored = _UserWords.load(*user.dump())
+
+    assert restored.kind == KIND_BLOOM
+    assert restored.count == user.count
+    assert restored.recent == user.recent
+    assert [layer.items for layer in restored.layers] == [layer.items for layer in user.layers]
+    assert all(restored.contains(word_id(f"word{i}")) for i in range(5000))
+
+
+def test_index_is_shared_between_workers(tmp_path):
+    db_path = os.path.join(tmp_path, "seen_words.db")
+    worker_a = SeenWordIndex(db_path)
+    worker_b = SeenWordIndex(db_path)
+
+    assert worker_a.filter_unseen("english", "chat", ["apple", "banana"]) == [True, True]
+    worker_b.mark_seen("english", "chat", ["apple"])
+
+    assert worker_a.filter_unseen("english", "chat", ["apple", "banana"]) == [False, True]
+    assert worker_a.recent("english", "chat") == ["apple"]
+    assert worker_a.filter_unseen("japanese", "chat", ["apple"]) == [True]
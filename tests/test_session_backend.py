@@ -0,0 +1,134 @@
+import pytest
+
+from app.services.conversation_store import ROLE_ASSISTANT, ROLE_USER, Conversation
+from app.services.session_backend import (
+    MemorySessionBackend, SessionBackend, SQLiteSessionBackend, create_session_backend
+)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sessions.db")
+
+
+def make_backend(db_path):
+    # 測試中手動呼叫 flush，背景寫出的間隔設得很長
+    return SQLiteSessionBackend(db_path, flush_interval=3600)
+
+
+def conversation(*turns):
+    conv = Conversation("system prompt", capacity=10)
+    for text in turns:
+        conv.append(ROLE_USER, text)
+        conv.append(ROLE_ASSISTANT, f"re: {text}")
+    return conv
+
+
+def contents(conv):
+    return [content for _, content in conv.iter_messages()]
+
+
+class FailingConnection:
+    """在寫入對話紀錄時失敗的連線"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def executemany(self, sql, rows):
+        raise RuntimeError("disk I/O error")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_session_backend_requires_every_method():
+    class Partial(SessionBackend):
+        def get_conversation(self, session_type, chat_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+    assert isinstance(create_session_backend("memory"), MemorySessionBackend)
+
+
+def test_flush_persists_for_other_workers(db_path):
+    writer, reader = make_backend(db_path), make_backend(db_path)
+    writer.save_conversation("chat", "A", conversation("hello"))
+
+    assert reader.get_conversation("chat", "A") is None
+    writer.flush()
+    assert contents(reader.get_conversation("chat", "A")) == ["hello", "re: hello"]
+
+
+def test_saved_snapshot_is_not_affected_by_later_changes(db_path):
+    writer, reader = make_backend(db_path), make_backend(db_path)
+    conv = conversation("hello")
+    writer.save_conversation("chat", "A", conv)
+
+    # 儲存後請求執行緒繼續修改同一個物件，背景寫出的是儲存當下的內容
+    conv.append(ROLE_USER, "not saved yet")
+    writer.flush()
+
+    assert contents(reader.get_conversation("chat", "A")) == ["hello", "re: hello"]
+
+
+def test_failed_flush_restores_the_batch(db_path):
+    writer, reader = make_backend(db_path), make_backend(db_path)
+    writer.save_conversation("chat", "A", conversation("hello"))
+    writer.save_conversation("chat", "B", conversation("bye"))
+    real_conn = writer._connection()
+
+    writer._conn = FailingConnection(real_conn)
+    writer.flush()
+    assert not real_conn.in_transaction
+    assert reader.get_conversation("chat", "A") is None
+    # 尚未寫出的變更仍以本地為準
+    assert contents(writer.get_conversation("chat", "A")) == ["hello", "re: hello"]
+
+    writer._conn = real_conn
+    writer.flush()
+    assert contents(reader.get_conversation("chat", "A")) == ["hello", "re: hello"]
+    assert contents(reader.get_conversation("chat", "B")) == ["bye", "re: bye"]
+
+
+def test_cached_conversation_is_reloaded_after_another_worker_writes(db_path):
+    first, second = make_backend(db_path), make_backend(db_path)
+    first.save_conversation("chat", "A", conversation("one"))
+    first.flush()
+    assert contents(second.get_conversation("chat", "A")) == ["one", "re: one"]
+
+    first.save_conversation("chat", "A", conversation("one", "two"))
+    first.flush()
+    assert contents(second.get_conversation("chat", "A")) == ["one", "re: one", "two", "re: two"]
+
+    first.delete_conversation("chat", "A")
+    first.flush()
+    assert second.get_conversation("chat", "A") is None
+
+
+def test_unchanged_cached_conversation_is_reused(db_path):
+    first, second = make_backend(db_path), make_backend(db_path)
+    first.save_conversation("chat", "A", conversation("one"))
+    first.save_conversation("chat", "B", conversation("two"))
+    first.flush()
+    cached = second.get_conversation("chat", "A")
+
+    # 其他聊天室的寫入讓快取重新驗證，版本相同時沿用同一個物件
+    first.save_conversation("chat", "B", conversation("three"))
+    first.flush()
+    assert second.get_conversation("chat", "A") is cached
+
+
+def test_flags_are_shared_between_workers(db_path):
+    first, second = make_backend(db_path), make_backend(db_path)
+    assert not second.get_ai_status("A")
+    assert not second.get_debounce_status("A")
+
+    first.set_ai_status("A", True)
+    assert second.get_ai_status("A")
+    assert not second.get_debounce_status("A")
+
+    first.set_debounce_status("A", True)
+    first.set_ai_status("A", False)
+    assert second.get_debounce_status("A")
+    assert not second.get_ai_status("A")
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+from app.services.short_links import ShortLinkCache
+
+
+class Shorten:
+    """記錄每次縮短的網址；設定 gate 時等到放行才回傳"""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = None
+        self.failing = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        with self._lock:
+            self.calls.append(url)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if url in self.failing:
+            raise RuntimeError("shortener down")
+        return url.replace("https://news.example.com/", "https://s.example/")
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "links.db")
+
+
+@pytest.fixture
+def shorten():
+    return Shorten()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def url(n):
+    return f"https://news.example.com/{n}"
+
+
+def test_urls_are_shortened_once_and_shared_between_instances(db_path, shorten):
+    cache = ShortLinkCache(db_path)
+
+    assert cache.shorten_all([url(1), url(2), url(1), ""], shorten) == \
+        ["https://s.example/1", "https://s.example/2", "https://s.example/1", ""]
+    assert sorted(shorten.calls) == [url(1), url(2)]
+
+    other = ShortLinkCache(db_path)
+    assert other.shorten_all([url(2), url(3)], shorten) == ["https://s.example/2", "https://s.example/3"]
+    assert sorted(shorten.calls) == [url(1), url(2), url(3)]
+    stats = other.stats()
+    assert (stats["entries"], stats["cached"], stats["hit_rate"]) == (3, 1, 0.5)
+
+
+def test_failed_urls_fall_back_and_are_not_stored(db_path, shorten):
+    cache = ShortLinkCache(db_path)
+    shorten.failing.add(url(1))
+
+    assert cache.shorten_all([url(1), url(2)], shorten) == [url(1), "https://s.example/2"]
+    assert cache.stats()["failed"] == 1
+
+    # 失敗的網址下次會重新嘗試
+    shorten.failing.clear()
+    assert cache.shorten_all([url(1)], shorten) == ["https://s.example/1"]
+
+
+def test_deadline_uses_original_urls_and_stores_late_results(db_path, shorten):
+    cache = ShortLinkCache(db_path, deadline=0.05)
+    shorten.gate = threading.Event()
+
+    assert cache.shorten_all([url(1), url(2)], shorten) == [url(1), url(2)]
+    assert cache.stats()["deadline_fallbacks"] == 2
+
+    # 仍在縮短中的網址不重複送出
+    cache.shorten_all([url(1)], shorten)
+    assert sorted(shorten.calls) == [url(1), url(2)]
+
+    shorten.gate.set()
+    wait_for(lambda: cache.stats()["entries"] == 2)
+    assert cache.shorten_all([url(1), url(2)], shorten) == ["https://s.example/1", "https://s.example/2"]
+    assert len(shorten.calls) == 2
@@ -0,0 +1,114 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import groq_service
+from app.services.single_flight import SingleFlight
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def run_in_threads(count, target):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_concurrent_calls_with_same_key_share_one_execution():
+    flight, gate, calls = SingleFlight(), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        gate.wait(5)
+        return "result"
+
+    threads, results = run_in_threads(5, lambda i: flight.do("key", fn))
+    # 等第一個呼叫開始執行、其他呼叫都在等待後才放行
+    wait_for(lambda: flight.coalesced == 4)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert sorted(results, key=lambda r: r[1]) == [("result", False)] + [("result", True)] * 4
+    assert flight.stats() == {"executed": 1, "coalesced": 4, "in_flight": 0, "coalesced_ratio": 0.8}
+
+
+def test_error_is_shared_with_waiters_and_not_kept():
+    flight, gate = SingleFlight(), threading.Event()
+
+    def fail():
+        gate.wait(5)
+        raise RuntimeError("model down")
+
+    threads, results = run_in_threads(3, lambda i: flight.do("key", fail))
+    wait_for(lambda: flight.coalesced == 2)
+    gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # 完成後不保留結果，下一次呼叫重新執行
+    assert flight.do("key", lambda: "retry") == ("retry", False)
+
+
+class GatedGroqClient:
+    """等到放行才回覆，記錄實際送出的請求"""
+
+    def __init__(self):
+        self.requests = []
+        self.gate = threading.Event()
+
+    def chat_completion(self, messages, model, **kwargs):
+        self.requests.append(messages[-1]["content"])
+        self.gate.wait(5)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"word": "bridge"}'))],
+                               usage=SimpleNamespace(prompt_tokens=10, completion_tokens=10))
+
+
+@pytest.fixture
+def groq_client(monkeypatch):
+    client = GatedGroqClient()
+    monkeypatch.setattr(groq_service, "groq_client", client)
+    monkeypatch.setattr(groq_service, "llm_single_flight", SingleFlight())
+    return client
+
+
+def test_shared_prompts_differing_only_in_whitespace_share_one_call(groq_client):
+    prompts = ["請給我 5 個英文單字", "請給我\n    5 個英文單字", "請給我 5  個英文單字 "]
+
+    threads, results = run_in_threads(
+        3, lambda i: groq_service.generate_json(f"user-{i}", prompts[i], "english", shared=True))
+    wait_for(lambda: groq_service.llm_single_flight.coalesced == 2)
+    groq_client.gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(groq_client.requests) == 1
+    assert [reply for reply, _ in results] == ['{"word": "bridge"}'] * 3
+
+
+def test_different_session_types_are_not_coalesced(groq_client):
+    groq_client.gate.set()
+
+    groq_service.generate_json("user", "給我一個單字", "english", shared=True)
+    groq_service.generate_json("user", "給我一個單字", "japanese", shared=True)
+
+    assert len(groq_client.requests) == 2
+    assert groq_service.get_single_flight_stats()["coalesced"] == 0
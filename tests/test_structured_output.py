@@ -0,0 +1,99 @@
+from app.services import groq_service
+from app.services.structured_output import ObjectSchema, extract_items, generate_objects, repair_json
+
+WORDS = '{"words": [{"word": "apple", "definition_zh": "蘋果"}, {"word": "bridge", "definition_zh": "橋"}]}'
+
+
+def words_of(data):
+    return [item["word"] for item in extract_items(data, "words")]
+
+
+def test_valid_json_is_not_repaired():
+    data, repaired = repair_json(WORDS)
+
+    assert words_of(data) == ["apple", "bridge"]
+    assert not repaired
+
+
+def test_markdown_fence_is_removed():
+    data, repaired = repair_json(f"```json\n{WORDS}\n```")
+
+    assert words_of(data) == ["apple", "bridge"]
+    assert repaired
+
+
+def test_surrounding_text_is_skipped():
+    data, repaired = repair_json(f"以下是單字：\n{WORDS}\n希望對你有幫助！")
+
+    assert words_of(data) == ["apple", "bridge"]
+    assert repaired
+
+
+def test_trailing_commas_are_removed():
+    data, repaired = repair_json('{"words": [{"word": "apple", "definition_zh": "蘋果",}, ],}')
+
+    assert words_of(data) == ["apple"]
+    assert repaired
+
+
+def test_truncated_reply_drops_only_the_incomplete_value():
+    truncated = WORDS[:WORDS.index('"橋"')]
+
+    data, repaired = repair_json(truncated)
+
+    # 被截斷的物件保留完整的欄位，缺少的欄位之後再補齊
+    assert extract_items(data, "words") == [{"word": "apple", "definition_zh": "蘋果"}, {"word": "bridge"}]
+    assert repaired
+
+
+def test_truncated_inside_string_keeps_complete_objects():
+    data, repaired = repair_json('{"words": [{"word": "apple", "definition_zh": "蘋果"}, {"word": "bri')
+
+    assert words_of(data) == ["apple"]
+    assert repaired
+
+
+def test_commas_inside_strings_are_not_treated_as_separators():
+    data, _ = repair_json('[{"word": "apple", "example_sentence": "Red, green, and yellow."}, {"word": "br')
+
+    assert [item["word"] for item in data] == ["apple"]
+    assert data[0]["example_sentence"] == "Red, green, and yellow."
+
+
+def test_unrecoverable_text_returns_none():
+    assert repair_json("抱歉，我無法提供單字。") == (None, False)
+    assert repair_json("") == (None, False)
+    assert repair_json(None) == (None, False)
+    assert repair_json('{"words": [') == (None, False)
+
+
+def test_extract_items_accepts_other_wrappers():
+    assert extract_items({"items": [{"word": "apple"}]}, "words") == [{"word": "apple"}]
+    assert extract_items({"word": "apple"}, "words") == [{"word": "apple"}]
+    assert extract_items([{"word": "apple"}], "words") == [{"word": "apple"}]
+    assert extract_items("apple", "words") == []
+
+
+def test_schema_normalizes_items():
+    schema = ObjectSchema(["word", "definition_zh", "example_sentence"], essential=("word", "definition_zh"))
+
+    data = schema.normalize({"word": " apple ", "definition_zh": ["蘋果", "蘋果樹"], "extra": "x"})
+
+    assert data == {"word": "apple", "definition_zh": "蘋果、蘋果樹", "example_sentence": ""}
+    assert schema.missing(data) == ["example_sentence"]
+    assert schema.is_complete(data)
+    assert schema.normalize({"definition_zh": "蘋果"}) is None
+    assert schema.normalize("apple") is None
+
+
+def test_missing_fields_are_matched_with_the_word_cache_normalization(monkeypatch):
+    schema = ObjectSchema(["word", "definition_zh", "example_sentence"], essential=("word", "definition_zh"))
+    replies = iter([
+        ('{"words": [{"word": "Ice  Cream"}, {"word": "apple", "definition_zh": "蘋果"}]}', "model"),
+        ('{"items": [{"word": "ＩＣＥ cream ", "definition_zh": "冰淇淋"}]}', "model"),
+    ])
+    monkeypatch.setattr(groq_service, "generate_json", lambda *args: next(replies))
+
+    items = generate_objects("chat", "prompt", "english", schema, list_key="words")
+
+    assert [(item["word"], item["definition_zh"]) for item in items] == [("Ice  Cream", "冰淇淋"), ("apple", "蘋果")]
@@ -0,0 +1,34 @@
+import os
+from types import SimpleNamespace
+
+from app.services.token_usage import TokenUsageTracker
+
+
+def usage(prompt_tokens: int, completion_tokens: int) -> SimpleNamespace:
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def test_budget_counts_pending_and_flushed_usage():
+    tracker = TokenUsageTracker(flush_interval=3600, daily_budget=100)
+    tracker.record("chat", "chat", "model", usage(40, 20))
+    assert tracker.used_today("chat") == 60
+    assert tracker.within_budget("chat")
+
+    tracker.flush()
+    tracker.record("chat", "chat", "model", usage(30, 10))
+    assert tracker.used_today("chat") == 100
+    assert not tracker.within_budget("chat")
+
+
+def test_budget_sees_usage_flushed_by_other_workers(tmp_path):
+    db_path = os.path.join(tmp_path, "usage.db")
+    worker_a = TokenUsageTracker(db_path, flush_interval=3600, daily_budget=100)
+    worker_b = TokenUsageTracker(db_path, flush_interval=3600, daily_budget=100)
+
+    assert worker_a.used_today("chat") == 0
+
+    worker_b.record("chat", "chat", "model", usage(80, 40))
+    worker_b.flush()
+
+    assert worker_a.used_today("chat") == 120
+    assert not worker_a.within_budget("chat")
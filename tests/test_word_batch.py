@@ -0,0 +1,87 @@
+import pytest
+
+from app.services import headwords, seen_words, word_batch, word_cache
+from app.utils import english_words
+
+LEVEL = "intermediate"
+LIST_WORDS = ["apple", "bridge", "candle"]
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    """只有三個單字的英文清單，已看過單字索引與詳細資料快取都使用行程內的資料庫"""
+    source_dir = tmp_path / "wordlists"
+    (source_dir / "english").mkdir(parents=True)
+    (source_dir / "english" / f"{LEVEL}.txt").write_text("\n".join(LIST_WORDS) + "\n", encoding="utf-8")
+
+    monkeypatch.setattr(headwords, "headword_library", None)
+    monkeypatch.setattr(seen_words, "seen_word_index", seen_words.SeenWordIndex())
+    monkeypatch.setattr(word_cache, "word_cache", word_cache.WordDetailCache())
+    return headwords.init_headwords(str(tmp_path / "compiled"), str(source_dir))
+
+
+class FakeModel:
+    """依提示詞回覆：補詳細資料的請求回覆指定的單字，選字的請求回覆模型自選的單字"""
+
+    def __init__(self, chosen):
+        self.chosen = list(chosen)
+        self.detail_requests = []
+        self.word_requests = []
+
+    def __call__(self, chat_id, prompt, session_type, schema, list_key="words", shared=False):
+        if prompt.startswith("請提供以下英文單字"):
+            words = [word for word in LIST_WORDS if word in prompt]
+            self.detail_requests.append(words)
+        else:
+            words, self.chosen = self.chosen, []
+            self.word_requests.append(prompt)
+        return [self._details(word) for word in words]
+
+    @staticmethod
+    def _details(word):
+        return {field: word if field == "word" else f"{word} {field}" for field in english_words.REQUIRED_FIELDS}
+
+
+def test_pick_headwords_returns_nothing_when_every_word_is_seen(library):
+    seen_words.mark_seen("english", "chat", LIST_WORDS)
+    accept = lambda batch: seen_words.filter_unseen("english", "chat", batch)
+
+    assert headwords.pick_headwords("english", LEVEL, 2, (), accept) == []
+    assert library.exhausted == 1
+
+
+def test_exhausted_word_list_falls_back_to_model(library, monkeypatch):
+    model = FakeModel(["harbor", "lantern"])
+    monkeypatch.setattr(word_batch, "generate_objects", model)
+    seen_words.mark_seen("english", "chat", LIST_WORDS)
+
+    words = english_words.get_english_word_batch("chat", LEVEL, 2)
+
+    assert [word["word"] for word in words] == ["harbor", "lantern"]
+    assert model.detail_requests == []
+    assert len(model.word_requests) == 1
+    # 模型選字時附上使用者看過的單字
+    assert all(word in model.word_requests[0] for word in LIST_WORDS)
+
+
+def test_partially_exhausted_list_fills_the_rest_from_model(library, monkeypatch):
+    model = FakeModel(["harbor", "lantern"])
+    monkeypatch.setattr(word_batch, "generate_objects", model)
+    seen_words.mark_seen("english", "chat", ["apple", "bridge"])
+
+    words = english_words.get_english_word_batch("chat", LEVEL, 3)
+
+    assert [word["word"] for word in words] == ["candle", "harbor", "lantern"]
+    assert model.detail_requests == [["candle"]]
+    assert len(model.word_requests) == 1
+    assert "2 個" in model.word_requests[0]
+
+
+def test_unexhausted_list_does_not_ask_model_to_choose(library, monkeypatch):
+    model = FakeModel(["harbor"])
+    monkeypatch.setattr(word_batch, "generate_objects", model)
+
+    words = english_words.get_english_word_batch("chat", LEVEL, 3)
+
+    assert sorted(word["word"] for word in words) == LIST_WORDS
+    assert model.word_requests == []
@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.word_cache import WordDetailCache, normalize_word
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "words.db")
+
+
+def word(text, definition="定義"):
+    return {"word": text, "definition_zh": definition}
+
+
+def test_normalize_word_folds_width_case_and_spaces():
+    assert normalize_word("  Ｂｒｉｄｇｅ ") == "bridge"
+    assert normalize_word("Look   UP") == "look up"
+
+
+def test_resolve_keeps_the_first_stored_details(db_path):
+    cache = WordDetailCache(db_path)
+
+    assert cache.resolve("english", "beginner", [word("Bridge", "橋")]) == [word("Bridge", "橋")]
+    # 模型再次提出同一個單字時沿用保存的內容，新單字則保存起來
+    resolved = cache.resolve("english", "beginner", [word("candle", "蠟燭"), word("bridge ", "橋樑")])
+
+    assert resolved == [word("candle", "蠟燭"), word("Bridge", "橋")]
+    assert cache.stats()["stored"] == 2
+    # 不同難度或語言各自保存
+    assert cache.get("english", "advanced", "bridge") is None
+    assert cache.get("japanese", "beginner", "bridge") is None
+
+
+def test_details_are_shared_between_instances(db_path):
+    WordDetailCache(db_path).resolve("english", "beginner", [word("bridge"), word("candle")])
+    reader = WordDetailCache(db_path)
+
+    assert reader.get_many("english", "beginner", ["BRIDGE", "dragon", "candle"]) == {
+        "bridge": word("bridge"), "candle": word("candle")
+    }
+    stats = reader.stats()
+    assert (stats["db_hits"], stats["lru_hits"]) == (2, 0)
+
+    reader.get("english", "beginner", "bridge")
+    assert reader.stats()["lru_hits"] == 1
+
+
+def test_lru_evicts_least_recently_used(db_path):
+    cache = WordDetailCache(db_path, lru_size=2)
+    cache.resolve("english", "beginner", [word("apple"), word("bridge")])
+
+    cache.get("english", "beginner", "apple")
+    cache.resolve("english", "beginner", [word("candle")])
+
+    assert list(cache._lru) == [("english", "beginner", "apple"), ("english", "beginner", "candle")]
+    # 被淘汰的單字仍可從資料庫取得
+    assert cache.get("english", "beginner", "bridge") == word("bridge")
+    assert cache.stats()["entries"] == {"english": 3}
+
+
+def test_returned_details_are_copies(db_path):
+    cache = WordDetailCache(db_path)
+    cache.resolve("english", "beginner", [word("bridge", "橋")])
+
+    cache.get("english", "beginner", "bridge")["definition_zh"] = "changed"
+
+    assert cache.get("english", "beginner", "bridge") == word("bridge", "橋")
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.word_pool import WordPool
+
+
+class FakeGenerator:
+    """每次生成不重複的單字，記錄請求的數量"""
+
+    def __init__(self):
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def __call__(self, level, count):
+        with self._lock:
+            start = sum(self.requests)
+            self.requests.append(count)
+        return [{"word": f"{level}-{i}"} for i in range(start, start + count)]
+
+
+@pytest.fixture
+def generator():
+    return FakeGenerator()
+
+
+@pytest.fixture
+def pool(tmp_path, generator):
+    return WordPool(str(tmp_path / "pool.db"), generator, ["beginner"], target_size=10, low_water=4, batch_size=3)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_refill_tops_up_to_target_in_batches(pool, generator):
+    pool._refill("beginner")
+
+    assert pool.size("beginner") == 10
+    assert generator.requests == [3, 3, 3, 1]
+    assert pool.stats()["generated"] == 10
+
+    # 還在低水位以上時不補充
+    pool.take("beginner", 5)
+    pool._refill("beginner")
+    assert pool.size("beginner") == 5
+
+
+def test_take_is_fifo_and_leaves_rejected_words(pool):
+    pool.put_back("beginner", [{"word": w} for w in ("apple", "bridge", "candle", "dragon")])
+
+    words = pool.take("beginner", 2, accept=lambda batch: [word["word"] != "apple" for word in batch])
+
+    assert [word["word"] for word in words] == ["bridge", "candle"]
+    assert [word["word"] for word in pool.take("beginner", 5)] == ["apple", "dragon"]
+    stats = pool.stats()
+    assert stats["served"] == 4
+    assert stats["missed"] == 3
+
+
+def test_put_back_skips_words_already_in_pool(pool):
+    assert pool.put_back("beginner", [{"word": "Apple"}, {"word": "bridge"}]) == 2
+    assert pool.put_back("beginner", [{"word": "apple"}]) == 0
+    assert pool.put_back("beginner", []) == 0
+
+
+def test_take_below_low_water_wakes_the_refill_worker(pool):
+    pool.start()
+    wait_for(lambda: pool.size("beginner") == 10)
+
+    pool.take("beginner", 8)
+
+    wait_for(lambda: pool.size("beginner") == 10)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_forked_worker_restarts_the_refill_thread(pool):
+    pool.start()
+    wait_for(lambda: pool.size("beginner") == 10)
+
+    pid = os.fork()
+    if pid == 0:
+        # 子行程沒有父行程的補充執行緒，取用後應自行補充
+        try:
+            pool.take("beginner", 8)
+            wait_for(lambda: pool.size("beginner") == 10)
+            os._exit(0)
+        except BaseException:
+            os._exit(1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_pool_that_was_never_started_does_not_start_a_worker(pool):
+    pool.take("beginner", 1)
+
+    assert pool._worker is None
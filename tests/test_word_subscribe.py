@@ -0,0 +1,113 @@
+import pytest
+
+from app.models.subscription import SubscriptionContent, SubscriptionManager
+from app.utils import japanese_words, scheduler, word_subscribe
+from benchmarks.groq_standin import JAPANESE_WORD
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = SubscriptionManager()
+    monkeypatch.setattr(word_subscribe, "subscription_manager", manager)
+    monkeypatch.setattr(scheduler, "subscription_manager", manager)
+    return manager
+
+
+class FakeContent:
+    """依 (難度, 數量) 生成內容，記錄生成次數與每位使用者收到的單字"""
+
+    def __init__(self):
+        self.created = []
+        self.received = []
+        self.failing_levels = set()
+
+    def create(self, level_id, count):
+        self.created.append((level_id, count))
+        if level_id in self.failing_levels:
+            return SubscriptionContent("error", [], "")
+        words = [{"word": f"{level_id}-{i}"} for i in range(count)]
+        return SubscriptionContent(f"message {level_id}x{count}", words, f"level-{level_id}")
+
+    def record(self, chat_id, level, words):
+        self.received.append((chat_id, level, [word["word"] for word in words]))
+
+
+@pytest.fixture
+def content(monkeypatch):
+    content = FakeContent()
+    monkeypatch.setitem(scheduler.SUBSCRIPTION_CONTENT, "japanese", (content.create, content.record))
+    return content
+
+
+@pytest.fixture
+def pushes(monkeypatch):
+    pushes = []
+
+    def push(token, user_id, message):
+        pushes.append((user_id, message))
+        return user_id != "blocked"
+
+    monkeypatch.setattr(scheduler, "send_line_message_push", push)
+    return pushes
+
+
+def subscribe(user_id, difficulty_id, count, time_id="1", language="japanese"):
+    assert word_subscribe.save_subscription(user_id, difficulty_id, count, time_id, language)
+
+
+def test_subscriptions_are_kept_per_language(manager):
+    subscribe("A", "1", 3, language="japanese")
+    subscribe("A", "2", 2, language="english")
+
+    assert [s.difficulty_name for s in word_subscribe.get_user_subscriptions("A", "japanese")] == ["初級"]
+    assert word_subscribe.cancel_user_subscriptions("A", "japanese")
+    assert word_subscribe.get_user_subscriptions("A", "japanese") == []
+    assert [s.language for s in word_subscribe.get_user_subscriptions("A")] == ["english"]
+
+
+def test_one_content_set_per_configuration(manager, content, pushes):
+    subscribe("A", "1", 3)
+    subscribe("B", "1", 3)
+    subscribe("C", "1", 3)
+    subscribe("D", "2", 1)
+    subscribe("E", "1", 3, time_id="2")
+    subscribe("F", "1", 3, language="english")
+
+    scheduler.send_word_notification("1", "japanese")
+
+    # 只有此時段、此語言的訂閱者，每種設定生成一次
+    assert sorted(content.created) == [("1", 3), ("2", 1)]
+    assert sorted(pushes) == [("A", "message 1x3"), ("B", "message 1x3"), ("C", "message 1x3"),
+                              ("D", "message 2x1")]
+    assert sorted(content.received)[0] == ("A", "level-1", ["1-0", "1-1", "1-2"])
+
+
+def test_failed_push_is_not_recorded_and_empty_content_is_skipped(manager, content, pushes):
+    subscribe("blocked", "1", 2)
+    subscribe("A", "1", 2)
+    subscribe("B", "3", 1)
+    content.failing_levels.add("3")
+
+    scheduler.send_word_notification("1", "japanese")
+
+    assert sorted(user for user, _ in pushes) == ["A", "blocked"]
+    assert [chat_id for chat_id, _, _ in content.received] == ["A"]
+
+
+def test_japanese_subscription_content_is_shared(monkeypatch):
+    calls = []
+
+    def generate(source, chat_id, level, count, shared):
+        calls.append((chat_id, level, count, shared))
+        return [dict(JAPANESE_WORD)][:count]
+
+    monkeypatch.setattr(japanese_words, "generate_word_batch", generate)
+
+    content = japanese_words.create_subscription_content("1", 1)
+
+    # 不帶任何使用者的學習紀錄
+    assert calls == [(japanese_words.SUBSCRIPTION_CHAT_ID, "N5-N4", 1, True)]
+    assert content.words == [JAPANESE_WORD]
+    assert content.level == "N5-N4"
+    assert content.message.alt_text == f"日文單字：{JAPANESE_WORD['word']}"
+    assert japanese_words.create_subscription_content("9", 1).words == []